@@ -1,19 +1,22 @@
 # models.py
 
-from pydantic import BaseModel
+from pydantic import BaseModel, UUID4
 from typing import List, Dict
 
+# One-way diagnosis runs are checkpointed per session_id, so it must be a client-generated
+# random (version 4) UUID: a guessable id would let one client restart or resume another's diagnosis
+
 class InitInput(BaseModel):
-    session_id: str
+    session_id: UUID4
     userSymptoms: str
 
 
 class FollowupInput(BaseModel):
-    session_id: str
+    session_id: UUID4
     userSymptoms: str
 
 class FollowupAnswers(BaseModel):
-    session_id: str
+    session_id: UUID4
     userSymptoms:str
     user_response: Dict[str, str]
 
@@ -1,4 +1,5 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException
 from fastapi.encoders import jsonable_encoder
 from State import (
     FinalPromptInput, FinalPromptOutput, InitInput,
@@ -7,9 +8,9 @@ from State import (
 from routes.chat.chat_router import router as chat_router
 from routes.thread.thread_router import router as thread_router
 from routes.users.user_router import router as user_router
+from routes.metrics.metrics_router import router as metrics_router
 
-from chat.One_Way_Chatting.chat_graph import compiled_graph
-from chat.One_Way_Chatting.get_more_question_chain import generate_more_question_chain
+from chat.One_Way_Chatting.chat_graph import AWAITING_ANSWERS_NODE, compiled_graph, one_way_config
 from chat.One_Way_Chatting.qa_chain import qa_chain
 from fastapi.middleware.cors import CORSMiddleware
 from chat.Two_way_Chatting.Main.api.api_server import router as stream_router  
@@ -19,15 +20,33 @@ from fastapi import UploadFile, File
 import base64
 from chat.Image_voice_Identifier.Voice_of_doc import text_to_speech_with_elevenlabs
 from groq import Groq
+from langgraph.types import Command
 import socketio
+from utils.checkpointer import checkpointer
+from utils.engine import async_engine
+from utils.message_writer import message_writer
+from utils.vectorstore_registry import VECTORSTORE_WARM_UP, vectorstore_registry
+import asyncio
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    message_writer.start()
+    if VECTORSTORE_WARM_UP:
+        await asyncio.to_thread(vectorstore_registry.warm_up)
+    yield
+    # Flush queued chat messages before the pool goes away
+    await message_writer.stop()
+    await async_engine.dispose()
+    checkpointer.close()
 
 # ✅ Step 1: Create FastAPI app for normal HTTP routes
-fastapi_app = FastAPI()
+fastapi_app = FastAPI(lifespan=lifespan)
 fastapi_app.include_router(stream_router)
 fastapi_app.include_router(chat_router)
 fastapi_app.include_router(thread_router)
 fastapi_app.include_router(user_router)
 fastapi_app.include_router(authRouter)
+fastapi_app.include_router(metrics_router)
 # ✅ Step 2: Add CORS to FastAPI
 fastapi_app.add_middleware(
     CORSMiddleware,
@@ -35,6 +54,7 @@ fastapi_app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Latest-Cursor"],
 )
 
 # ✅ Step 3: Define REST API routes on fastapi_app
@@ -43,35 +63,49 @@ fastapi_app.add_middleware(
 async def test():
     return {"message": "Hello medic-man"}
 
+# /init runs still generating questions, by session, so /generate_followUp can wait for them
+pending_inits = {}
+
+async def run_init(config: dict, symptoms: str):
+    # A new /init starts the session's diagnosis over
+    await checkpointer.adelete_thread(config["configurable"]["thread_id"])
+    # Runs until the follow-up questions are generated, then pauses
+    return await compiled_graph.ainvoke({"symptoms_input": symptoms}, config=config)
+
 @fastapi_app.post("/init")
 async def initializeChat(data: InitInput):
-    state = {"symptoms_input": data.userSymptoms}
-    result = compiled_graph.invoke(state)
-    return result
+    session_id = str(data.session_id)
+    init = asyncio.ensure_future(run_init(one_way_config(session_id), data.userSymptoms))
+    pending_inits[session_id] = init
+    try:
+        return await asyncio.shield(init)
+    finally:
+        if pending_inits.get(session_id) is init:
+            del pending_inits[session_id]
 
 
 
 @fastapi_app.post("/generate_followUp")
 async def generate_follow_up(data: FollowupInput):
-    state = {
-        "userSymptoms": data.userSymptoms
-    }
-    llm_output = generate_more_question_chain.invoke(state)
-
-    questions = [
-        line.strip("- ").strip()
-        for line in llm_output.split("\n")
-        if line.strip().startswith("-")
-    ]
-    return {"followupQuestions": questions}
+    # The questions the paused /init run generated, so /get_answers answers the same ones
+    session_id = str(data.session_id)
+    init = pending_inits.get(session_id)
+    if init is not None:
+        await asyncio.shield(init)
+    snapshot = await compiled_graph.aget_state(one_way_config(session_id))
+    if AWAITING_ANSWERS_NODE not in snapshot.next:
+        raise HTTPException(status_code=409, detail="No diagnosis is waiting for answers in this session, call /init first")
+    return {"followupQuestions": snapshot.values.get("followupQuestions", [])}
 
 @fastapi_app.post("/get_answers")
 async def getAnswers(data: FollowupAnswers):
-    state = {
-        "symptoms_input": data.userSymptoms, 
-        "user_response": data.user_response,
-    }
-    result = compiled_graph.invoke(state)
+    config = one_way_config(str(data.session_id))
+    snapshot = await compiled_graph.aget_state(config)
+    if AWAITING_ANSWERS_NODE not in snapshot.next:
+        raise HTTPException(status_code=409, detail="No diagnosis is waiting for answers in this session, call /init first")
+
+    # Answer the questions generated by /init and resume that run
+    result = await compiled_graph.ainvoke(Command(update={"user_response": data.user_response}), config=config)
     return result
 
 @fastapi_app.post("/generate_final_prompt", response_model=FinalPromptOutput)
@@ -106,7 +140,7 @@ async def generate_final_prompt(data: FinalPromptInput):
 async def getDiagnosis(data: DiagnosisInput):
     print("Data :" , data)
     print("final :" , data.finalPrompt)
-    result = qa_chain.invoke(data.finalPrompt)
+    result = await qa_chain.ainvoke(data.finalPrompt)
     print("result",result)
     return result
    
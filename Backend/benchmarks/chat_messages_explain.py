@@ -0,0 +1,132 @@
+"""
+EXPLAIN ANALYZE of the hot chat_messages queries on a seeded table, with the
+migration 0002 indexes and without them.
+
+Everything runs in one transaction that is rolled back at the end, so the seeded
+rows and the dropped indexes never become visible. Dropping indexes takes an
+exclusive lock on chat_messages for the duration: use a local database.
+
+    cd Backend
+    alembic upgrade head
+    python -m benchmarks.chat_messages_explain
+    python -m benchmarks.chat_messages_explain --messages 1000000 --threads 20000
+"""
+import argparse
+import json
+import time
+
+from sqlalchemy import text
+from utils.engine import engine
+
+INDEXES = ["ix_chat_messages_thread_time", "ix_chat_messages_user_thread_time"]
+
+QUERIES = {
+    "thread history": """
+        SELECT * FROM chat_messages
+        WHERE thread_id = :thread_id
+        ORDER BY time_stamp ASC
+    """,
+    "first-message check": """
+        SELECT EXISTS (
+            SELECT 1 FROM chat_messages WHERE thread_id = :thread_id AND sender = 'User'
+        )
+    """,
+    "latest user message": """
+        SELECT message, time_stamp FROM chat_messages
+        WHERE thread_id = :thread_id AND sender = 'User'
+        ORDER BY time_stamp DESC LIMIT 1
+    """,
+    "sidebar window": """
+        SELECT * FROM (
+            SELECT thread_id, message, sender, time_stamp,
+                   row_number() OVER (PARTITION BY thread_id ORDER BY time_stamp DESC) AS row_num
+            FROM chat_messages WHERE sender = 'User'
+        ) latest
+        WHERE row_num = 1
+        ORDER BY time_stamp DESC
+    """,
+}
+
+
+def seed(connection, messages: int, threads: int) -> int:
+    """
+    Insert `threads` threads and `messages` alternating User/A.I messages spread
+    over them; returns a thread id from the middle of the range
+    """
+    first_thread = connection.execute(text("""
+        INSERT INTO chat_thread ("user", created_at)
+        SELECT 'bench', now() FROM generate_series(1, :threads)
+        RETURNING id
+    """), {"threads": threads}).scalars().all()[0]
+
+    connection.execute(text("""
+        INSERT INTO chat_messages (thread_id, sender, message, time_stamp)
+        SELECT :first_thread + (i % :threads),
+               (CASE WHEN (i / :threads) % 2 = 0 THEN 'User' ELSE 'A.I' END)::message_type,
+               md5(i::text) || ' I have had a headache and mild fever since yesterday',
+               now() - make_interval(secs => :messages - i)
+        FROM generate_series(1, :messages) AS i
+    """), {"first_thread": first_thread, "threads": threads, "messages": messages})
+    connection.execute(text("ANALYZE chat_messages"))
+    return first_thread + threads // 2
+
+
+def explain(connection, sql: str, params: dict) -> dict:
+    plan = connection.execute(text(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}"), params).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    root = plan[0]
+    return {
+        "ms": root["Execution Time"],
+        "node": root["Plan"]["Node Type"],
+        "index": find_index(root["Plan"]),
+    }
+
+
+def find_index(node: dict) -> str:
+    if node.get("Index Name"):
+        return node["Index Name"]
+    for child in node.get("Plans", []):
+        name = find_index(child)
+        if name:
+            return name
+    return ""
+
+
+def report(title: str, connection, params: dict):
+    print(f"\n{title}")
+    print(f"{'query':<22}{'time':>12}  plan")
+    for name, sql in QUERIES.items():
+        result = explain(connection, sql, params)
+        plan = result["node"] + (f" using {result['index']}" if result["index"] else "")
+        print(f"{name:<22}{result['ms']:>10.2f}ms  {plan}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=1_000_000)
+    parser.add_argument("--threads", type=int, default=10_000)
+    args = parser.parse_args()
+
+    with engine.connect() as connection:
+        transaction = connection.begin()
+        try:
+            # Seeding a million rows takes longer than the request statement_timeout
+            connection.execute(text("SET LOCAL statement_timeout = 0"))
+            started = time.perf_counter()
+            thread_id = seed(connection, args.messages, args.threads)
+            print(f"seeded {args.messages} messages over {args.threads} threads in {time.perf_counter() - started:.1f}s")
+
+            params = {"thread_id": thread_id}
+            report("with indexes", connection, params)
+
+            for index in INDEXES:
+                connection.execute(text(f"DROP INDEX IF EXISTS {index}"))
+            connection.execute(text("ANALYZE chat_messages"))
+            report("without indexes", connection, params)
+        finally:
+            transaction.rollback()
+
+
+if __name__ == "__main__":
+    main()
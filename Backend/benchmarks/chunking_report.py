@@ -0,0 +1,76 @@
+"""
+Index statistics per chunking strategy: vectors, bytes, near-duplicate ratio and the
+prompt tokens of the top-k retrieved context for a set of typical patient queries.
+
+    cd Backend
+    python -m benchmarks.chunking_report
+    python -m benchmarks.chunking_report --docs ../Assets/docs --k 3
+"""
+import argparse
+import statistics
+
+from langchain_community.vectorstores import FAISS
+
+from chat.One_Way_Chatting.chunking import chunking_config
+from chat.One_Way_Chatting.create_memory_for_llm import (
+    DATA_PATH, get_embedding_model, list_pdf_files, parse_pdf
+)
+from utils.minhash import NearDuplicateFilter
+from utils.token_counter import estimate_tokens
+
+# (label, strategy, chunk_size, chunk_overlap, dedup_threshold)
+STRATEGIES = [
+    ("recursive 100/50 (old)", "recursive", 100, 50, 1.0),
+    ("recursive 100/50 + dedup", "recursive", 100, 50, 0.8),
+    ("recursive 500/50 + dedup", "recursive", 500, 50, 0.8),
+    ("sentence 500 + dedup", "sentence", 500, 0, 0.8),
+    ("section 800 + dedup", "section", 800, 0, 0.8),
+]
+
+QUERIES = [
+    "I have a headache and fever since yesterday",
+    "what can I take for a sore throat",
+    "chest pain when breathing deeply",
+    "stomach ache and diarrhea after eating",
+    "how much paracetamol can a child take",
+    "persistent dry cough for two weeks",
+    "itchy rash on my arms",
+    "high blood pressure medication side effects",
+    "feeling dizzy when I stand up",
+    "symptoms of a urinary tract infection",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--docs", default=DATA_PATH)
+    parser.add_argument("--k", type=int, default=3)
+    args = parser.parse_args()
+
+    files = list_pdf_files(args.docs)
+    embedding_model = get_embedding_model()
+    query_vectors = embedding_model.embed_documents(QUERIES)
+    print(f"{len(files)} PDFs from {args.docs}, {len(QUERIES)} queries, k={args.k}\n")
+    print(f"{'strategy':<28}{'chunks':>8}{'vectors':>9}{'dup %':>7}{'index KB':>10}{'text KB':>9}{'ctx tokens':>12}")
+
+    for label, strategy, chunk_size, chunk_overlap, threshold in STRATEGIES:
+        chunking = chunking_config(strategy, chunk_size, chunk_overlap, threshold)
+        chunks = [chunk for path in files.values() for chunk in parse_pdf(path, chunking)[1]]
+        duplicates = NearDuplicateFilter(threshold=threshold)
+        kept = [chunk for chunk in chunks if threshold >= 1 or duplicates.add(chunk.page_content)]
+        texts = [chunk.page_content for chunk in kept]
+
+        vectors = embedding_model.embed_documents(texts)
+        db = FAISS.from_embeddings(list(zip(texts, vectors)), embedding_model)
+        context_tokens = [
+            estimate_tokens("\n\n".join(doc.page_content for doc in db.similarity_search_by_vector(vector, k=args.k)))
+            for vector in query_vectors
+        ]
+        index_kb = db.index.ntotal * db.index.d * 4 / 1024
+        text_kb = sum(len(text.encode()) for text in texts) / 1024
+        print(f"{label:<28}{len(chunks):>8}{len(kept):>9}{duplicates.duplicate_ratio * 100:>7.1f}"
+              f"{index_kb:>10.0f}{text_kb:>9.0f}{statistics.mean(context_tokens):>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
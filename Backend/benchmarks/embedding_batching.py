@@ -0,0 +1,79 @@
+"""
+Query-embedding throughput with one encode per request (each session calling
+embed_query in a thread) versus the micro-batching EmbeddingBatcher, at several
+concurrency levels. Queries are distinct, so the embedding caches play no part.
+
+    cd Backend
+    python -m benchmarks.embedding_batching
+    python -m benchmarks.embedding_batching --concurrency 1 8 64 --requests 512 --max-wait-ms 5
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from utils.embedding_batcher import EmbeddingBatcher
+from utils.vectorstore_registry import EMBEDDING_MODEL_NAME, vectorstore_registry
+
+SYMPTOMS = ["headache", "fever", "dry cough", "sore throat", "nausea", "back pain", "dizziness", "rash",
+            "chest tightness", "fatigue", "joint pain", "blurred vision"]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def make_queries(count):
+    return [f"I have had {SYMPTOMS[i % len(SYMPTOMS)]} for {i // len(SYMPTOMS) + 1} days, what could it be?"
+            for i in range(count)]
+
+
+async def run(embed, concurrency, queries):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one_request(query):
+        async with semaphore:
+            started = time.perf_counter()
+            await embed(query)
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one_request(query) for query in queries))
+    elapsed = time.perf_counter() - started
+    return len(queries) / elapsed, statistics.median(latencies), percentile(latencies, 99)
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", default=EMBEDDING_MODEL_NAME)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 64])
+    parser.add_argument("--requests", type=int, default=256)
+    parser.add_argument("--max-batch-size", type=int, default=32)
+    parser.add_argument("--max-wait-ms", type=float, default=5)
+    args = parser.parse_args()
+
+    model = vectorstore_registry.embeddings(args.model)
+    model.embed_documents(make_queries(8))
+
+    print(f"{args.requests} queries per run, model {args.model}\n")
+    print(f"{'mode':<10}{'concurrency':>12}{'queries/s':>12}{'p50 ms':>10}{'p99 ms':>10}{'avg batch':>11}")
+    for concurrency in args.concurrency:
+        # Different texts per run so no run benefits from an earlier one
+        queries = make_queries(args.requests * 2)
+        single_queries, batched_queries = queries[::2], queries[1::2]
+
+        throughput, p50, p99 = await run(lambda query: asyncio.to_thread(model.embed_query, query),
+                                         concurrency, single_queries)
+        print(f"{'single':<10}{concurrency:>12}{throughput:>12.1f}{p50:>10.1f}{p99:>10.1f}{1.0:>11.1f}")
+
+        batcher = EmbeddingBatcher(model.embed_documents, max_batch_size=args.max_batch_size,
+                                   max_wait_ms=args.max_wait_ms)
+        throughput, p50, p99 = await run(batcher.aembed_query, concurrency, batched_queries)
+        average_batch = batcher.stats()["avg_batch_size"]
+        print(f"{'batched':<10}{concurrency:>12}{throughput:>12.1f}{p50:>10.1f}{p99:>10.1f}{average_batch:>11.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,97 @@
+"""
+Event-loop lag while concurrent handlers hit Postgres through the sync engine
+(the old handlers) versus the async engine. Needs the Postgres configured in .env.
+
+    cd Backend
+    python -m benchmarks.event_loop_lag
+    python -m benchmarks.event_loop_lag --concurrency 64 --requests 1000 --query-ms 20
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from sqlalchemy import text
+from utils.engine import async_engine, engine
+
+PROBE_INTERVAL = 0.005
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def probe_lag(samples, stop):
+    """
+    Sleep for PROBE_INTERVAL in a loop and record how late each wake-up is
+    """
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(PROBE_INTERVAL)
+        samples.append((time.perf_counter() - started - PROBE_INTERVAL) * 1000)
+
+
+async def sync_handler(query):
+    # What the handlers did before: a blocking driver call inside async def
+    with engine.connect() as connection:
+        connection.execute(query).fetchall()
+
+
+async def async_handler(query):
+    async with async_engine.connect() as connection:
+        (await connection.execute(query)).fetchall()
+
+
+async def run(handler, concurrency, total_requests, query):
+    samples, stop = [], asyncio.Event()
+    probe = asyncio.create_task(probe_lag(samples, stop))
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one_request():
+        async with semaphore:
+            await handler(query)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one_request() for _ in range(total_requests)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await probe
+
+    return {
+        "requests_per_s": total_requests / elapsed,
+        "lag_p50_ms": statistics.median(samples) if samples else 0.0,
+        "lag_p99_ms": percentile(samples, 99) if samples else 0.0,
+        "lag_max_ms": max(samples) if samples else 0.0,
+        "probe_samples": len(samples),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--query-ms", type=float, default=10.0, help="server-side pg_sleep per query")
+    args = parser.parse_args()
+
+    query = text(f"SELECT pg_sleep({args.query_ms / 1000})")
+
+    # Warm both pools so connection setup is not measured
+    await run(sync_handler, 4, 8, query)
+    await run(async_handler, 4, 8, query)
+
+    print(f"concurrency={args.concurrency} requests={args.requests} query={args.query_ms}ms")
+    print(f"{'engine':<8}{'req/s':>10}{'lag p50':>12}{'lag p99':>12}{'lag max':>12}")
+    for name, handler in (("sync", sync_handler), ("async", async_handler)):
+        result = await run(handler, args.concurrency, args.requests, query)
+        print(
+            f"{name:<8}{result['requests_per_s']:>10.1f}{result['lag_p50_ms']:>10.1f}ms"
+            f"{result['lag_p99_ms']:>10.1f}ms{result['lag_max_ms']:>10.1f}ms"
+        )
+
+    await async_engine.dispose()
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
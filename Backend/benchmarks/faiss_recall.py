@@ -0,0 +1,106 @@
+"""
+Recall@k and per-query latency of IVF-PQ and HNSW indexes against the exact (flat) index.
+Uses the vectors of the built flat index, or synthetic clustered vectors with --synthetic.
+
+    cd Backend
+    python -m benchmarks.faiss_recall                        # vectors from VECTORSTORE_PATH (a flat index)
+    python -m benchmarks.faiss_recall --synthetic 50000 --k 5 --queries 500
+"""
+import argparse
+import statistics
+import time
+
+import faiss
+import numpy as np
+
+from utils.faiss_index import build_index, read_index, read_meta, resolve_params, stored_vectors
+from utils.vectorstore_registry import VECTORSTORE_PATH
+
+NPROBE_SWEEP = [1, 4, 16, 64]
+EF_SEARCH_SWEEP = [16, 32, 64, 128]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def synthetic_vectors(count, dimension, seed=0):
+    """
+    Clustered unit vectors, closer to sentence embeddings than uniform noise
+    """
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(max(count // 200, 1), dimension))
+    vectors = centers[rng.integers(0, len(centers), count)] + 0.3 * rng.normal(size=(count, dimension))
+    vectors = vectors.astype("float32")
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+def make_queries(vectors, count, seed=1):
+    # Perturbed corpus vectors: a query close to, but not exactly at, a chunk
+    rng = np.random.default_rng(seed)
+    queries = vectors[rng.integers(0, len(vectors), count)] + 0.05 * rng.normal(size=(count, vectors.shape[1]))
+    queries = queries.astype("float32")
+    faiss.normalize_L2(queries)
+    return queries
+
+
+def measure(index, queries, truth, k):
+    latencies, found = [], 0
+    for query, expected in zip(queries, truth):
+        started = time.perf_counter()
+        _, ids = index.search(query.reshape(1, -1), k)
+        latencies.append((time.perf_counter() - started) * 1000)
+        found += len(set(ids[0]) & set(expected))
+    return found / (len(queries) * k), statistics.median(latencies), percentile(latencies, 99)
+
+
+def index_size_mb(index):
+    return faiss.serialize_index(index).nbytes / 2 ** 20
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--index", default=VECTORSTORE_PATH)
+    parser.add_argument("--synthetic", type=int, help="use N synthetic vectors instead of --index")
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.synthetic:
+        vectors = synthetic_vectors(args.synthetic, args.dimension)
+    else:
+        if read_meta(args.index)["index_type"] != "flat":
+            parser.error("--index must be a flat index; rebuild with --index-type flat or use --synthetic")
+        vectors = stored_vectors(read_index(args.index, mmap=False))
+    queries = make_queries(vectors, args.queries)
+    print(f"{len(vectors)} vectors of dimension {vectors.shape[1]}, {len(queries)} queries, k={args.k}\n")
+
+    flat = build_index(vectors, "flat")
+    _, truth = flat.search(queries, args.k)
+    _, flat_p50, flat_p99 = measure(flat, queries, truth, args.k)
+
+    print(f"{'index':<28}{'recall@k':>10}{'p50 ms':>10}{'p99 ms':>10}{'size MB':>10}{'build s':>10}")
+    print(f"{'flat (exact)':<28}{1.0:>10.3f}{flat_p50:>10.3f}{flat_p99:>10.3f}{index_size_mb(flat):>10.1f}{'-':>10}")
+
+    for index_type, knob, sweep in (("ivfpq", "nprobe", NPROBE_SWEEP), ("hnsw", "efSearch", EF_SEARCH_SWEEP)):
+        try:
+            params = resolve_params(index_type, vectors.shape[1], len(vectors))
+        except ValueError as e:
+            print(f"{index_type:<28}skipped: {e}")
+            continue
+        started = time.perf_counter()
+        index = build_index(vectors, index_type, params)
+        build_seconds = time.perf_counter() - started
+        size = index_size_mb(index)
+        for value in sweep:
+            faiss.ParameterSpace().set_index_parameter(index, knob, value)
+            recall, p50, p99 = measure(index, queries, truth, args.k)
+            label = f"{index_type} {knob}={value}"
+            print(f"{label:<28}{recall:>10.3f}{p50:>10.3f}{p99:>10.3f}{size:>10.1f}{build_seconds:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Prompt tokens and per-turn latency of each chat memory strategy at 10, 50 and 200 messages.
+
+    cd Backend
+    python -m benchmarks.memory_strategies          # offline summarizer, measures strategy overhead only
+    python -m benchmarks.memory_strategies --live   # summaries come from the Groq chat model
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from langchain_core.messages import AIMessage, HumanMessage
+from chat.Two_way_Chatting.Memory.memory_strategies import (
+    ConversationSummarizer, FullMemory, SummaryMemory, SummaryWindowMemory, WindowMemory, format_message
+)
+from utils.token_counter import estimate_tokens
+
+CONVERSATION_LENGTHS = [10, 50, 200]
+
+PATIENT_TURNS = [
+    "I've had a throbbing headache on the left side since yesterday morning, it gets worse with light.",
+    "Yes, I took 500mg of paracetamol twice but it only helped for a couple of hours.",
+    "No fever, but I feel a bit nauseous and I didn't sleep well the last two nights.",
+    "I do have a history of migraines, my mother gets them too. Should I be worried?",
+]
+
+DOCTOR_TURN = (
+    "## What might be going on\n\nA one-sided throbbing headache with light sensitivity and nausea sounds a lot "
+    "like a **migraine**, especially with your family history. Poor sleep is a classic trigger.\n\n"
+    "### What you can do now\n- Rest in a dark, quiet room\n- Stay hydrated and eat something light\n"
+    "- Ibuprofen 400mg with food can work better than paracetamol for migraines\n\n"
+    "### See a doctor urgently if\n- The pain is the worst of your life or came on suddenly\n"
+    "- You have weakness, confusion or vision loss\n\nHow long do your usual migraines last?"
+)
+
+
+class OfflineSummarizer(ConversationSummarizer):
+    """
+    Deterministic stand-in for the LLM: keeps the last 150 words
+    """
+
+    async def asummarize(self, summary, messages):
+        words = (summary + " " + " ".join(format_message(message) for message in messages)).split()
+        return " ".join(words[-150:])
+
+
+def build_strategies(summarizer):
+    return [
+        FullMemory(),
+        WindowMemory(),
+        SummaryMemory(summarizer=summarizer),
+        SummaryWindowMemory(summarizer=summarizer),
+    ]
+
+
+async def run_strategy(strategy, length):
+    state = {"messages": []}
+    latencies = []
+    for turn in range(length // 2):
+        state["messages"] = state["messages"] + [
+            HumanMessage(content=PATIENT_TURNS[turn % len(PATIENT_TURNS)]),
+            AIMessage(content=DOCTOR_TURN),
+        ]
+        started = time.perf_counter()
+        state.update(await strategy.acompact(state))
+        history = strategy.render_history(state)
+        latencies.append(time.perf_counter() - started)
+
+    return {
+        "prompt_tokens": estimate_tokens("\n".join(history)),
+        "stored_messages": len(state["messages"]),
+        "mean_ms": statistics.mean(latencies) * 1000,
+        "max_ms": max(latencies) * 1000,
+    }
+
+
+async def main(live: bool):
+    summarizer = ConversationSummarizer() if live else OfflineSummarizer()
+    print(f"{'strategy':<16}{'messages':>10}{'prompt tok':>12}{'stored':>8}{'mean ms':>10}{'max ms':>10}")
+    for strategy in build_strategies(summarizer):
+        for length in CONVERSATION_LENGTHS:
+            result = await run_strategy(strategy, length)
+            print(f"{strategy.name:<16}{length:>10}{result['prompt_tokens']:>12}{result['stored_messages']:>8}"
+                  f"{result['mean_ms']:>10.2f}{result['max_ms']:>10.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--live", action="store_true", help="summarize with the Groq chat model")
+    args = parser.parse_args()
+    asyncio.run(main(args.live))
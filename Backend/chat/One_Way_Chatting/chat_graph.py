@@ -3,6 +3,7 @@ from chat.One_Way_Chatting.chat_state import ChatState
 from langgraph.types import Command
 from chat.One_Way_Chatting.qa_chain import qa_chain
 from chat.One_Way_Chatting.get_more_question_chain import generate_more_question_chain
+from utils.checkpointer import checkpointer
 
 graph = StateGraph(ChatState)
 
@@ -30,11 +31,11 @@ def chat(state: ChatState) -> Command:
 
 
 # 3. generate more question
-def generate_more_symptoms(state: ChatState) -> Command:
+async def generate_more_symptoms(state: ChatState) -> Command:
     print("\n[Generating follow-up questions based on symptoms...]")
 
     last_msg = state.get("userSymptoms", [])
-    llm_output = generate_more_question_chain.invoke(last_msg)
+    llm_output = await generate_more_question_chain.ainvoke(last_msg)
 
     questions = [
         line.strip(" -").strip()
@@ -96,9 +97,9 @@ def generate_final_prompt(state: ChatState) -> Command:
 
 
 # 6. LLM will generate final answer 
-def generate_response(state: ChatState) -> Command:
+async def generate_response(state: ChatState) -> Command:
     prompt = state["finalPrompt"]
-    result = qa_chain.invoke(prompt)
+    result = await qa_chain.ainvoke(prompt)
 
     print("\n=== Final Medical Analysis ===")
     print(result)
@@ -114,12 +115,16 @@ graph.add_node("capture_user_responses_to_dynamic_questions", capture_user_respo
 graph.add_node("final_prompt", generate_final_prompt)
 graph.add_node("generate_response", generate_response)
 
-# Compile the graph
-compiled_graph  = graph.compile()
+# Compile the graph. The run pauses once the follow-up questions exist; /get_answers
+# resumes the same run with the user's answers instead of generating new questions.
+compiled_graph  = graph.compile(checkpointer=checkpointer, interrupt_after=["generate_more"])
 
-# config = {"configurable": {"thread_id": 1}}
-# result = compiled_graph.invoke({}, config=config)
+# Node the paused run continues with
+AWAITING_ANSWERS_NODE = "capture_user_responses_to_dynamic_questions"
 
-# print("\n=== State Output ===")
-# print(result)
 
+def one_way_config(session_id: str) -> dict:
+    """
+    Checkpoint thread of a one-way diagnosis, namespaced apart from two-way chat threads
+    """
+    return {"configurable": {"thread_id": f"one_way:{session_id}"}}
@@ -7,3 +7,4 @@ class ChatState(TypedDict):
     user_response: Dict[str, str] 
     finalPrompt:str
     diagnosis_probabilities: str
+    error: str
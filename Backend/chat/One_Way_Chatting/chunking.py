@@ -0,0 +1,126 @@
+import os
+import re
+from typing import Any, Dict, List, Tuple
+
+from langchain_core.documents import Document
+
+# "recursive": fixed-size character windows (the original splitter)
+# "sentence": whole sentences packed up to chunk_size
+# "section": paragraphs under the same heading packed up to chunk_size, long ones split by sentence
+CHUNK_STRATEGIES = ("recursive", "sentence", "section")
+
+CHUNK_STRATEGY = os.getenv("CHUNK_STRATEGY", "sentence")
+CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "500"))
+CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "0"))
+# Estimated Jaccard similarity above which a chunk is dropped as a near-duplicate (1 disables)
+CHUNK_DEDUP_THRESHOLD = float(os.getenv("CHUNK_DEDUP_THRESHOLD", "0.8"))
+
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+(?=[\"'(\[]?[A-Z0-9])")
+PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+
+
+def chunking_config(strategy: str = CHUNK_STRATEGY, chunk_size: int = CHUNK_SIZE, chunk_overlap: int = CHUNK_OVERLAP,
+                    dedup_threshold: float = CHUNK_DEDUP_THRESHOLD) -> Dict[str, Any]:
+    if strategy not in CHUNK_STRATEGIES:
+        raise ValueError(f"Unknown chunking strategy {strategy!r}, expected one of {CHUNK_STRATEGIES}")
+    if chunk_overlap >= chunk_size:
+        raise ValueError("chunk_overlap must be smaller than chunk_size")
+    return {"strategy": strategy, "chunk_size": chunk_size, "chunk_overlap": chunk_overlap,
+            "dedup_threshold": dedup_threshold}
+
+
+def split_sentences(text: str) -> List[str]:
+    text = " ".join(text.split())
+    return [sentence for sentence in SENTENCE_END.split(text) if sentence]
+
+
+def is_heading(paragraph: str) -> bool:
+    line = paragraph.strip()
+    if "\n" in line or not line or len(line.split()) > 10 or line[-1] in ".,;":
+        return False
+    return line.isupper() or line.endswith(":") or bool(re.match(r"^(\d+(\.\d+)*|[IVX]+)[.)]?\s+\S", line))
+
+
+def pack(pieces: List[str], chunk_size: int, chunk_overlap: int) -> List[str]:
+    """
+    Greedily join pieces (sentences) into chunks of at most chunk_size characters.
+    The trailing pieces of a chunk, up to chunk_overlap characters, start the next one.
+    A single piece longer than chunk_size becomes its own chunk.
+    """
+    chunks, current = [], []
+    for piece in pieces:
+        if current and len(" ".join(current + [piece])) > chunk_size:
+            chunks.append(" ".join(current))
+            carried = []
+            for previous in reversed(current):
+                if len(" ".join([previous] + carried)) > chunk_overlap:
+                    break
+                carried.insert(0, previous)
+            current = carried
+        current.append(piece)
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+
+def heading_prefix(heading: str, chunk_size: int, chunk_overlap: int) -> str:
+    """
+    Heading line repeated in front of each chunk of its section. Long headings are clamped
+    to half of what chunk_overlap leaves, so the body budget always stays above chunk_overlap.
+    """
+    limit = (chunk_size - chunk_overlap) // 2
+    if not heading or limit < 3:
+        return ""
+    if len(heading) + 1 > limit:
+        heading = heading[:limit - 2].rstrip() + "…"
+    return f"{heading}\n"
+
+
+def split_sections(text: str, chunk_size: int, chunk_overlap: int, heading: str = "") -> Tuple[List[str], str]:
+    """
+    Chunks of text grouped by heading, and the heading in effect at its end.
+    heading is the one still open from the previous page of the same document.
+    """
+    chunks, body = [], []
+
+    def flush():
+        if body:
+            # The heading is repeated in each chunk of its section so the chunk stands on its own
+            prefix = heading_prefix(heading, chunk_size, chunk_overlap)
+            chunks.extend(prefix + chunk for chunk in pack(body, chunk_size - len(prefix), chunk_overlap))
+
+    for paragraph in PARAGRAPH_BREAK.split(text):
+        if is_heading(paragraph):
+            flush()
+            heading, body = paragraph.strip(), []
+            continue
+        paragraph = " ".join(paragraph.split())
+        if not paragraph:
+            continue
+        body.extend(split_sentences(paragraph) if len(paragraph) > chunk_size else [paragraph])
+    flush()
+    return chunks, heading
+
+
+def split_documents(pages: List[Document], strategy: str = CHUNK_STRATEGY, chunk_size: int = CHUNK_SIZE,
+                    chunk_overlap: int = CHUNK_OVERLAP, **_) -> List[Document]:
+    """
+    Chunk page Documents with the given strategy; chunk metadata is copied from its page
+    """
+    if strategy == "recursive":
+        from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+        splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+        return splitter.split_documents(pages)
+
+    chunks, open_headings = [], {}
+    for page in pages:
+        if strategy == "sentence":
+            texts = pack(split_sentences(page.page_content), chunk_size, chunk_overlap)
+        else:
+            # A section continues onto the next page of the same document
+            source = page.metadata.get("source")
+            texts, open_headings[source] = split_sections(page.page_content, chunk_size, chunk_overlap,
+                                                          open_headings.get(source, ""))
+        chunks.extend(Document(page_content=text, metadata=dict(page.metadata)) for text in texts if text.strip())
+    return chunks
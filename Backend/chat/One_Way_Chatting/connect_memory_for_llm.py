@@ -10,16 +10,15 @@ from langchain_core.runnables import RunnablePassthrough
 from langchain_core.output_parsers import StrOutputParser
 from langchain_groq import ChatGroq
 from dotenv import load_dotenv
+from utils.llm_gateway import llm_gateway
 import os
 load_dotenv()
 
-# Define model and DB path
-DB_FAISS_PATH = "../../../vectorstore/db_faiss"
-
 model_id = "mistralai/Mistral-7B-Instruct-v0.3"
 def load_llm(model_name: str = "llama3-8b-8192"):
     llm = ChatGroq(model=model_name, temperature=0.2,streaming=True,
-    api_key=os.getenv("GROQ_API_KEY"))
+    api_key=os.getenv("GROQ_API_KEY"),
+    max_retries=0, http_client=llm_gateway.sync_client(), http_async_client=llm_gateway.async_client())
     structured_model = llm
     return structured_model
 
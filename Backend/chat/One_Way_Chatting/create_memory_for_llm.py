@@ -1,44 +1,284 @@
-from langchain.document_loaders import PyPDFLoader,DirectoryLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+"""
+Ingest the PDFs in Assets/docs into the medical FAISS index.
+
+Only new or changed PDFs (by content hash) are parsed and embedded; chunks of
+changed and deleted PDFs are removed from the index. PDFs are parsed in a
+process pool, near-duplicate chunks are dropped (MinHash) and the rest are
+embedded in batches. Changing the chunking settings re-embeds everything.
+
+    cd Backend
+    python -m chat.One_Way_Chatting.create_memory_for_llm                       # incremental update
+    python -m chat.One_Way_Chatting.create_memory_for_llm --rebuild --workers 8 --batch-size 128
+    python -m chat.One_Way_Chatting.create_memory_for_llm --chunking section --chunk-size 800 --dedup-threshold 0.8
+    python -m chat.One_Way_Chatting.create_memory_for_llm --rebuild --index-type hnsw --hnsw-m 32 --ef-search 64
+    python -m chat.One_Way_Chatting.create_memory_for_llm --rebuild --index-type ivfpq --nlist 256 --pq-m 48 --nprobe 16
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import faiss
+from langchain.document_loaders import PyPDFLoader
 from langchain_huggingface import   HuggingFaceEmbeddings
 from langchain_community.vectorstores import FAISS
 from dotenv import load_dotenv
-import os
+from chat.One_Way_Chatting.chunking import (
+    CHUNK_DEDUP_THRESHOLD, CHUNK_OVERLAP, CHUNK_SIZE, CHUNK_STRATEGIES, CHUNK_STRATEGY, chunking_config, split_documents
+)
+from utils.faiss_index import (
+    INDEX_TYPES, add_documents, build_index, load_vectorstore, read_meta, remove_documents, resolve_params,
+    stored_vectors, write_meta
+)
+from utils.minhash import NearDuplicateFilter
+from utils.vectorstore_registry import EMBEDDING_MODEL_NAME, PROJECT_ROOT, VECTORSTORE_PATH
 load_dotenv()
 
-DATA_PATH = "../../../Assets/docs"
-print("Path",DATA_PATH)
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DATA_PATH = os.getenv("DOCS_PATH", os.path.join(PROJECT_ROOT, "Assets", "docs"))
+MANIFEST_FILE = "ingest_manifest.json"
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", str(os.cpu_count() or 1)))
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+
+
 # 1 load the data
-def load_pdf_files(data):
-    loader =DirectoryLoader(data,glob="*.pdf",loader_cls=PyPDFLoader)
-    documents = loader.load()
-    return documents
+def list_pdf_files(data):
+    """
+    PDFs under data, keyed by their path relative to it
+    """
+    files = {}
+    for root, _, names in os.walk(data):
+        for name in names:
+            if name.lower().endswith(".pdf"):
+                path = os.path.join(root, name)
+                files[os.path.relpath(path, data)] = path
+    return files
 
-my_docs = load_pdf_files(data=DATA_PATH)
-# print(len(my_docs))
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as pdf:
+        for block in iter(lambda: pdf.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
 
 
 # 2 create chunks
-def create_chunks(data):
-    text_splitter =RecursiveCharacterTextSplitter(chunk_size=100,chunk_overlap=50)
-    text_chunks =text_splitter.split_documents(data)
-    return text_chunks 
+def parse_pdf(path, chunking):
+    """
+    Runs in a worker process: one PDF to (page count, chunks)
+    """
+    pages = PyPDFLoader(path).load()
+    return len(pages), split_documents(pages, **chunking)
 
-print(create_chunks(my_docs))
-text_chunks = create_chunks(data=my_docs)
 
 # 3 create vector embeddings
 def get_embedding_model():
-    embedding_model=HuggingFaceEmbeddings (model_name="sentence-transformers/all-MiniLM-L6-v2")
+    embedding_model=HuggingFaceEmbeddings (model_name=EMBEDDING_MODEL_NAME)
     return embedding_model
 
 
-embedding_model = get_embedding_model()
+def embed_in_batches(embedding_model, texts, batch_size, progress):
+    vectors = []
+    for start in range(0, len(texts), batch_size):
+        vectors.extend(embedding_model.embed_documents(texts[start:start + batch_size]))
+        progress.chunks_embedded(min(start + batch_size, len(texts)), len(texts))
+    return vectors
+
+
+class Progress:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.pages = 0
+        self.chunks = 0
+        self.embed_started = None
+
+    def elapsed(self, since=None):
+        return max(time.perf_counter() - (since or self.started), 1e-9)
+
+    def file_parsed(self, name, pages, chunks, done, total):
+        self.pages += pages
+        self.chunks += chunks
+        logger.info(f"[INGEST] Parsed {done}/{total} {name}: {pages} pages, {chunks} chunks "
+                    f"({self.pages / self.elapsed():.1f} pages/s)")
+
+    def chunks_embedded(self, done, total):
+        if self.embed_started is None:
+            self.embed_started = time.perf_counter()
+        logger.info(f"[INGEST] Embedded {done}/{total} chunks ({done / self.elapsed(self.embed_started):.1f} chunks/s)")
+
+    def summary(self):
+        elapsed = self.elapsed()
+        return (f"{self.pages} pages and {self.chunks} chunks in {elapsed:.1f}s "
+                f"({self.pages / elapsed:.1f} pages/s, {self.chunks / elapsed:.1f} chunks/s)")
+
+
+# 4 store embedding on FAISS
+def load_manifest(path):
+    manifest_path = os.path.join(path, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path) as manifest_file:
+        return json.load(manifest_file)
+
+
+def index_stats(db, duplicates):
+    texts = [db.docstore.search(doc_id).page_content for doc_id in db.index_to_docstore_id.values()]
+    return {
+        "vectors": db.index.ntotal,
+        "index_bytes": int(faiss.serialize_index(db.index).nbytes),
+        "text_bytes": sum(len(text.encode()) for text in texts),
+        "avg_chunk_chars": round(sum(map(len, texts)) / len(texts), 1) if texts else 0.0,
+        "duplicates_checked": duplicates.checked,
+        "duplicates_dropped": duplicates.dropped,
+        "duplicate_ratio": round(duplicates.duplicate_ratio, 4),
+    }
+
+
+def save_atomically(db, path, index_type, params, manifest, stats):
+    """
+    Write to a sibling directory and swap it in, so readers never see a half-written index
+    """
+    staging, previous = path + ".tmp", path + ".old"
+    shutil.rmtree(staging, ignore_errors=True)
+    db.save_local(staging)
+    version = read_meta(path).get("version", 0) + 1 if os.path.exists(path) else 1
+    write_meta(staging, db.index, index_type, params, embedding_model=EMBEDDING_MODEL_NAME, version=version,
+               chunking=manifest["chunking"], stats=stats)
+    with open(os.path.join(staging, MANIFEST_FILE), "w") as manifest_file:
+        json.dump(manifest, manifest_file, indent=2)
+    shutil.rmtree(previous, ignore_errors=True)
+    if os.path.exists(path):
+        os.replace(path, previous)
+    os.replace(staging, path)
+    shutil.rmtree(previous, ignore_errors=True)
+
+
+def ingest(docs_path, output, index_type="flat", overrides=None, rebuild=False,
+           workers=INGEST_WORKERS, batch_size=EMBED_BATCH_SIZE, chunking=None):
+    progress = Progress()
+    embedding_model = get_embedding_model()
+    chunking = chunking or chunking_config()
+
+    manifest = None if rebuild else load_manifest(output)
+    if manifest and manifest.get("embedding_model") != EMBEDDING_MODEL_NAME:
+        logger.info("[INGEST] Embedding model changed since the last ingestion, rebuilding")
+        manifest = None
+    if manifest and manifest.get("chunking") != chunking:
+        logger.info("[INGEST] Chunking settings changed since the last ingestion, rebuilding")
+        manifest = None
+    if manifest is None:
+        manifest = {"embedding_model": EMBEDDING_MODEL_NAME, "chunking": chunking, "files": {}}
+        db = None
+    else:
+        # Fully in memory and writable; the server opens the same files memory-mapped
+        db = load_vectorstore(output, embedding_model, mmap=False)
+        meta = read_meta(output)
+        index_type, params = meta["index_type"], meta.get("params", {})
+
+    files = list_pdf_files(docs_path)
+    hashes = {name: file_hash(path) for name, path in files.items()}
+    known = manifest["files"]
+    changed = sorted(name for name, digest in hashes.items() if known.get(name, {}).get("sha256") != digest)
+    deleted = sorted(name for name in known if name not in files)
+    logger.info(f"[INGEST] {len(files)} PDFs: {len(changed)} new or changed, {len(deleted)} deleted, "
+                f"{len(files) - len(changed)} unchanged")
+    if not changed and not deleted:
+        return
+    # Chunks of the previous versions of changed PDFs and of deleted PDFs
+    stale = [chunk_id for name in changed + deleted for chunk_id in known.get(name, {}).get("chunk_ids", [])]
+    for name in deleted:
+        known.pop(name)
+
+    # Parse in parallel
+    parsed = {}
+    with ProcessPoolExecutor(max_workers=max(workers, 1)) as pool:
+        futures = {pool.submit(parse_pdf, files[name], chunking): name for name in changed}
+        for done, future in enumerate(as_completed(futures), 1):
+            name = futures[future]
+            pages, chunks = future.result()
+            parsed[name] = (pages, chunks)
+            progress.file_parsed(name, pages, len(chunks), done, len(changed))
+
+    # Near-duplicates are dropped against the chunks that stay in the index and each other
+    duplicates = NearDuplicateFilter(threshold=chunking["dedup_threshold"])
+    if db is not None:
+        remove_documents(db, stale, index_type, params)
+        if chunking["dedup_threshold"] < 1:
+            for doc_id in db.index_to_docstore_id.values():
+                duplicates.add(db.docstore.search(doc_id).page_content)
+            duplicates.checked = duplicates.dropped = 0
+
+    texts, metadatas, ids = [], [], []
+    for name in changed:
+        pages, chunks = parsed[name]
+        chunk_ids = []
+        for position, chunk in enumerate(chunks):
+            if chunking["dedup_threshold"] < 1 and not duplicates.add(chunk.page_content):
+                continue
+            chunk_id = f"{hashes[name][:16]}-{position}"
+            texts.append(chunk.page_content)
+            metadatas.append({**chunk.metadata, "source": name})
+            ids.append(chunk_id)
+            chunk_ids.append(chunk_id)
+        known[name] = {"sha256": hashes[name], "pages": pages, "chunk_ids": chunk_ids}
+    logger.info(f"[INGEST] Dropped {duplicates.dropped} of {duplicates.checked} new chunks as near-duplicates")
+
+    vectors = embed_in_batches(embedding_model, texts, batch_size, progress)
+
+    if db is None:
+        if not texts:
+            logger.warning("[INGEST] No chunks to index")
+            return
+        db = FAISS.from_embeddings(list(zip(texts, vectors)), embedding_model, metadatas=metadatas, ids=ids)
+        params = resolve_params(index_type, db.index.d, db.index.ntotal, overrides)
+        if index_type != "flat":
+            db.index = build_index(stored_vectors(db.index), index_type, params)
+    elif texts:
+        add_documents(db, texts, vectors, metadatas, ids, index_type)
+
+    stats = index_stats(db, duplicates)
+    save_atomically(db, output, index_type, params, manifest, stats)
+    logger.info(f"[INGEST] Saved {index_type} index with {db.index.ntotal} chunks to {output}: {progress.summary()}")
+    logger.info(f"[INGEST] Index stats: {json.dumps(stats)}")
+
 
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", default=DATA_PATH)
+    parser.add_argument("--output", default=VECTORSTORE_PATH)
+    parser.add_argument("--rebuild", action="store_true", help="ignore the manifest and re-embed every PDF")
+    parser.add_argument("--workers", type=int, default=INGEST_WORKERS, help="PDF parsing processes")
+    parser.add_argument("--batch-size", type=int, default=EMBED_BATCH_SIZE, help="chunks per embedding call")
+    parser.add_argument("--chunking", choices=CHUNK_STRATEGIES, default=CHUNK_STRATEGY)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="characters per chunk")
+    parser.add_argument("--chunk-overlap", type=int, default=CHUNK_OVERLAP, help="characters repeated between chunks")
+    parser.add_argument("--dedup-threshold", type=float, default=CHUNK_DEDUP_THRESHOLD,
+                        help="MinHash Jaccard estimate above which a chunk is dropped (1 disables)")
+    parser.add_argument("--index-type", choices=INDEX_TYPES, default=os.getenv("FAISS_INDEX_TYPE", "flat"),
+                        help="used when the index is (re)built; incremental runs keep the existing type")
+    parser.add_argument("--nlist", type=int, help="IVF-PQ: coarse centroids (default 4*sqrt(n))")
+    parser.add_argument("--pq-m", type=int, help="IVF-PQ: sub-quantizers, must divide the dimension")
+    parser.add_argument("--pq-bits", type=int, help="IVF-PQ: bits per sub-quantizer code")
+    parser.add_argument("--nprobe", type=int, help="IVF-PQ: lists searched per query")
+    parser.add_argument("--hnsw-m", type=int, help="HNSW: graph neighbours per node")
+    parser.add_argument("--ef-construction", type=int, help="HNSW: build-time beam width")
+    parser.add_argument("--ef-search", type=int, help="HNSW: query-time beam width")
+    return parser.parse_args()
 
-# 4 store embedding on FAISS [cloud]
-DB_FAISS_PATH = os.path.abspath("../../../Assets/vectorstore")
-print("Loading FAISS from:", DB_FAISS_PATH)
 
-db = FAISS.from_documents(text_chunks,embedding_model)
-db.save_local(DB_FAISS_PATH)
\ No newline at end of file
+if __name__ == "__main__":
+    args = parse_args()
+    overrides = {
+        "nlist": args.nlist, "pq_m": args.pq_m, "pq_bits": args.pq_bits, "nprobe": args.nprobe,
+        "hnsw_m": args.hnsw_m, "ef_construction": args.ef_construction, "ef_search": args.ef_search,
+    }
+    chunking = chunking_config(args.chunking, args.chunk_size, args.chunk_overlap, args.dedup_threshold)
+    ingest(args.docs, args.output, args.index_type, overrides, rebuild=args.rebuild,
+           workers=args.workers, batch_size=args.batch_size, chunking=chunking)
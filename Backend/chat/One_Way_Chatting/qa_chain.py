@@ -1,23 +1,17 @@
-from langchain_community.vectorstores import FAISS
 from langchain_core.runnables import RunnablePassthrough
-from langchain_huggingface import HuggingFaceEmbeddings
 from langchain_core.prompts import PromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from chat.One_Way_Chatting.connect_memory_for_llm import llm
 from chat.One_Way_Chatting.qa_prompt import custom_prompt_template
 from chat.One_Way_Chatting.OutPutState import OutPutState
+from utils.vectorstore_registry import vectorstore_registry
 def set_custom_prompt(prompt_template: str):
     return PromptTemplate(template=prompt_template, input_variables=["context", "question"])
 
 prompt = set_custom_prompt(custom_prompt_template)
 
 
-DB_FAISS_PATH = "../../../vectorstore/db_faiss"
-embedding_model = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
-
-vectorstore = FAISS.load_local(DB_FAISS_PATH, embedding_model, allow_dangerous_deserialization=True)
-
-retriever = vectorstore.as_retriever(
+retriever = vectorstore_registry.retriever(
     search_type="similarity_score_threshold",
     search_kwargs={"k": 1, "score_threshold": 0.1}
 )
@@ -1,26 +1,42 @@
+import asyncio
 import json
 import logging
+import random
 import re
 from typing import Dict, Any, List
 from langgraph.graph import StateGraph, END
 from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
-from langgraph.checkpoint.memory import MemorySaver
 from langgraph.types import Command
+from langchain_core.runnables import RunnableConfig
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
 from chat.Two_way_Chatting.Main.Flow.chat_state import chat_interface_state
 from chat.Two_way_Chatting.Main.Flow.model_config import load_llm
 from chat.Two_way_Chatting.Main.Flow.MessageFilterModel import parser
-from chat.Two_way_Chatting.Main.Flow.model_config import two_way_chatting_qa_chain
+from chat.Two_way_Chatting.Main.Flow.message_gate import medical_message_gate
+from chat.Two_way_Chatting.Main.Flow.semantic_cache import semantic_response_cache
+from chat.Two_way_Chatting.Main.Flow.patient_facts import merge_extracted_info, render_fact_lists
+from chat.Two_way_Chatting.Memory.memory_strategies import memory_strategy
+from chat.Two_way_Chatting.Prompts.prompt_registry import prompt_registry
+from chat.Two_way_Chatting.Prompts import enhanced_graph_prompts as prompts
+from utils.checkpointer import checkpointer
+from chat.Two_way_Chatting.Main.Flow.model_config import (
+    two_way_chatting_qa_chain, RAG_CONTEXT_MODE, aretrieve_context
+)
 
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Every turn ends by compacting conversation memory
+MEMORY_NODE = "manage_conversation_memory"
+
+# Tag attached to the final response LLM call so its tokens can be picked out of astream_events
+RESPONSE_STREAM_TAG = "doctor_response"
+
 # FastAPI app
 app = FastAPI(title="Medical Chat Assistant", version="1.0.0")
-memory = MemorySaver()
 
 class ChatRequest(BaseModel):
     message: str
@@ -89,6 +105,23 @@ class DoctorPersonality:
         else:
             return "I understand this is bothering you, and I'm here to help figure it out."
 
+# Prompt templates, compiled once: static instructions first, per-request data last
+EXTRACTION_PROMPT = "extraction"
+MEDICATION_PROMPT = "medication"
+DOCTOR_RESPONSE_PROMPT = "doctor_response"
+VALIDATION_PROMPT = "validation"
+
+prompt_registry.register(EXTRACTION_PROMPT, prompts.EXTRACTION_PREFIX, prompts.EXTRACTION_TAIL)
+prompt_registry.register(MEDICATION_PROMPT, prompts.MEDICATION_PREFIX, prompts.MEDICATION_TAIL)
+prompt_registry.register(
+    DOCTOR_RESPONSE_PROMPT, prompts.DOCTOR_RESPONSE_PREFIX, prompts.DOCTOR_RESPONSE_TAIL,
+    static_fields={
+        f"{pattern}_line": DoctorPersonality.get_sarcastic_response(pattern)
+        for pattern in ("vague_symptoms", "self_diagnosis", "immediate_medicine")
+    },
+)
+prompt_registry.register(VALIDATION_PROMPT, prompts.VALIDATION_PREFIX, prompts.VALIDATION_TAIL)
+
 def analyze_message_pattern(message: str, conversation_history: List) -> str:
     """
     Analyze user message patterns to determine appropriate response style
@@ -115,121 +148,47 @@ def analyze_message_pattern(message: str, conversation_history: List) -> str:
     
     return "normal"
 
-def enhanced_medical_information_extraction(state: chat_interface_state) -> Dict[str, Any]:
+def get_last_user_message(state: chat_interface_state) -> str:
     """
-    Enhanced extraction with better medical context understanding
+    Return the latest HumanMessage content from the conversation (stripped)
     """
-    last_user_message = ""
     for message in reversed(state["messages"]):
         if isinstance(message, HumanMessage):
-            last_user_message = message.content.strip()
-            break
-
-    if not last_user_message:
-        return {}
+            return message.content.strip()
+    return ""
 
+def build_extraction_prompt(state: chat_interface_state, last_user_message: str) -> str:
+    """
+    Build the system prompt used for medical information extraction
+    """
     # Build comprehensive medical context
     user_info = state.get("user_info", {})
     current_symptoms = state.get("symptoms", [])
     current_medications = state.get("medications_taken", [])
     current_history = state.get("medical_history", [])
-    
-    system_prompt = f"""
-You are an expert medical information extraction system. Extract comprehensive medical information from the user's message.
-
-PATIENT CONTEXT:
-- Age: {user_info.get('age', 'Unknown')}
-- Gender: {user_info.get('gender', 'Unknown')}
-- Known Symptoms: {', '.join(current_symptoms) if current_symptoms else 'None'}
-- Current Medications: {', '.join(current_medications) if current_medications else 'None'}
-- Medical History: {', '.join(current_history) if current_history else 'None'}
-
-USER MESSAGE: "{last_user_message}"
-
-Extract the following information with high accuracy:
-
-1. SYMPTOMS - Be specific and detailed:
-   - Include location, severity (1-10), duration, quality (sharp, dull, throbbing, etc.)
-   - Associated symptoms (nausea with headache, etc.)
-   - Timing patterns (morning, after eating, etc.)
-
-2. MEDICATIONS - Include:
-   - Names, dosages, frequency, duration of use
-   - Over-the-counter and prescription drugs
-   - Supplements and herbal remedies
-
-3. MEDICAL HISTORY:
-   - Past surgeries, chronic conditions, family history
-   - Previous similar episodes
-   - Allergies and adverse reactions
-
-4. CONTEXTUAL FACTORS:
-   - Recent travel, stress, diet changes
-   - Activity level, sleep patterns
-   - Environmental factors
-
-5. PATIENT COMMUNICATION STYLE:
-   - Anxiety level (low/medium/high)
-   - Health literacy (basic/intermediate/advanced)
-   - Communication preference (detailed/brief)
-
-Return ONLY valid JSON:
-{{
-    "symptoms": [
-        {{
-            "name": "specific symptom name",
-            "location": "body part/region",
-            "severity": "1-10 or description",
-            "duration": "how long",
-            "quality": "sharp/dull/burning/etc",
-            "triggers": ["what makes worse"],
-            "relievers": ["what makes better"],
-            "associated_symptoms": ["related symptoms"]
-        }}
-    ],
-    "medications": [
-        {{
-            "name": "medication name",
-            "dosage": "amount and unit",
-            "frequency": "how often",
-            "duration": "how long taking",
-            "reason": "why taking"
-        }}
-    ],
-    "medical_history": [
-        {{
-            "condition": "condition name",
-            "year": "when diagnosed/occurred",
-            "status": "active/resolved/chronic",
-            "treatment": "how treated"
-        }}
-    ],
-    "lifestyle_factors": {{
-        "sleep": "sleep pattern info",
-        "stress": "stress level/sources",
-        "diet": "recent changes or relevant info",
-        "exercise": "activity level",
-        "smoking": "smoking status",
-        "alcohol": "alcohol consumption"
-    }},
-    "urgency_indicators": {{
-        "level": "low/medium/high/emergency",
-        "red_flags": ["concerning symptoms"],
-        "reasoning": "why this urgency level"
-    }},
-    "patient_communication": {{
-        "anxiety_level": "low/medium/high",
-        "health_literacy": "basic/intermediate/advanced",
-        "primary_concern": "main worry/question",
-        "communication_style": "detailed/brief/anxious/confident"
-    }},
-    "missing_info_needed": ["what additional info would help diagnosis"],
-    "confidence": "high/medium/low"
-}}
-"""
+
+    return prompt_registry.render(
+        EXTRACTION_PROMPT,
+        age=user_info.get('age', 'Unknown'),
+        gender=user_info.get('gender', 'Unknown'),
+        symptoms=', '.join(current_symptoms) if current_symptoms else 'None',
+        medications=', '.join(current_medications) if current_medications else 'None',
+        medical_history=', '.join(current_history) if current_history else 'None',
+        message=last_user_message,
+    )
+
+async def aenhanced_medical_information_extraction(state: chat_interface_state) -> Dict[str, Any]:
+    """
+    Enhanced extraction with better medical context understanding
+    """
+    last_user_message = get_last_user_message(state)
+    if not last_user_message:
+        return {}
+
+    system_prompt = build_extraction_prompt(state, last_user_message)
 
     try:
-        result = load_llm.invoke([SystemMessage(content=system_prompt)])
+        result = await load_llm.ainvoke([SystemMessage(content=system_prompt)])
         extracted_data = json.loads(result.content)
         logger.info(f"Enhanced medical extraction completed with confidence: {extracted_data.get('confidence')}")
         return extracted_data
@@ -240,72 +199,25 @@ Return ONLY valid JSON:
         logger.error(f"Enhanced medical extraction error: {str(e)}")
         return {}
 
-def generate_medication_recommendations(symptoms: List, patient_context: Dict, rag_context: str) -> Dict[str, Any]:
+def build_medication_prompt(symptoms: List, patient_context: Dict, rag_context: str) -> str:
+    """
+    Build the system prompt used for medication recommendations
+    """
+    return prompt_registry.render(
+        MEDICATION_PROMPT,
+        patient_context=json.dumps(patient_context, indent=2),
+        symptoms=json.dumps(symptoms, indent=2),
+        rag_context=rag_context,
+    )
+
+async def agenerate_medication_recommendations(symptoms: List, patient_context: Dict, rag_context: str) -> Dict[str, Any]:
     """
     Generate detailed medication recommendations with proper medical formatting
     """
-    system_prompt = f"""
-You are Dr. Sarah, an experienced physician. Generate medication recommendations based on the patient's symptoms and context.
-
-PATIENT CONTEXT:
-{json.dumps(patient_context, indent=2)}
-
-SYMPTOMS:
-{json.dumps(symptoms, indent=2)}
-
-MEDICAL KNOWLEDGE BASE:
-{rag_context}
-
-MEDICATION RECOMMENDATION GUIDELINES:
-1. Always start with non-pharmacological treatments when appropriate
-2. Recommend over-the-counter options before prescription medications
-3. Include dosage, frequency, duration, and important warnings
-4. Explain mechanism of action in simple terms
-5. Mention potential side effects and contraindications
-6. Provide alternative options
-7. Include when to seek further medical care
-
-Return medication recommendations in this JSON format:
-{{
-    "primary_recommendations": [
-        {{
-            "medication_name": "Generic Name (Brand Name)",
-            "category": "Pain reliever/Antihistamine/etc",
-            "dosage": "specific dosage",
-            "frequency": "how often",
-            "duration": "how long to take",
-            "mechanism": "how it works (simple explanation)",
-            "side_effects": ["common side effects"],
-            "contraindications": ["when not to use"],
-            "special_instructions": "take with food, etc",
-            "otc_prescription": "OTC or Prescription"
-        }}
-    ],
-    "alternative_options": [
-        {{
-            "medication_name": "Alternative option",
-            "reason": "why this alternative",
-            "dosage": "dosage info"
-        }}
-    ],
-    "non_pharmacological": [
-        {{
-            "treatment": "rest, heat, etc",
-            "instructions": "how to do it",
-            "expected_timeline": "when to expect results"
-        }}
-    ],
-    "warning_signs": ["symptoms that require immediate medical attention"],
-    "follow_up": "when to see a doctor if symptoms persist",
-    "confidence_level": "high/medium/low",
-    "disclaimer": "appropriate medical disclaimer"
-}}
-
-Be thorough but accessible. Remember, you're talking to a patient, not another doctor.
-"""
+    system_prompt = build_medication_prompt(symptoms, patient_context, rag_context)
 
     try:
-        result = load_llm.invoke([SystemMessage(content=system_prompt)])
+        result = await load_llm.ainvoke([SystemMessage(content=system_prompt)])
         return json.loads(result.content)
     except Exception as e:
         logger.error(f"Medication recommendation error: {str(e)}")
@@ -370,263 +282,266 @@ def format_medication_response(recommendations: Dict[str, Any]) -> str:
 
     return response
 
-def generate_doctor_response_with_personality(state: chat_interface_state, rag_context: str = "", 
-                                            extracted_info: Dict[str, Any] = None) -> str:
+def wants_medication_recommendations(state: chat_interface_state, latest_message: str) -> bool:
+    """
+    Medication recommendations are only generated when symptoms are known and the patient asks for treatment
+    """
+    return bool(state.get("symptoms")) and any(
+        keyword in latest_message.lower() for keyword in ['medicine', 'medication', 'treatment', 'prescribe']
+    )
+
+def build_doctor_response_prompt(state: chat_interface_state, latest_message: str, message_pattern: str,
+                                 rag_context: str = "", extracted_info: Dict[str, Any] = None,
+                                 medication_response: str = "") -> str:
+    """
+    Build Dr. Sarah's system prompt for the final response
+    """
+    # Build patient context
+    user_info = state.get("user_info", {})
+    symptoms = state.get("symptoms", [])
+    medications = state.get("medications_taken", [])
+    medical_history = state.get("medical_history", [])
+    urgency = extracted_info.get("urgency_indicators", {}) if extracted_info else {}
+
+    # Build conversation context from the configured memory strategy
+    conversation_history = memory_strategy.render_history(state)
+
+    return prompt_registry.render(
+        DOCTOR_RESPONSE_PROMPT,
+        name=user_info.get('name', 'Not provided'),
+        age=user_info.get('age', 'Not provided'),
+        gender=user_info.get('gender', 'Not provided'),
+        symptoms=', '.join(symptoms) if symptoms else 'None reported',
+        medications=', '.join(medications) if medications else 'None',
+        medical_history=', '.join(medical_history) if medical_history else 'None',
+        urgency=urgency.get('level', 'Normal'),
+        conversation=chr(10).join(conversation_history) if conversation_history else 'This is the start of our conversation',
+        rag_context=rag_context if rag_context else "Standard medical knowledge",
+        extracted_info=json.dumps(extracted_info, indent=2) if extracted_info else "No specific medical info extracted",
+        medication_response=medication_response if medication_response else "No medication recommendations generated",
+        message=latest_message,
+        message_pattern=message_pattern,
+    )
+
+def log_doctor_response(state: chat_interface_state, message_pattern: str, extracted_info: Dict[str, Any] = None):
+    """
+    Log response generation details
+    """
+    urgency = extracted_info.get("urgency_indicators", {}) if extracted_info else {}
+    # Determine if this is first interaction
+    is_first_interaction = len(state["messages"]) <= 1
+    logger.info(f"Generated personality-driven response - Pattern: {message_pattern}, "
+               f"First interaction: {is_first_interaction}, "
+               f"Urgency: {urgency.get('level', 'normal')}")
+
+def doctor_fallback_response(state: chat_interface_state) -> str:
+    """
+    Fallback with personality when the response LLM call fails
+    """
+    user_name = state.get("user_info", {}).get("name", "")
+    if user_name:
+        return f"Hey {user_name}, I'm having a bit of a brain fog moment here! 😅 " \
+               f"Can you help me out by asking your question again? I promise I'll be more helpful this time!"
+    else:
+        return "Well, this is embarrassing! 😳 I seem to be having a technical hiccup. " \
+               "Mind giving me another shot at helping you? I'm usually much sharper than this!"
+
+async def agenerate_doctor_response_with_personality(state: chat_interface_state, rag_context: str = "",
+                                                     extracted_info: Dict[str, Any] = None) -> str:
     """
     Generate responses with Dr. Sarah's personality - professional but engaging
     """
     try:
-        # Get user's latest message and analyze pattern
-        latest_message = ""
-        for message in reversed(state["messages"]):
-            if isinstance(message, HumanMessage):
-                latest_message = message.content.strip()
-                break
-
+        latest_message = get_last_user_message(state)
         message_pattern = analyze_message_pattern(latest_message, state["messages"])
-        
-        # Build patient context
-        user_info = state.get("user_info", {})
-        symptoms = state.get("symptoms", [])
-        medications = state.get("medications_taken", [])
-        medical_history = state.get("medical_history", [])
-        urgency = extracted_info.get("urgency_indicators", {}) if extracted_info else {}
-        
-        # Determine if this is first interaction
-        is_first_interaction = len(state["messages"]) <= 1
-        
-        # Generate medication recommendations if appropriate
+
         medication_response = ""
-        if symptoms and any(keyword in latest_message.lower() for keyword in ['medicine', 'medication', 'treatment', 'prescribe']):
-            med_recommendations = generate_medication_recommendations(symptoms, user_info, rag_context)
+        if wants_medication_recommendations(state, latest_message):
+            med_recommendations = await agenerate_medication_recommendations(state.get("symptoms", []), state.get("user_info", {}), rag_context)
             medication_response = format_medication_response(med_recommendations)
 
-        # Build conversation context
-        conversation_history = []
-        for msg in state["messages"][-6:]:
-            if isinstance(msg, HumanMessage):
-                conversation_history.append(f"Patient: {msg.content}")
-            elif isinstance(msg, AIMessage):
-                conversation_history.append(f"Dr. Sarah: {msg.content}")
-
-        # Build comprehensive system prompt
-        system_prompt = f"""
-You are Dr. Sarah, a brilliant and caring family physician with 15+ years of experience. You have a warm personality with just the right amount of humor and gentle sarcasm when appropriate. You're known for:
-
-1. **Professional Excellence:** Evidence-based medicine with clear explanations
-2. **Engaging Personality:** Friendly, slightly sarcastic when patients are vague, but always caring
-3. **Clear Communication:** Using markdown formatting for organized, readable responses
-4. **Personalized Care:** Remembering patient details and building rapport
-
-PATIENT PROFILE:
-- Name: {user_info.get('name', 'Not provided')}
-- Age: {user_info.get('age', 'Not provided')}
-- Gender: {user_info.get('gender', 'Not provided')}
-- Current Symptoms: {', '.join(symptoms) if symptoms else 'None reported'}
-- Medications: {', '.join(medications) if medications else 'None'}
-- Medical History: {', '.join(medical_history) if medical_history else 'None'}
-- Urgency Level: {urgency.get('level', 'Normal')}
-
-CONVERSATION CONTEXT:
-{chr(10).join(conversation_history[-4:]) if conversation_history else 'This is the start of our conversation'}
-
-CURRENT MESSAGE: "{latest_message}"
-MESSAGE PATTERN: {message_pattern}
-
-MEDICAL KNOWLEDGE BASE:
-{rag_context if rag_context else "Standard medical knowledge"}
-
-EXTRACTED MEDICAL INFO:
-{json.dumps(extracted_info, indent=2) if extracted_info else "No specific medical info extracted"}
-
-MEDICATION RECOMMENDATIONS:
-{medication_response if medication_response else "No medication recommendations generated"}
-
-RESPONSE GUIDELINES:
-
-**For First Interactions:**
-- Use warm, welcoming greeting
-- If no name provided, ask for it in a friendly way
-- Set expectations about how you work
-
-**For Vague Symptoms ({message_pattern == 'vague_symptoms'}):**
-- Use gentle sarcasm with humor: "{DoctorPersonality.get_sarcastic_response('vague_symptoms')}"
-- Then ask specific, targeted questions
-- Show you care while encouraging more details
-
-**For Self-Diagnosis Attempts ({message_pattern == 'self_diagnosis'}):**
-- Acknowledge their research with humor: "{DoctorPersonality.get_sarcastic_response('self_diagnosis')}"
-- Redirect to proper symptom assessment
-- Explain why proper evaluation matters
-
-**For Immediate Medicine Requests ({message_pattern == 'immediate_medicine'}):**
-- Use playful sarcasm: "{DoctorPersonality.get_sarcastic_response('immediate_medicine')}"
-- Explain need for proper assessment first
-- Then guide through symptom evaluation
-
-**For High Urgency Situations:**
-- Drop the humor, be serious and empathetic
-- Provide clear, immediate guidance
-- Emphasize need for professional care
-
-**Response Formatting:**
-- Use markdown headers (##, ###) for organization
-- Use bullet points for lists
-- Use **bold** for important information
-- Use *italics* for emphasis
-- Include relevant emojis sparingly
-- If providing medication info, use the formatted medication response
-
-**Personality Traits to Show:**
-- Confident but humble
-- Caring but not overly sentimental  
-- Humorous when appropriate, serious when needed
-- Detail-oriented but accessible
-- Remember previous conversation details
-
-**CRITICAL:** 
-- If patient asks for "best 3 medicines" or similar, provide detailed markdown-formatted medication information
-- Always include appropriate medical disclaimers
-- Escalate serious symptoms appropriately
-- Ask follow-up questions to gather needed information
-- Address the patient by name when known
-
-Generate a response that feels like talking to a real doctor who cares about the patient and has a great bedside manner with just the right amount of personality.
-"""
-
-        result = load_llm.invoke([SystemMessage(content=system_prompt)])
-        
-        # Log response generation
-        logger.info(f"Generated personality-driven response - Pattern: {message_pattern}, "
-                   f"First interaction: {is_first_interaction}, "
-                   f"Urgency: {urgency.get('level', 'normal')}")
-        
+        system_prompt = build_doctor_response_prompt(
+            state, latest_message, message_pattern,
+            rag_context=rag_context, extracted_info=extracted_info, medication_response=medication_response
+        )
+        result = await load_llm.ainvoke(
+            [SystemMessage(content=system_prompt)],
+            config={"tags": [RESPONSE_STREAM_TAG]}
+        )
+        log_doctor_response(state, message_pattern, extracted_info)
         return result.content
-        
+
     except Exception as e:
         logger.error(f"Personality response generation error: {str(e)}")
-        
-        # Fallback with personality
-        user_name = state.get("user_info", {}).get("name", "")
-        if user_name:
-            return f"Hey {user_name}, I'm having a bit of a brain fog moment here! 😅 " \
-                   f"Can you help me out by asking your question again? I promise I'll be more helpful this time!"
+        return doctor_fallback_response(state)
+
+
+def build_rejection_command(state: chat_interface_state, validation_result: Dict[str, Any]) -> Command:
+    """
+    Polite refusal for non-medical messages
+    """
+    greeting = DoctorPersonality.get_greeting_style(state.get("user_info", {}))
+
+    rejection_message = f"{greeting}\n\n" \
+                      f"I'm specifically designed to help with health-related questions and medical concerns. " \
+                      f"{validation_result.get('reason', '')} What health issue can I help you with today?"
+
+    return Command(
+        update={"messages": [AIMessage(content=rejection_message)]},
+        goto=MEMORY_NODE
+    )
+
+def build_rag_query(state: chat_interface_state) -> str:
+    """
+    Build better query for RAG from the latest message and known symptoms
+    """
+    user_message = state["latest_user_message"]
+    symptoms = state.get("symptoms", [])
+    return f"{user_message} {' '.join(symptoms)}"
+
+async def afetch_rag_context(state: chat_interface_state) -> str:
+    """
+    Enhanced RAG retrieval with better context
+    """
+    try:
+        context_query = build_rag_query(state)
+        if RAG_CONTEXT_MODE == "chain":
+            rag_response = await two_way_chatting_qa_chain.ainvoke(context_query)
+            rag_context = rag_response.get("result", "") if isinstance(rag_response, dict) else str(rag_response)
         else:
-            return "Well, this is embarrassing! 😳 I seem to be having a technical hiccup. " \
-                   "Mind giving me another shot at helping you? I'm usually much sharper than this!"
+            rag_context = await aretrieve_context(context_query)
+        logger.info(f"Enhanced RAG retrieval - Query: {context_query[:100]}")
+        return rag_context
+    except Exception as e:
+        logger.warning(f"RAG retrieval failed: {str(e)}")
+        return ""
 
-def enhanced_medical_chat_handler(state: chat_interface_state) -> chat_interface_state:
+def apply_extracted_info(state: chat_interface_state, extracted_info: Dict[str, Any]):
     """
-    Enhanced chat handler with personality and better medical understanding
+    Update patient state with enhanced information. Facts are merged field by field under a
+    canonical name, and the prompt-facing lists are re-rendered from them so they stay bounded.
+    """
+    if not extracted_info:
+        return
+
+    patient_facts = merge_extracted_info(state.get("patient_facts"), extracted_info)
+    state["patient_facts"] = patient_facts
+    state["symptoms"], state["medications_taken"], state["medical_history"] = render_fact_lists(patient_facts)
+
+    # Store enhanced medical context
+    state["detailed_medical_info"] = extracted_info
+
+def build_response_command(state: chat_interface_state, doctor_response: str) -> Command:
     """
+    Update state with comprehensive information
+    """
+    updated_messages = state["messages"] + [AIMessage(content=doctor_response)]
+    
+    return Command(
+        update={
+            "messages": updated_messages,
+            "symptoms": state.get("symptoms", []),
+            "medications_taken": state.get("medications_taken", []),
+            "medical_history": state.get("medical_history", []),
+            "user_info": state.get("user_info", {}),
+            "latest_user_message": state.get("latest_user_message", ""),
+            "detailed_medical_info": state.get("detailed_medical_info", {}),
+            "patient_facts": state.get("patient_facts", {}),
+        },
+        goto=MEMORY_NODE,
+    )
+
+def is_first_turn(state: chat_interface_state) -> bool:
+    """
+    Opening message of a session: exactly one patient message and no reply yet
+    """
+    messages = state.get("messages", [])
+    return sum(isinstance(msg, HumanMessage) for msg in messages) == 1 and \
+        not any(isinstance(msg, AIMessage) for msg in messages)
+
+def build_error_command() -> Command:
+    """
+    Personality-driven error response
+    """
+    error_responses = [
+        "Oops! Looks like I had a bit of a brain freeze there! 🧠❄️ Can you try again?",
+        "Well, that's embarrassing! My medical brain just hiccupped. Give me another shot?",
+        "Houston, we have a problem! 🚀 But don't worry, just ask me again and I'll be back to my sharp self!"
+    ]
+    
+    error_response = random.choice(error_responses)
+    error_response += "\n\n*If you have urgent symptoms, please contact your healthcare provider or emergency services.*"
+    
+    return Command(
+        update={"messages": [AIMessage(content=error_response)]},
+        goto=MEMORY_NODE
+    )
+
+async def aenhanced_medical_chat_handler(state: chat_interface_state, config: RunnableConfig = None) -> chat_interface_state:
+    """
+    Async chat handler used by the graph. Validation, RAG retrieval and extraction only read
+    the incoming state, so they run concurrently and the reply is generated once all three are done.
+    """
+    turn = prompt_registry.begin_turn()
     try:
-        # Step 1: Content validation (keeping existing logic)
-        validation_result = validate_medical_content_with_llm(state)
-        
-        if not validation_result.get("allowed", False):
-            user_name = state.get("user_info", {}).get("name", "")
-            greeting = DoctorPersonality.get_greeting_style(state.get("user_info", {}))
-            
-            rejection_message = f"{greeting}\n\n" \
-                              f"I'm specifically designed to help with health-related questions and medical concerns. " \
-                              f"{validation_result.get('reason', '')} What health issue can I help you with today?"
-            
-            return Command(
-                update={"messages": [AIMessage(content=rejection_message)]},
-                goto=END
+        # Step 0: Near-identical opening messages reuse a cached reply text
+        first_turn = is_first_turn(state)
+        cached_response = None
+        if first_turn:
+            cached_response = await semantic_response_cache.alookup(state["latest_user_message"], state.get("user_info", {}))
+
+        # Step 1-3: Validation, RAG retrieval and extraction fan out together; a cache hit
+        # still validates and extracts this message, only retrieval and generation are skipped
+        if cached_response:
+            validation_result, extracted_info = await asyncio.gather(
+                avalidate_medical_content_with_llm(state),
+                aenhanced_medical_information_extraction(state),
             )
-
-        # Step 2: Enhanced RAG retrieval with better context
-        try:
-            # Build better query for RAG
-            user_message = state["latest_user_message"]
-            symptoms = state.get("symptoms", [])
-            context_query = f"{user_message} {' '.join(symptoms)}"
-            
-            rag_response = two_way_chatting_qa_chain.invoke(context_query)
-            rag_context = rag_response.get("result", "") if isinstance(rag_response, dict) else str(rag_response)
-            logger.info(f"Enhanced RAG retrieval - Query: {context_query[:100]}")
-        except Exception as e:
-            logger.warning(f"RAG retrieval failed: {str(e)}")
             rag_context = ""
+        else:
+            validation_result, rag_context, extracted_info = await asyncio.gather(
+                avalidate_medical_content_with_llm(state),
+                afetch_rag_context(state),
+                aenhanced_medical_information_extraction(state),
+            )
 
-        # Step 3: Enhanced medical information extraction
-        extracted_info = enhanced_medical_information_extraction(state)
-        
-        # Step 4: Update patient state with enhanced information
-        if extracted_info:
-            # Update symptoms with detailed information
-            if extracted_info.get("symptoms"):
-                detailed_symptoms = []
-                for symptom in extracted_info["symptoms"]:
-                    symptom_desc = f"{symptom.get('name', 'Unknown symptom')}"
-                    if symptom.get('location'):
-                        symptom_desc += f" in {symptom['location']}"
-                    if symptom.get('severity'):
-                        symptom_desc += f" (severity: {symptom['severity']})"
-                    if symptom.get('duration'):
-                        symptom_desc += f" for {symptom['duration']}"
-                    detailed_symptoms.append(symptom_desc)
-                
-                state["symptoms"] = list(set(state.get("symptoms", []) + detailed_symptoms))
-
-            # Update medications with detailed information
-            if extracted_info.get("medications"):
-                detailed_meds = []
-                for med in extracted_info["medications"]:
-                    med_desc = f"{med.get('name', 'Unknown medication')}"
-                    if med.get('dosage'):
-                        med_desc += f" {med['dosage']}"
-                    if med.get('frequency'):
-                        med_desc += f" {med['frequency']}"
-                    detailed_meds.append(med_desc)
-                
-                state["medications_taken"] = list(set(state.get("medications_taken", []) + detailed_meds))
-
-            # Store enhanced medical context
-            state["detailed_medical_info"] = extracted_info
+        if not validation_result.get("allowed", False):
+            return build_rejection_command(state, validation_result)
+
+        # Step 4: Update patient state with enhanced information (name canonicalization embeds, keep it off the loop)
+        await asyncio.to_thread(apply_extracted_info, state, extracted_info)
+        if cached_response:
+            return build_response_command(state, cached_response)
 
         # Step 5: Generate personality-driven response
-        doctor_response = generate_doctor_response_with_personality(
-            state, 
-            rag_context=rag_context, 
+        doctor_response = await agenerate_doctor_response_with_personality(
+            state,
+            rag_context=rag_context,
             extracted_info=extracted_info
         )
-        
+        if first_turn and doctor_response != doctor_fallback_response(state):
+            await semantic_response_cache.astore(
+                state["latest_user_message"], state.get("user_info", {}), doctor_response
+            )
+
         # Step 6: Update state with comprehensive information
-        updated_messages = state["messages"] + [AIMessage(content=doctor_response)]
-        
-        return Command(
-            update={
-                "messages": updated_messages,
-                "symptoms": state.get("symptoms", []),
-                "medications_taken": state.get("medications_taken", []),
-                "medical_history": state.get("medical_history", []),
-                "user_info": state.get("user_info", {}),
-                "latest_user_message": state.get("latest_user_message", ""),
-                "detailed_medical_info": state.get("detailed_medical_info", {}),
-            },
-            goto=END,
-        )
-    
+        return build_response_command(state, doctor_response)
+
     except Exception as e:
         logger.error(f"Enhanced chat handler error: {str(e)}", exc_info=True)
-        
-        # Personality-driven error response
-        error_responses = [
-            "Oops! Looks like I had a bit of a brain freeze there! 🧠❄️ Can you try again?",
-            "Well, that's embarrassing! My medical brain just hiccupped. Give me another shot?",
-            "Houston, we have a problem! 🚀 But don't worry, just ask me again and I'll be back to my sharp self!"
-        ]
-        
-        import random
-        error_response = random.choice(error_responses)
-        error_response += "\n\n*If you have urgent symptoms, please contact your healthcare provider or emergency services.*"
-        
-        return Command(
-            update={"messages": [AIMessage(content=error_response)]},
-            goto=END
-        )
+        return build_error_command()
+    finally:
+        prompt_registry.end_turn(turn, (config or {}).get("configurable", {}).get("thread_id"))
+
+async def manage_conversation_memory(state: chat_interface_state) -> Dict[str, Any]:
+    """
+    Trim/summarize the stored conversation so state and checkpoints stay bounded
+    """
+    try:
+        return await memory_strategy.acompact(state)
+    except Exception as e:
+        logger.error(f"Conversation memory compaction error: {str(e)}")
+        return {}
 
 # Update the graph building function
 def build_enhanced_medical_chat_graph() -> StateGraph:
@@ -637,14 +552,15 @@ def build_enhanced_medical_chat_graph() -> StateGraph:
         builder = StateGraph(chat_interface_state)
         
         # Add the enhanced chat handler node
-        builder.add_node("enhanced_medical_chat_handler", enhanced_medical_chat_handler)
+        builder.add_node("enhanced_medical_chat_handler", aenhanced_medical_chat_handler)
+        builder.add_node(MEMORY_NODE, manage_conversation_memory)
         
         # Set entry and finish points
         builder.set_entry_point("enhanced_medical_chat_handler")
-        builder.set_finish_point("enhanced_medical_chat_handler")
+        builder.set_finish_point(MEMORY_NODE)
         
-        # Compile with memory checkpointer
-        graph = builder.compile(checkpointer=memory)
+        # Compile with the durable, bounded checkpointer
+        graph = builder.compile(checkpointer=checkpointer)
         
         logger.info("Enhanced medical chat graph with personality compiled successfully")
         return graph
@@ -657,20 +573,10 @@ def build_enhanced_medical_chat_graph() -> StateGraph:
 enhanced_graph = build_enhanced_medical_chat_graph()
 
 # Additional utility functions for better user experience
-def validate_medical_content_with_llm(state: chat_interface_state) -> Dict[str, Any]:
+def build_validation_prompt(state: chat_interface_state, last_user_message: str) -> str:
     """
-    Enhanced content validation with better medical context understanding
+    Build the system prompt used for medical content classification
     """
-    # Get the latest user message
-    last_user_message = ""
-    for message in reversed(state["messages"]):
-        if isinstance(message, HumanMessage):
-            last_user_message = message.content.strip()
-            break
-
-    if not last_user_message:
-        return {"allowed": False, "reason": "No valid user message found."}
-
     # Build conversation context
     conversation_context = []
     for msg in state["messages"][-4:]:
@@ -681,67 +587,16 @@ def validate_medical_content_with_llm(state: chat_interface_state) -> Dict[str,
 
     context_str = "\n".join(conversation_context) if conversation_context else "First message"
 
-    system_prompt = f"""
-You are a medical content classifier for Dr. Sarah's healthcare chat system. Determine if the user's message is medically relevant.
-
-CONVERSATION CONTEXT:
-{context_str}
-
-CURRENT MESSAGE: "{last_user_message}"
-
-ENHANCED CLASSIFICATION RULES:
-
-DEFINITELY ALLOWED (Medical Content):
-✓ Health symptoms, pain, discomfort descriptions
-✓ Medical questions and health concerns
-✓ Medication inquiries and side effects
-✓ Personal medical history sharing
-✓ Health-related greetings and check-ins
-✓ Follow-up questions about medical advice
-✓ Emergency or urgent health situations
-✓ Mental health and wellness questions
-✓ Preventive care and lifestyle health questions
-✓ Questions about medical procedures or tests
-✓ Asking for medical recommendations or treatment options
-
-PROBABLY ALLOWED (Context-Dependent):
-⚠️ General wellness and lifestyle questions
-⚠️ Nutrition and exercise questions related to health
-⚠️ Questions about medical professionals or healthcare system
-⚠️ Medical research or studies questions
-
-NOT ALLOWED (Non-Medical):
-✗ Pure entertainment (jokes, games, stories unrelated to health)
-✗ Technical support for non-medical issues
-✗ Political discussions unrelated to healthcare
-✗ General academic help unrelated to medicine
-✗ Financial advice unrelated to healthcare costs
-✗ Legal advice unrelated to medical law
-✗ Personal relationship advice unrelated to health
-
-RESPONSE FORMAT:
-{{
-    "allowed": true/false,
-    "reason": "clear explanation",
-    "confidence": "high/medium/low",
-    "medical_context_score": 1-10,
-    "suggested_response_tone": "professional/empathetic/urgent/educational/sarcastic"
-}}
-
-Be generous with health-related content but maintain boundaries for non-medical topics.
-"""
+    return prompt_registry.render(VALIDATION_PROMPT, conversation=context_str, message=last_user_message)
 
+def parse_validation_result(content: str) -> Dict[str, Any]:
+    """
+    Parse the classifier output, falling back to a permissive result on malformed JSON
+    """
     try:
-        result = load_llm.invoke([SystemMessage(content=system_prompt)])
-        parsed_result = json.loads(result.content)
-        
-        logger.info(f"Enhanced validation - Allowed: {parsed_result.get('allowed')}, "
-                   f"Medical score: {parsed_result.get('medical_context_score')}")
-        
-        return parsed_result
-        
+        parsed_result = json.loads(content)
     except json.JSONDecodeError:
-        logger.warning(f"JSON parsing error in validation: {result.content}")
+        logger.warning(f"JSON parsing error in validation: {content}")
         return {
             "allowed": True,
             "reason": "Fallback validation - proceeding with caution",
@@ -749,14 +604,54 @@ Be generous with health-related content but maintain boundaries for non-medical
             "medical_context_score": 5,
             "suggested_response_tone": "professional"
         }
-        
+
+    logger.info(f"Enhanced validation - Allowed: {parsed_result.get('allowed')}, "
+               f"Medical score: {parsed_result.get('medical_context_score')}")
+    return parsed_result
+
+def validation_error_result(error: Exception) -> Dict[str, Any]:
+    """
+    Result used when the classifier call itself fails
+    """
+    logger.error(f"Enhanced validation error: {str(error)}")
+    return {
+        "allowed": True,
+        "reason": "Technical validation issue - proceeding safely",
+        "confidence": "low",
+        "medical_context_score": 5,
+        "suggested_response_tone": "professional"
+    }
+
+def classify_locally(state: chat_interface_state, last_user_message: str) -> Dict[str, Any]:
+    """
+    Fast path: let the local gate decide clear cases so only ambiguous messages reach the LLM classifier
+    """
+    previous_user_messages = [
+        msg.content for msg in state["messages"][:-1] if isinstance(msg, HumanMessage)
+    ][-3:]
+    return medical_message_gate.classify(
+        last_user_message,
+        message_pattern=analyze_message_pattern(last_user_message, state["messages"]),
+        previous_user_messages=previous_user_messages,
+        known_symptoms=state.get("symptoms", []),
+    )
+
+async def avalidate_medical_content_with_llm(state: chat_interface_state) -> Dict[str, Any]:
+    """
+    Enhanced content validation with better medical context understanding
+    """
+    last_user_message = get_last_user_message(state)
+    if not last_user_message:
+        return {"allowed": False, "reason": "No valid user message found."}
+
+    local_result = classify_locally(state, last_user_message)
+    if local_result is not None:
+        return local_result
+
+    system_prompt = build_validation_prompt(state, last_user_message)
+
+    try:
+        result = await load_llm.ainvoke([SystemMessage(content=system_prompt)])
+        return parse_validation_result(result.content)
     except Exception as e:
-        logger.error(f"Enhanced validation error: {str(e)}")
-        return {
-            "allowed": True,
-            "reason": "Technical validation issue - proceeding safely",
-            "confidence": "low",
-            "medical_context_score": 5,
-            "suggested_response_tone": "professional"
-        }
-        
\ No newline at end of file
+        return validation_error_result(e)
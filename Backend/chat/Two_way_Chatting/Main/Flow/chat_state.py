@@ -1,6 +1,42 @@
-from typing import Annotated, List, Optional, TypedDict
+from typing import Annotated, Dict, List, Optional, TypedDict
 from langchain_core.messages import BaseMessage
 
+class SymptomFact(TypedDict, total=False):
+    name: str
+    location: str
+    severity: str
+    duration: str
+    quality: str
+    triggers: List[str]
+    relievers: List[str]
+    associated_symptoms: List[str]
+    updated_turn: int
+
+
+class MedicationFact(TypedDict, total=False):
+    name: str
+    dosage: str
+    frequency: str
+    duration: str
+    reason: str
+    updated_turn: int
+
+
+class HistoryFact(TypedDict, total=False):
+    condition: str
+    year: str
+    status: str
+    treatment: str
+    updated_turn: int
+
+
+class PatientFacts(TypedDict):
+    symptoms: Dict[str, SymptomFact]
+    medications: Dict[str, MedicationFact]
+    medical_history: Dict[str, HistoryFact]
+    turn: int
+
+
 class chat_interface_state(TypedDict, total=False):
     messages: Annotated[List[BaseMessage], "union"]  
     latest_user_message: Optional[str]
@@ -8,5 +44,8 @@ class chat_interface_state(TypedDict, total=False):
     symptoms: List[str]
     medications_taken: List[str]
     medical_history: List[str]
+    detailed_medical_info: dict
+    patient_facts: PatientFacts
+    conversation_summary: str
 
     
\ No newline at end of file
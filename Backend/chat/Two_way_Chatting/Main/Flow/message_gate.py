@@ -0,0 +1,169 @@
+import logging
+import os
+import re
+import threading
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Set LOCAL_MESSAGE_GATE=0 to send every message to the LLM classifier
+LOCAL_GATE_ENABLED = os.getenv("LOCAL_MESSAGE_GATE", "1") != "0"
+# Short replies inside an ongoing medical conversation ("yes", "since yesterday") are follow-ups
+FOLLOW_UP_MAX_WORDS = int(os.getenv("LOCAL_GATE_FOLLOW_UP_MAX_WORDS", "8"))
+STATS_LOG_EVERY = 100
+
+# Whole words only. Words that are just as common outside medicine ("cold", "heart", "period",
+# "doctor", "bug") are left out: they must not decide on their own that a message is medical.
+MEDICAL_TERMS = [
+    "pain", "painful", "ache", "aches", "aching", "headache", "migraine", "fever", "temperature", "chills",
+    "cough", "coughing", "flu", "sore", "throat", "nausea", "nauseous", "vomit", "vomiting",
+    "diarrhea", "diarrhoea", "constipation", "stomach", "abdominal", "cramps", "dizzy", "dizziness",
+    "rash", "itch", "itchy", "swelling", "swollen", "bleeding", "blood", "bruise", "infection", "infected",
+    "allergy", "allergic", "asthma", "wheezing", "breathing", "breath", "chest", "palpitations",
+    "diabetes", "insulin", "thyroid", "cholesterol", "tired", "fatigue", "weakness",
+    "insomnia", "sleep", "anxiety", "anxious", "depression", "depressed", "stress", "panic",
+    "injury", "injured", "sprain", "fracture", "burn", "wound", "sting", "bite", "bitten", "poisoning",
+    "jetlag", "pregnant", "pregnancy", "menstrual", "acne", "eczema", "skin", "eye", "ear", "nose",
+    "tooth", "toothache", "backache", "joint", "muscle", "symptom", "symptoms", "medicine", "medicines",
+    "medication", "medications", "tablet", "tablets", "pill", "pills", "dose", "dosage", "drug", "drugs",
+    "antibiotic", "antibiotics", "paracetamol", "ibuprofen", "aspirin", "prescription", "prescribe",
+    "hospital", "clinic", "surgery", "diagnosis", "diagnosed", "treatment", "therapy",
+    "vaccine", "vaccines", "health", "healthy", "sick", "ill", "unwell", "hurts", "hurt", "hurting", "disease",
+    "virus", "bacteria", "nutrition", "diet", "calories", "exercise",
+]
+
+NON_MEDICAL_TERMS = [
+    "poem", "joke", "story", "song", "lyrics", "movie", "movies", "series", "netflix", "football",
+    "cricket", "soccer", "nba", "stock", "stocks", "bitcoin", "crypto", "invest", "investment",
+    "code", "coding", "python", "javascript", "java", "programming", "compile", "homework",
+    "essay", "novel", "translate", "weather", "election", "politics", "president", "game", "games", "gaming",
+    "recipe", "travel", "hotel", "flight", "laptop", "iphone", "android", "website", "email",
+]
+
+GREETING_TERMS = [
+    "hi", "hii", "hello", "hey", "heya", "yo", "morning", "evening", "afternoon", "good",
+    "thanks", "thank", "you", "ok", "okay", "bye", "doctor", "doc", "sarah", "dr", "there",
+]
+
+# Answers to the doctor's questions are statements; new questions in a medical chat go to the LLM
+QUESTION_STARTERS = {"what", "who", "where", "when", "why", "how", "which", "can", "could", "tell", "write", "give", "is", "are", "do", "does"}
+
+# The writer speaking about themselves ("I got ...", "my ...") can be describing a complaint
+# the lexicon does not know, so such messages are never rejected locally
+FIRST_PERSON_TERMS = {"i", "i'm", "im", "i've", "ive", "i'd", "my", "myself"}
+
+_WORD_RE = re.compile(r"[a-z']+")
+
+
+def _words(text: str) -> List[str]:
+    return _WORD_RE.findall(text.lower())
+
+
+class MedicalMessageGate:
+    """
+    Local lexicon-based fast path in front of the LLM medical classifier.
+    Clear cases are decided here; ambiguous messages return None and go to the LLM.
+    A message is only rejected locally when it carries no medical signal at all.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.medical_terms = set(MEDICAL_TERMS)
+        self.non_medical_terms = set(NON_MEDICAL_TERMS)
+        self.greeting_terms = set(GREETING_TERMS)
+        self._lock = threading.Lock()
+        self._counts = {"local_allowed": 0, "local_rejected": 0, "escalated": 0}
+
+    def medical_hits(self, text: str) -> int:
+        return len(set(_words(text)) & self.medical_terms)
+
+    def non_medical_hits(self, text: str) -> int:
+        return len(set(_words(text)) & self.non_medical_terms)
+
+    def is_greeting(self, text: str) -> bool:
+        words = _words(text)
+        return 0 < len(words) <= 5 and all(word in self.greeting_terms for word in words)
+
+    def is_first_person(self, text: str) -> bool:
+        return bool(set(_words(text)) & FIRST_PERSON_TERMS)
+
+    def is_question(self, text: str) -> bool:
+        words = _words(text)
+        return "?" in text or bool(words and words[0] in QUESTION_STARTERS)
+
+    def classify(self, message: str, message_pattern: str = "normal",
+                 previous_user_messages: List[str] = None, known_symptoms: List[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Return a validation result with the same shape as avalidate_medical_content_with_llm,
+        or None when the message needs the LLM classifier
+        """
+        if not self.enabled:
+            return None
+
+        result = self._decide(message, message_pattern, previous_user_messages or [], known_symptoms or [])
+        self._record(result)
+        return result
+
+    def _decide(self, message: str, message_pattern: str, previous_user_messages: List[str],
+                known_symptoms: List[str]) -> Optional[Dict[str, Any]]:
+        medical = self.medical_hits(message)
+        non_medical = self.non_medical_hits(message)
+
+        # message_pattern is substring-based ("off" matches "coffee"), so it never decides on its own here
+        if medical >= 2 and not non_medical:
+            return self._result(True, "Message describes health symptoms or treatment", "high", 9)
+        if medical == 1 and not non_medical and not self.is_question(message):
+            return self._result(True, "Message describes health symptoms or treatment", "medium", 7)
+
+        if self.is_greeting(message):
+            return self._result(True, "Greeting or check-in", "medium", 5, tone="empathetic")
+
+        in_medical_conversation = bool(known_symptoms) or any(
+            self.medical_hits(previous) for previous in previous_user_messages
+        )
+        if (in_medical_conversation and not non_medical and not self.is_question(message)
+                and len(_words(message)) <= FOLLOW_UP_MAX_WORDS):
+            return self._result(True, "Follow-up within an ongoing medical conversation", "medium", 6)
+
+        if non_medical and not medical and not self.is_first_person(message):
+            return self._result(False, "That topic is outside of medical care.", "high", 1)
+
+        return None
+
+    @staticmethod
+    def _result(allowed: bool, reason: str, confidence: str, score: int, tone: str = "professional") -> Dict[str, Any]:
+        return {
+            "allowed": allowed,
+            "reason": reason,
+            "confidence": confidence,
+            "medical_context_score": score,
+            "suggested_response_tone": tone,
+            "source": "local",
+        }
+
+    def _record(self, result: Optional[Dict[str, Any]]):
+        with self._lock:
+            if result is None:
+                self._counts["escalated"] += 1
+            elif result["allowed"]:
+                self._counts["local_allowed"] += 1
+            else:
+                self._counts["local_rejected"] += 1
+            total = sum(self._counts.values())
+        if total % STATS_LOG_EVERY == 0:
+            logger.info(f"Local message gate hit rate: {self.stats()['hit_rate']:.2%} over {total} messages")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = dict(self._counts)
+        total = sum(counts.values())
+        local = counts["local_allowed"] + counts["local_rejected"]
+        return {
+            "enabled": self.enabled,
+            "total": total,
+            **counts,
+            "hit_rate": local / total if total else 0.0,
+        }
+
+
+medical_message_gate = MedicalMessageGate(enabled=LOCAL_GATE_ENABLED)
@@ -1,27 +1,65 @@
 import os
 from langchain_groq import ChatGroq
 from langchain.chains import RetrievalQA
-from langchain_community.vectorstores import FAISS
-from langchain_huggingface import HuggingFaceEmbeddings
 from dotenv import load_dotenv
+from utils.llm_gateway import llm_gateway
+from utils.vectorstore_registry import vectorstore_registry
+from utils.token_counter import estimate_tokens, trim_to_token_budget
 load_dotenv()
 
 
 def llm_config():
-   model = ChatGroq(model="llama3-8b-8192",api_key=os.getenv("GROQ_API_KEY"),temperature=0.4,streaming=True)
+   # Retries (429, 408/409, 5xx, connection errors) are done by the gateway, which also limits concurrency and rate
+   model = ChatGroq(model="llama3-8b-8192",api_key=os.getenv("GROQ_API_KEY"),temperature=0.4,streaming=True,
+                    max_retries=0,http_client=llm_gateway.sync_client(),http_async_client=llm_gateway.async_client())
    return model
 
 
 load_llm = llm_config()
 
 
-DB_FAISS_PATH = "../../../vectorstore/db_faiss"
-vectorstore = FAISS.load_local(DB_FAISS_PATH, HuggingFaceEmbeddings(),  allow_dangerous_deserialization=True)
-retriever = vectorstore.as_retriever(search_type="similarity", k=3)
+# Shared with the one-way flow; the model and index load on first use (or at startup warm-up)
+embedding_model = vectorstore_registry.lazy_embeddings()
+
+# "retrieval": pass the top-k documents straight into the response prompt
+# "chain": summarise them with RetrievalQA first (one extra LLM call per turn)
+RAG_CONTEXT_MODE = os.getenv("RAG_CONTEXT_MODE", "retrieval")
+RAG_TOP_K = int(os.getenv("RAG_TOP_K", "3"))
+RAG_CONTEXT_TOKEN_BUDGET = int(os.getenv("RAG_CONTEXT_TOKEN_BUDGET", "600"))
+
+retriever = vectorstore_registry.retriever(search_type="similarity", search_kwargs={"k": RAG_TOP_K})
 
 two_way_chatting_qa_chain = RetrievalQA.from_chain_type(
     llm=load_llm,
     retriever=retriever,
     return_source_documents=True,
     chain_type="stuff"
-)
\ No newline at end of file
+)
+
+
+def format_retrieved_context(documents, token_budget: int = RAG_CONTEXT_TOKEN_BUDGET) -> str:
+   """
+   Deduplicate retrieved chunks (exact and contained fragments) and trim them to the token budget
+   """
+   kept = []
+   for doc in documents:
+      text = " ".join(doc.page_content.split())
+      if not text or any(text.lower() in other.lower() for other in kept):
+         continue
+      kept = [other for other in kept if other.lower() not in text.lower()]
+      kept.append(text)
+
+   parts = []
+   used = 0
+   for text in kept:
+      tokens = estimate_tokens(text)
+      if used + tokens > token_budget:
+         parts.append(trim_to_token_budget(text, token_budget - used))
+         break
+      parts.append(text)
+      used += tokens
+   return "\n\n".join(part for part in parts if part)
+
+
+async def aretrieve_context(query: str) -> str:
+   return format_retrieved_context(await retriever.ainvoke(query))
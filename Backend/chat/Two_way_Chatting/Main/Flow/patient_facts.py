@@ -0,0 +1,263 @@
+import copy
+import logging
+import os
+import re
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from utils.vectorstore_registry import vectorstore_registry
+from chat.Two_way_Chatting.Main.Flow.chat_state import SymptomFact, MedicationFact, HistoryFact, PatientFacts
+
+logger = logging.getLogger(__name__)
+
+# Cosine similarity above which a new name is treated as an existing fact
+FACT_MATCH_THRESHOLD = float(os.getenv("PATIENT_FACT_MATCH_THRESHOLD", "0.88"))
+# Least recently updated facts are dropped beyond this many per kind
+MAX_FACTS_PER_KIND = int(os.getenv("PATIENT_FACTS_MAX_PER_KIND", "15"))
+MAX_LIST_VALUES = 5
+
+# Names that differ in these never share a key, however close their embeddings are
+SIDE_WORDS = {"left", "right", "bilateral", "both", "upper", "lower"}
+NUMBER_PATTERN = re.compile(r"\d+(?:\.\d+)?")
+# Field whose side words / numbers tell apart facts with the same name ("knee pain" left vs right)
+QUALIFIER_FIELDS = {"symptoms": "location", "medications": "dosage"}
+
+EMPTY_VALUES = {"", "unknown", "none", "n/a", "not specified", "not provided", "not mentioned"}
+
+
+SYMPTOM_ALIASES = {
+    "head ache": "headache", "head pain": "headache", "pain in head": "headache",
+    "high temperature": "fever", "temperature": "fever", "pyrexia": "fever", "feverish": "fever",
+    "throwing up": "vomiting", "vomit": "vomiting", "puking": "vomiting",
+    "feeling sick": "nausea", "nauseous": "nausea", "queasy": "nausea",
+    "stomach ache": "abdominal pain", "stomachache": "abdominal pain", "stomach pain": "abdominal pain",
+    "tummy ache": "abdominal pain", "belly pain": "abdominal pain",
+    "short of breath": "shortness of breath", "breathlessness": "shortness of breath",
+    "difficulty breathing": "shortness of breath",
+    "tired": "fatigue", "tiredness": "fatigue", "exhaustion": "fatigue",
+    "loose motions": "diarrhea", "diarrhoea": "diarrhea",
+    "dizzy": "dizziness", "lightheaded": "dizziness", "light headed": "dizziness",
+    "coughing": "cough", "dry cough": "cough", "wet cough": "cough",
+    "throat pain": "sore throat", "itchy skin": "itching", "itchiness": "itching",
+}
+
+MEDICATION_ALIASES = {
+    "tylenol": "paracetamol", "acetaminophen": "paracetamol", "crocin": "paracetamol",
+    "dolo": "paracetamol", "dolo 650": "paracetamol", "calpol": "paracetamol",
+    "advil": "ibuprofen", "motrin": "ibuprofen", "brufen": "ibuprofen", "nurofen": "ibuprofen",
+    "benadryl": "diphenhydramine", "zyrtec": "cetirizine", "claritin": "loratadine",
+    "augmentin": "amoxicillin clavulanate", "disprin": "aspirin",
+}
+
+HISTORY_ALIASES = {
+    "high blood pressure": "hypertension", "bp": "hypertension",
+    "sugar": "diabetes", "diabetic": "diabetes", "type 2 diabetes": "diabetes",
+    "asthmatic": "asthma",
+}
+
+
+def empty_patient_facts() -> PatientFacts:
+    return {"symptoms": {}, "medications": {}, "medical_history": {}, "turn": 0}
+
+
+def normalize_name(name: str) -> str:
+    name = re.sub(r"[^a-z0-9\s]", " ", str(name).lower())
+    return " ".join(name.split())
+
+
+def distinguishing_tokens(name: str) -> Tuple[Tuple[str, ...], frozenset]:
+    """
+    Numbers (dosage, strength) and side words of a normalized name
+    """
+    numbers = tuple(NUMBER_PATTERN.findall(name))
+    sides = frozenset(word for word in name.split() if word in SIDE_WORDS)
+    return numbers, sides
+
+
+def qualifier_tokens(fact: Dict[str, Any], field: Optional[str]) -> Tuple[Tuple[str, ...], frozenset]:
+    value = fact.get(field) if field else None
+    return distinguishing_tokens(normalize_name(value)) if not is_empty(value) else ((), frozenset())
+
+
+def qualifiers_compatible(first: Tuple[Tuple[str, ...], frozenset], second: Tuple[Tuple[str, ...], frozenset]) -> bool:
+    """
+    A fact without a side or strength can take one; two different ones never merge
+    """
+    return all(not a or not b or a == b for a, b in zip(first, second))
+
+
+def is_empty(value: Any) -> bool:
+    if value is None:
+        return True
+    if isinstance(value, (list, tuple, dict)):
+        return len(value) == 0
+    return str(value).strip().lower() in EMPTY_VALUES
+
+
+embedding_model = vectorstore_registry.lazy_embeddings()
+
+
+@lru_cache(maxsize=2048)
+def _embed_name(name: str) -> np.ndarray:
+    vector = np.array(embedding_model.embed_query(name), dtype="float32")
+    return vector / (np.linalg.norm(vector) or 1.0)
+
+
+class FactCanonicalizer:
+    """
+    Map free-text symptom/medication/condition names to a canonical key:
+    alias table first, then nearest neighbour among the patient's existing keys
+    """
+
+    def __init__(self, threshold: float = FACT_MATCH_THRESHOLD):
+        self.threshold = threshold
+        self.aliases = {
+            "symptoms": SYMPTOM_ALIASES,
+            "medications": MEDICATION_ALIASES,
+            "medical_history": HISTORY_ALIASES,
+        }
+
+    def canonical(self, kind: str, name: str, existing_keys: List[str]) -> Optional[str]:
+        normalized = normalize_name(name)
+        if not normalized:
+            return None
+
+        normalized = self.aliases[kind].get(normalized, normalized)
+        if normalized in existing_keys or not existing_keys:
+            return normalized
+
+        try:
+            query = _embed_name(normalized)
+            tokens = distinguishing_tokens(normalized)
+            best_key, best_score = None, 0.0
+            for key in existing_keys:
+                # "5 mg amlodipine" vs "10 mg amlodipine" or "left knee pain" vs "right knee pain" embed almost identically
+                if distinguishing_tokens(key) != tokens:
+                    continue
+                score = float(np.dot(query, _embed_name(key)))
+                if score > best_score:
+                    best_key, best_score = key, score
+            if best_key and best_score >= self.threshold:
+                return best_key
+        except Exception as e:
+            logger.warning(f"Fact canonicalization embedding lookup failed: {str(e)}")
+
+        return normalized
+
+
+fact_canonicalizer = FactCanonicalizer()
+
+
+def _merge_fact(current: Dict[str, Any], update: Dict[str, Any], turn: int) -> Dict[str, Any]:
+    """
+    Field-level merge: non-empty scalar values overwrite, list values are unioned (bounded)
+    """
+    merged = dict(current)
+    for field, value in update.items():
+        if is_empty(value):
+            continue
+        if isinstance(value, list):
+            values = list(merged.get(field, []))
+            for item in value:
+                if not is_empty(item) and item not in values:
+                    values.append(item)
+            merged[field] = values[-MAX_LIST_VALUES:]
+        else:
+            merged[field] = str(value).strip()
+    merged["updated_turn"] = turn
+    return merged
+
+
+def _fact_key(facts: Dict[str, Dict[str, Any]], name: str, name_field: str, update: Dict[str, Any],
+              qualifier_field: Optional[str]) -> str:
+    """
+    Key of the fact named name that update belongs to: the one with the same side/strength,
+    else one without, else a new key so a different side or strength is kept apart
+    """
+    tokens = qualifier_tokens(update, qualifier_field)
+    same_name = [(key, fact) for key, fact in facts.items() if fact.get(name_field, key) == name]
+    candidates = [(key, fact) for key, fact in same_name
+                  if qualifiers_compatible(tokens, qualifier_tokens(fact, qualifier_field))]
+    if candidates:
+        exact = [key for key, fact in candidates if qualifier_tokens(fact, qualifier_field) == tokens]
+        if exact:
+            return exact[0]
+        return max(candidates, key=lambda entry: entry[1].get("updated_turn", 0))[0]
+    if name not in facts:
+        return name
+    return f"{name} ({normalize_name(update[qualifier_field])})"
+
+
+def merge_extracted_info(facts: Optional[PatientFacts], extracted_info: Dict[str, Any]) -> PatientFacts:
+    """
+    Merge one extraction result into the patient facts, returning a new structure
+    """
+    merged: PatientFacts = copy.deepcopy(facts) if facts else empty_patient_facts()
+    merged["turn"] = merged.get("turn", 0) + 1
+    turn = merged["turn"]
+
+    sources = {
+        "symptoms": ("symptoms", "name"),
+        "medications": ("medications", "name"),
+        "medical_history": ("medical_history", "condition"),
+    }
+    for kind, (extracted_key, name_field) in sources.items():
+        qualifier_field = QUALIFIER_FIELDS.get(kind)
+        for item in extracted_info.get(extracted_key) or []:
+            if not isinstance(item, dict):
+                continue
+            names = list(dict.fromkeys(fact.get(name_field, key) for key, fact in merged[kind].items()))
+            name = fact_canonicalizer.canonical(kind, item.get(name_field, ""), names)
+            if not name:
+                continue
+            update = {field: value for field, value in item.items() if field != name_field}
+            if qualifier_field == "dosage" and is_empty(update.get("dosage")):
+                # "dolo 650" folds to "paracetamol": keep the strength the alias dropped
+                dropped = [number for number in NUMBER_PATTERN.findall(normalize_name(item.get(name_field, "")))
+                           if number not in NUMBER_PATTERN.findall(name)]
+                if dropped:
+                    update["dosage"] = " ".join(dropped)
+            key = _fact_key(merged[kind], name, name_field, update, qualifier_field)
+            fact = _merge_fact(merged[kind].get(key, {name_field: name}), update, turn)
+            fact[name_field] = name
+            merged[kind][key] = fact
+
+        if len(merged[kind]) > MAX_FACTS_PER_KIND:
+            newest = sorted(merged[kind].items(), key=lambda entry: entry[1].get("updated_turn", 0))[-MAX_FACTS_PER_KIND:]
+            merged[kind] = dict(newest)
+
+    return merged
+
+
+def render_symptom(fact: SymptomFact) -> str:
+    text = fact.get("name", "Unknown symptom")
+    if fact.get("location"):
+        text += f" in {fact['location']}"
+    if fact.get("severity"):
+        text += f" (severity: {fact['severity']})"
+    if fact.get("duration"):
+        text += f" for {fact['duration']}"
+    return text
+
+
+def render_medication(fact: MedicationFact) -> str:
+    parts = [fact.get("name", "Unknown medication"), fact.get("dosage", ""), fact.get("frequency", "")]
+    return " ".join(part for part in parts if part)
+
+
+def render_history(fact: HistoryFact) -> str:
+    details = [fact[field] for field in ("status", "year") if fact.get(field)]
+    condition = fact.get("condition", "Unknown condition")
+    return f"{condition} ({', '.join(details)})" if details else condition
+
+
+def render_fact_lists(facts: PatientFacts) -> Tuple[List[str], List[str], List[str]]:
+    """
+    Compact one-line-per-fact rendering used by prompts and the medical_info_update payload
+    """
+    return (
+        [render_symptom(fact) for fact in facts["symptoms"].values()],
+        [render_medication(fact) for fact in facts["medications"].values()],
+        [render_history(fact) for fact in facts["medical_history"].values()],
+    )
@@ -0,0 +1,176 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import faiss
+import numpy as np
+from utils.vectorstore_registry import vectorstore_registry
+
+logger = logging.getLogger(__name__)
+
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "1") != "0"
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+SEMANTIC_CACHE_MAX_SIZE = int(os.getenv("SEMANTIC_CACHE_MAX_SIZE", "1000"))
+SEMANTIC_CACHE_TTL_SECONDS = int(os.getenv("SEMANTIC_CACHE_TTL_SECONDS", "21600"))
+# Names the frontend sends when the patient has not introduced themselves
+ANONYMOUS_NAMES = {"", "anonymous"}
+
+
+def age_band(age: Any) -> str:
+    """
+    Coarse age bucket matching the dosage bands used in our prompts
+    """
+    try:
+        age = int(age)
+    except (TypeError, ValueError):
+        return "unknown"
+    if age <= 0:
+        return "unknown"
+    if age <= 12:
+        return "child"
+    if age <= 19:
+        return "teen"
+    if age < 65:
+        return "adult"
+    return "senior"
+
+
+def user_bucket(user_info: Dict[str, Any]) -> str:
+    gender = str(user_info.get("gender") or "unknown").strip().lower()
+    return f"{age_band(user_info.get('age'))}|{gender}"
+
+
+class SemanticResponseCache:
+    """
+    In-process cache of first-turn doctor reply texts, looked up by embedding similarity.
+    Only the text is kept; validation and extraction still run for every message.
+    Entries live in a FAISS inner-product index over normalized vectors and are
+    evicted by TTL and LRU once max_size is reached.
+    """
+
+    def __init__(self, embeddings, threshold: float = SEMANTIC_CACHE_THRESHOLD,
+                 max_size: int = SEMANTIC_CACHE_MAX_SIZE, ttl_seconds: int = SEMANTIC_CACHE_TTL_SECONDS,
+                 enabled: bool = True):
+        self.embeddings = embeddings
+        self.threshold = threshold
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        self._index = None
+        self._entries: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def is_cacheable(user_info: Dict[str, Any]) -> bool:
+        # Replies addressed to a named patient must not be served to anyone else
+        return str(user_info.get("name") or "").strip().lower() in ANONYMOUS_NAMES
+
+    def _embed(self, message: str, bucket: str) -> np.ndarray:
+        vector = np.array([self.embeddings.embed_query(f"{bucket}: {message}")], dtype="float32")
+        faiss.normalize_L2(vector)
+        return vector
+
+    def _evict(self, entry_id: int):
+        self._entries.pop(entry_id, None)
+        self._index.remove_ids(np.array([entry_id], dtype="int64"))
+        self.evictions += 1
+
+    def _is_expired(self, entry: Dict[str, Any], now: float) -> bool:
+        return now - entry["created_at"] > self.ttl_seconds
+
+    def lookup(self, message: str, user_info: Dict[str, Any]) -> Optional[str]:
+        """
+        Return the cached reply for a close enough opening message, or None
+        """
+        if not self.enabled or not self.is_cacheable(user_info):
+            return None
+
+        bucket = user_bucket(user_info)
+        vector = self._embed(message, bucket)
+        now = time.monotonic()
+
+        with self._lock:
+            if self._index is None or self._index.ntotal == 0:
+                self.misses += 1
+                return None
+
+            scores, ids = self._index.search(vector, min(4, self._index.ntotal))
+            for score, entry_id in zip(scores[0], ids[0]):
+                entry = self._entries.get(int(entry_id))
+                if entry is None:
+                    continue
+                if self._is_expired(entry, now):
+                    self._evict(int(entry_id))
+                    continue
+                if entry["bucket"] != bucket or score < self.threshold:
+                    continue
+                self._entries.move_to_end(int(entry_id))
+                self.hits += 1
+                logger.info(f"Semantic cache hit (similarity {score:.3f})")
+                return entry["response"]
+
+            self.misses += 1
+            return None
+
+    def store(self, message: str, user_info: Dict[str, Any], response: str):
+        """
+        Cache a first-turn reply
+        """
+        if not self.enabled or not self.is_cacheable(user_info):
+            return
+
+        bucket = user_bucket(user_info)
+        vector = self._embed(message, bucket)
+        now = time.monotonic()
+
+        with self._lock:
+            if self._index is None:
+                self._index = faiss.IndexIDMap(faiss.IndexFlatIP(vector.shape[1]))
+
+            for entry_id in [i for i, entry in self._entries.items() if self._is_expired(entry, now)]:
+                self._evict(entry_id)
+
+            entry_id = self._next_id
+            self._next_id += 1
+            self._index.add_with_ids(vector, np.array([entry_id], dtype="int64"))
+            self._entries[entry_id] = {
+                "bucket": bucket,
+                "response": response,
+                "created_at": now,
+            }
+
+            while len(self._entries) > self.max_size:
+                oldest_id = next(iter(self._entries))
+                self._evict(oldest_id)
+
+    async def alookup(self, message: str, user_info: Dict[str, Any]) -> Optional[str]:
+        # Embedding is CPU-bound, keep it off the event loop
+        return await asyncio.to_thread(self.lookup, message, user_info)
+
+    async def astore(self, message: str, user_info: Dict[str, Any], response: str):
+        await asyncio.to_thread(self.store, message, user_info, response)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            size = len(self._entries)
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "size": size,
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+semantic_response_cache = SemanticResponseCache(vectorstore_registry.lazy_embeddings(), enabled=SEMANTIC_CACHE_ENABLED)
@@ -3,37 +3,33 @@ import asyncio
 import logging
 from fastapi.routing import APIRouter
 from langchain_core.messages import HumanMessage
-from chat.Two_way_Chatting.Main.Flow.chat_graph import enhanced_graph
+from chat.Two_way_Chatting.Main.Flow.chat_graph import enhanced_graph, RESPONSE_STREAM_TAG
+from chat.Two_way_Chatting.Main.api.session_store import session_store
+from utils.checkpointer import checkpointer
 from socket_config import sio
-from tables.chat_messages_table import chat_messages
 from tables.chat_thread_table import chat_thread
-from utils.engine import engine
+from utils.engine import async_engine
+from utils.message_writer import message_writer
 router = APIRouter()
 from datetime import datetime
 
 logger = logging.getLogger("uvicorn.error")
-session_states = {}
-default_user_info = {
-    "name": "Anonymous",
-    "age": 0,
-    "gender": "unknown"
-}
+# sid -> thread_id of the thread the socket is currently on (dropped on disconnect)
+sid_threads = {}
 
 @sio.on("start_status")
 async def create_new_thread(sid,data):
-    with engine.connect() as conn:
-        result = conn.execute(
+    async with async_engine.begin() as conn:
+        result = await conn.execute(
             chat_thread.insert()
             .values(user="aymaan", created_at=datetime.now())
             .returning(chat_thread.c.id)
         )
-        conn.commit()
         thread_id = result.scalar()
 
     # Store in session
-    if sid not in session_states:
-        session_states[sid] = default_user_info.copy()
-    session_states[sid]["thread_id"] = thread_id
+    session_store.reset(thread_id, has_user_message=False)
+    sid_threads[sid] = thread_id
  
     await sio.emit("thread_created", {"thread_id": thread_id}, to=sid)
 
@@ -57,58 +53,47 @@ async def websocket_stream(sid, data):
         await sio.emit("stream_chunk", "[DONE]", to=sid)
         return
 
+    streamed_answer = ""
     try:
-        # ✅ Ensure session state exists
-        if sid not in session_states:
-            session_states[sid] = {
-                "messages": [],
-                "latest_user_message": "",
-                "user_info": default_user_info.copy(),
-                "symptoms": [],
-                "medications_taken": [],
-                "medical_history": []
-            }
-
-        # ✅ Store message in memory (for LLM flow)
-        session_states[sid]["messages"].append(HumanMessage(content=message))
-        session_states[sid]["latest_user_message"] = message
-        if not session_states[sid].get("userSymptoms"):
-            session_states[sid]["symptoms_input"] = message
-        
-        
-
-        # ✅ Save user message to DB
-        with engine.connect() as connection:
-            connection.execute(
-                chat_messages.insert().values(
-                    thread_id=thread_id,
-                    sender="User",
-                    message=message,
-                    time_stamp=datetime.now()
-                )
-            )
-            connection.commit()
-
-            result = connection.execute(
-                chat_messages.select()
-                .where(
-                    (chat_messages.c.thread_id == thread_id) &
-                    (chat_messages.c.sender == "User")
-                )
-                .order_by(chat_messages.c.time_stamp.asc())
-            )
-            user_messages = result.fetchall()
-
-            if len(user_messages) == 1:
-                await sio.emit("trigger_sidebar_fetch", {"thread_id": thread_id}, to=sid)
-
-            # ✅ Process via LangGraph
-            result = await enhanced_graph.ainvoke(
-                session_states[sid],
-                config={"configurable": {"thread_id": thread_id}}
-            )
-
-        
+        # ✅ Load session state (rehydrated from storage if this thread is not in memory)
+        sid_threads[sid] = thread_id
+        state = await session_store.get(thread_id)
+
+        # ✅ Store message in memory (for LLM flow); copy so cached checkpoint values are not mutated
+        state = {**state, "messages": state.get("messages", []) + [HumanMessage(content=message)]}
+        state["latest_user_message"] = message
+        if not state.get("userSymptoms"):
+            state["symptoms_input"] = message
+        session_store.put(thread_id, state)
+
+
+        # ✅ Save user message to DB (write-behind, off the critical path)
+        time_stamp = datetime.now()
+        written = message_writer.enqueue(thread_id, "User", message, time_stamp)
+
+        # ✅ First message of the thread: O(1) flag kept by the session store
+        if await session_store.claim_first_user_message(thread_id):
+            # The sidebar re-reads the DB, so wait for this one row to be committed
+            await asyncio.shield(written)
+            await sio.emit("trigger_sidebar_fetch", {
+                "thread_id": thread_id,
+                "message": message,
+                "sender": "User",
+                "time_stamp": time_stamp.isoformat()
+            }, to=sid)
+
+        # ✅ Process via LangGraph, forwarding response tokens as they are generated
+        config = {"configurable": {"thread_id": thread_id}}
+        async for event in enhanced_graph.astream_events(state, config=config, version="v2"):
+            if event["event"] != "on_chat_model_stream" or RESPONSE_STREAM_TAG not in event.get("tags", []):
+                continue
+            token = event["data"]["chunk"].content
+            if token:
+                streamed_answer += token
+                await sio.emit("stream_chunk", token, to=sid)
+
+        snapshot = await enhanced_graph.aget_state(config)
+        result = snapshot.values
 
         logger.info(f"[RESULT] for {sid}: Processing completed")
 
@@ -119,27 +104,17 @@ async def websocket_stream(sid, data):
             logger.info(f"[AI MSG] for {sid}: {response_text}")
 
             # ✅ Update memory
-            session_states[sid] = result
+            session_store.put(thread_id, result)
 
-            # ✅ Emit streamed chunks
-            words = response_text.split(" ")
-            full_answer = ""
-            for i, word in enumerate(words):
-                await sio.emit("stream_chunk", word if i == len(words) - 1 else word + " ", to=sid)
-                full_answer += word + " "
-                await asyncio.sleep(0.05)
+            # ✅ Replies that bypass the response LLM (rejections, fallbacks) are sent in one chunk
+            if not streamed_answer:
+                await sio.emit("stream_chunk", response_text, to=sid)
+            elif response_text != streamed_answer.strip():
+                # The LLM failed mid-stream and a fallback was stored: swap out the partial text
+                await sio.emit("stream_replace", response_text, to=sid)
 
             # ✅ Save AI message to DB
-            with engine.connect() as connection:
-                connection.execute(
-                    chat_messages.insert().values(
-                        thread_id=thread_id,
-                        sender="A.I",
-                        message=full_answer.strip(),
-                        time_stamp=datetime.now()
-                    )
-                )
-                connection.commit()
+            message_writer.enqueue(thread_id, "A.I", response_text)
 
             # ✅ Finish
             await sio.emit("stream_chunk", "[DONE]", to=sid)
@@ -158,7 +133,8 @@ async def websocket_stream(sid, data):
 
     except Exception as e:
         logger.error(f"[GRAPH ERROR] for {sid}: {str(e)}")
-        await sio.emit("stream_chunk", "🚨 Server error. Please try again.", to=sid)
+        # Partial tokens already shown are replaced, not appended to
+        await sio.emit("stream_replace" if streamed_answer else "stream_chunk", "🚨 Server error. Please try again.", to=sid)
         await sio.emit("stream_chunk", "[DONE]", to=sid)
 
 # Additional WebSocket events
@@ -179,17 +155,16 @@ async def disconnect(sid):
     Handle client disconnection and cleanup
     """
     logger.info(f"[DISCONNECT] Client {sid} disconnected")
-    # Clean up session state
-    if sid in session_states:
-        del session_states[sid]
+    # Session state is keyed by thread and expires on its own; only forget the socket
+    sid_threads.pop(sid, None)
 
 @sio.on("get_medical_summary")
 async def get_medical_summary(sid):
     """
     Get current medical summary for the session
     """
-    if sid in session_states:
-        state = session_states[sid]
+    state = session_store.peek(sid_threads.get(sid))
+    if state is not None:
         summary = {
             "symptoms": state.get("symptoms", []),
             "medications": state.get("medications_taken", []),
@@ -208,13 +183,8 @@ async def clear_session(sid):
     """
     Clear session data
     """
-    if sid in session_states:
-        session_states[sid] = {
-            "messages": [],
-            "latest_user_message": "",
-            "user_info": default_user_info.copy(),
-            "symptoms": [],
-            "medications_taken": [],
-            "medical_history": []
-        }
+    if sid in sid_threads:
+        session_store.reset(sid_threads[sid])
+        # Otherwise the next turn would resume from the thread's stored checkpoint
+        await checkpointer.adelete_thread(str(sid_threads[sid]))
         await sio.emit("session_cleared", {"status": "success"}, to=sid)
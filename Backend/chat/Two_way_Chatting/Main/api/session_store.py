@@ -0,0 +1,188 @@
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from sqlalchemy import exists, select
+from tables.chat_messages_table import chat_messages
+from utils.checkpointer import checkpointer
+from utils.engine import async_engine
+
+logger = logging.getLogger(__name__)
+
+SESSION_TTL_SECONDS = int(os.getenv("SESSION_TTL_SECONDS", "1800"))
+SESSION_MAX_ENTRIES = int(os.getenv("SESSION_MAX_ENTRIES", "1000"))
+# Per-entry size cap: only the most recent messages are kept in memory
+SESSION_MAX_MESSAGES = int(os.getenv("SESSION_MAX_MESSAGES", "40"))
+SESSION_REHYDRATE_MESSAGES = int(os.getenv("SESSION_REHYDRATE_MESSAGES", "20"))
+
+default_user_info = {
+    "name": "Anonymous",
+    "age": 0,
+    "gender": "unknown"
+}
+
+
+def new_session_state() -> Dict[str, Any]:
+    return {
+        "messages": [],
+        "latest_user_message": "",
+        "user_info": default_user_info.copy(),
+        "symptoms": [],
+        "medications_taken": [],
+        "medical_history": []
+    }
+
+
+class SessionStore:
+    """
+    Chat session state keyed by thread_id, bounded by idle TTL, max entries (LRU)
+    and a per-entry message cap. Misses are rehydrated from the thread's latest
+    graph checkpoint, falling back to the last messages stored in chat_messages,
+    so reconnecting clients (new sid, same thread) keep their context.
+
+    Each entry also remembers whether the thread already has a user message, so
+    the first-message check is a flag lookup instead of a query per turn.
+    """
+
+    def __init__(self, saver=None, ttl_seconds: int = SESSION_TTL_SECONDS, max_entries: int = SESSION_MAX_ENTRIES,
+                 max_messages: int = SESSION_MAX_MESSAGES, rehydrate_messages: int = SESSION_REHYDRATE_MESSAGES):
+        self.saver = saver
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_messages = max_messages
+        self.rehydrate_messages = rehydrate_messages
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.metrics = {
+            "hits": 0,
+            "misses": 0,
+            "rehydrated_from_checkpoint": 0,
+            "rehydrated_from_db": 0,
+            "evicted_ttl": 0,
+            "evicted_lru": 0,
+        }
+
+    def _evict_expired(self, now: float):
+        # Entries are ordered by last access, so expired ones are at the front
+        while self._entries:
+            thread_id, entry = next(iter(self._entries.items()))
+            if now - entry["touched_at"] <= self.ttl_seconds:
+                break
+            self._entries.pop(thread_id)
+            self.metrics["evicted_ttl"] += 1
+
+    def peek(self, thread_id: Any) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(str(thread_id))
+        if entry is None or time.monotonic() - entry["touched_at"] > self.ttl_seconds:
+            return None
+        return entry["state"]
+
+    async def get(self, thread_id: Any) -> Dict[str, Any]:
+        key = str(thread_id)
+        now = time.monotonic()
+        self._evict_expired(now)
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            entry["touched_at"] = now
+            self._entries.move_to_end(key)
+            self.metrics["hits"] += 1
+            return entry["state"]
+
+        self.metrics["misses"] += 1
+        state, has_user_message = await self._rehydrate(thread_id)
+        self.put(thread_id, state, has_user_message=has_user_message)
+        return state
+
+    def put(self, thread_id: Any, state: Dict[str, Any], has_user_message: Optional[bool] = None):
+        key = str(thread_id)
+        messages = state.get("messages", [])
+        if len(messages) > self.max_messages:
+            state = {**state, "messages": messages[-self.max_messages:]}
+
+        if has_user_message is None:
+            previous = self._entries.get(key)
+            has_user_message = previous["has_user_message"] if previous else False
+        self._entries[key] = {"state": state, "touched_at": time.monotonic(), "has_user_message": has_user_message}
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.metrics["evicted_lru"] += 1
+
+    def reset(self, thread_id: Any, has_user_message: Optional[bool] = None) -> Dict[str, Any]:
+        state = new_session_state()
+        self.put(thread_id, state, has_user_message=has_user_message)
+        return state
+
+    async def claim_first_user_message(self, thread_id: Any) -> bool:
+        """
+        True exactly once per thread: for the first user message it ever receives
+        """
+        await self.get(thread_id)
+        entry = self._entries[str(thread_id)]
+        if entry["has_user_message"]:
+            return False
+        entry["has_user_message"] = True
+        return True
+
+    async def _rehydrate(self, thread_id: Any) -> Tuple[Dict[str, Any], bool]:
+        if self.saver is not None:
+            try:
+                checkpoint_tuple = await self.saver.aget_tuple({"configurable": {"thread_id": thread_id}})
+                values = checkpoint_tuple.checkpoint["channel_values"] if checkpoint_tuple else {}
+                if values.get("messages"):
+                    self.metrics["rehydrated_from_checkpoint"] += 1
+                    # A checkpoint only exists once the graph has run on a user message
+                    return {**new_session_state(), **values}, True
+            except Exception as e:
+                logger.warning(f"[SESSION] checkpoint rehydration failed for thread {thread_id}: {str(e)}")
+
+        state = new_session_state()
+        try:
+            messages = await self._load_recent_messages(thread_id)
+            user_messages = [message.content for message in messages if isinstance(message, HumanMessage)]
+            has_user_message = bool(user_messages) or await self._has_user_message(thread_id)
+        except Exception as e:
+            logger.warning(f"[SESSION] DB rehydration failed for thread {thread_id}: {str(e)}")
+            return state, False
+
+        if messages:
+            self.metrics["rehydrated_from_db"] += 1
+            state["messages"] = messages
+            state["latest_user_message"] = user_messages[-1] if user_messages else ""
+        return state, has_user_message
+
+    async def _has_user_message(self, thread_id: Any) -> bool:
+        query = select(
+            exists().where((chat_messages.c.thread_id == int(thread_id)) & (chat_messages.c.sender == "User"))
+        )
+        async with async_engine.connect() as connection:
+            return bool((await connection.execute(query)).scalar())
+
+    async def _load_recent_messages(self, thread_id: Any) -> List[BaseMessage]:
+        query = (
+            select(chat_messages.c.message, chat_messages.c.sender)
+            .where(chat_messages.c.thread_id == int(thread_id))
+            .order_by(chat_messages.c.time_stamp.desc())
+            .limit(self.rehydrate_messages)
+        )
+        async with async_engine.connect() as connection:
+            rows = (await connection.execute(query)).fetchall()
+        return [
+            HumanMessage(content=row.message) if row.sender == "User" else AIMessage(content=row.message)
+            for row in reversed(rows)
+        ]
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.metrics["hits"] + self.metrics["misses"]
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            **self.metrics,
+            "hit_rate": self.metrics["hits"] / lookups if lookups else 0.0,
+        }
+
+
+session_store = SessionStore(saver=checkpointer)
@@ -0,0 +1,170 @@
+import logging
+import os
+from typing import Any, Dict, List, Optional
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
+from utils.token_counter import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# full | window | summary | summary_window; full keeps the behaviour from before strategies existed
+CHAT_MEMORY_STRATEGY = os.getenv("CHAT_MEMORY_STRATEGY", "full")
+CHAT_MEMORY_WINDOW = int(os.getenv("CHAT_MEMORY_WINDOW", "6"))
+# Messages of the stored conversation the full strategy shows in the doctor prompt
+CHAT_MEMORY_PROMPT_MESSAGES = int(os.getenv("CHAT_MEMORY_PROMPT_MESSAGES", "4"))
+CHAT_MEMORY_TOKEN_CAP = int(os.getenv("CHAT_MEMORY_TOKEN_CAP", "800"))
+# The latest exchange is always kept verbatim
+MIN_KEPT_MESSAGES = 2
+
+SUMMARY_PROMPT = """
+You maintain the running summary of a conversation between a patient and Dr. Sarah, an AI doctor.
+Update the summary with the new messages. Keep every medically relevant fact: symptoms and their
+timeline, medications and doses, medical history, advice already given and open questions.
+Drop greetings and small talk. Answer with the updated summary only, at most 150 words.
+
+CURRENT SUMMARY:
+{summary}
+
+NEW MESSAGES:
+{messages}
+"""
+
+
+def format_message(message: BaseMessage) -> str:
+    if isinstance(message, HumanMessage):
+        return f"Patient: {message.content}"
+    if isinstance(message, AIMessage):
+        return f"Dr. Sarah: {message.content}"
+    return str(message.content)
+
+
+class ConversationSummarizer:
+    """
+    Folds evicted messages into a rolling summary with the chat LLM
+    """
+
+    def __init__(self, llm=None):
+        self.llm = llm
+
+    def _get_llm(self):
+        if self.llm is None:
+            from chat.Two_way_Chatting.Main.Flow.model_config import load_llm
+            self.llm = load_llm
+        return self.llm
+
+    async def asummarize(self, summary: str, messages: List[BaseMessage]) -> str:
+        prompt = SUMMARY_PROMPT.format(
+            summary=summary or "None yet",
+            messages="\n".join(format_message(message) for message in messages),
+        )
+        result = await self._get_llm().ainvoke([SystemMessage(content=prompt)])
+        return result.content.strip()
+
+
+class FullMemory:
+    """
+    Keep the whole conversation (unbounded) and render its last prompt_messages
+    patient/doctor messages; None renders everything that is kept
+    """
+    name = "full"
+
+    def __init__(self, prompt_messages: Optional[int] = CHAT_MEMORY_PROMPT_MESSAGES):
+        self.prompt_messages = prompt_messages
+
+    def render_history(self, state: Dict[str, Any]) -> List[str]:
+        conversation = [message for message in state.get("messages", [])
+                        if isinstance(message, (HumanMessage, AIMessage))]
+        if self.prompt_messages is not None:
+            conversation = conversation[-self.prompt_messages:] if self.prompt_messages > 0 else []
+        return [format_message(message) for message in conversation]
+
+    async def acompact(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        return {}
+
+
+class WindowMemory(FullMemory):
+    """
+    Keep only the last k messages
+    """
+    name = "window"
+
+    def __init__(self, window: int = CHAT_MEMORY_WINDOW):
+        super().__init__(prompt_messages=None)
+        self.window = max(window, MIN_KEPT_MESSAGES)
+
+    async def acompact(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        messages = state.get("messages", [])
+        if len(messages) <= self.window:
+            return {}
+        return {"messages": messages[-self.window:]}
+
+
+class SummaryWindowMemory(FullMemory):
+    """
+    Keep the last k messages verbatim while they fit under the token cap and
+    fold everything older into a rolling LLM summary
+    """
+    name = "summary_window"
+
+    def __init__(self, window: int = CHAT_MEMORY_WINDOW, token_cap: int = CHAT_MEMORY_TOKEN_CAP,
+                 summarizer: ConversationSummarizer = None):
+        super().__init__(prompt_messages=None)
+        self.window = max(window, MIN_KEPT_MESSAGES)
+        self.token_cap = token_cap
+        self.summarizer = summarizer or ConversationSummarizer()
+
+    def render_history(self, state: Dict[str, Any]) -> List[str]:
+        lines = []
+        if state.get("conversation_summary"):
+            lines.append(f"Earlier in this conversation (summary): {state['conversation_summary']}")
+        return lines + super().render_history(state)
+
+    def _split(self, messages: List[BaseMessage]):
+        kept, used = [], 0
+        for message in reversed(messages):
+            tokens = estimate_tokens(format_message(message))
+            over_budget = len(kept) >= self.window or used + tokens > self.token_cap
+            if over_budget and len(kept) >= MIN_KEPT_MESSAGES:
+                break
+            kept.insert(0, message)
+            used += tokens
+        return messages[:len(messages) - len(kept)], kept
+
+    async def acompact(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        evicted, kept = self._split(state.get("messages", []))
+        if not evicted:
+            return {}
+
+        summary = state.get("conversation_summary", "")
+        try:
+            summary = await self.summarizer.asummarize(summary, evicted)
+        except Exception as e:
+            # Keep the history rather than silently dropping it; retried on the next turn
+            logger.warning(f"Conversation summary failed: {str(e)}")
+            return {}
+        return {"messages": kept, "conversation_summary": summary}
+
+
+class SummaryMemory(SummaryWindowMemory):
+    """
+    Rolling summary of everything but the latest exchange
+    """
+    name = "summary"
+
+    def __init__(self, summarizer: ConversationSummarizer = None):
+        super().__init__(window=MIN_KEPT_MESSAGES, token_cap=float("inf"), summarizer=summarizer)
+
+
+def build_memory_strategy(name: str = CHAT_MEMORY_STRATEGY, summarizer: ConversationSummarizer = None):
+    if name == "full":
+        return FullMemory()
+    if name == "window":
+        return WindowMemory()
+    if name == "summary":
+        return SummaryMemory(summarizer=summarizer)
+    if name == "summary_window":
+        return SummaryWindowMemory(summarizer=summarizer)
+    raise ValueError(f"Unknown chat memory strategy: {name}")
+
+
+memory_strategy = build_memory_strategy()
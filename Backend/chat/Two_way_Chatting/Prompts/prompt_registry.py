@@ -0,0 +1,114 @@
+import contextvars
+import logging
+import threading
+from collections import deque
+from typing import Any, Dict, Optional
+
+from utils.token_counter import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Recent turns kept for the per-turn breakdown on /metrics
+RECENT_TURNS = 20
+
+# Prompt tokens rendered by each node during the current graph turn
+_current_turn: contextvars.ContextVar[Optional[Dict[str, int]]] = contextvars.ContextVar("prompt_turn", default=None)
+
+
+class CompiledPrompt:
+    """
+    A system prompt split into a static instruction block and a per-request tail.
+    The prefix is rendered once, so every call starts with byte-identical text
+    and the provider can reuse its cached prefix; only the tail changes.
+    """
+
+    def __init__(self, name: str, prefix: str, tail: str):
+        self.name = name
+        self.prefix = prefix
+        self.tail = tail
+        self.prefix_tokens = estimate_tokens(prefix)
+
+    def render(self, **fields) -> str:
+        return self.prefix + self.tail.format(**fields)
+
+
+class PromptRegistry:
+    """
+    Prompts compiled once at startup, with rendered token counts per node and per turn
+    """
+
+    def __init__(self):
+        self._prompts: Dict[str, CompiledPrompt] = {}
+        self._lock = threading.Lock()
+        self._nodes: Dict[str, Dict[str, int]] = {}
+        self._recent_turns = deque(maxlen=RECENT_TURNS)
+
+    def register(self, name: str, prefix: str, tail: str, static_fields: Dict[str, str] = None) -> CompiledPrompt:
+        """
+        Compile a prompt. static_fields are filled into the prefix here, once, and never per request.
+        """
+        if static_fields:
+            prefix = prefix.replace("{", "{{").replace("}", "}}")
+            for field in static_fields:
+                prefix = prefix.replace("{{" + field + "}}", "{" + field + "}")
+            prefix = prefix.format(**static_fields)
+        prompt = CompiledPrompt(name, prefix, tail)
+        self._prompts[name] = prompt
+        self._nodes[name] = {"renders": 0, "total_tokens": 0, "last_tokens": 0, "max_tokens": 0}
+        logger.info(f"[PROMPT] Compiled {name}: {prompt.prefix_tokens} static prefix tokens")
+        return prompt
+
+    def get(self, name: str) -> CompiledPrompt:
+        return self._prompts[name]
+
+    def render(self, name: str, /, **fields) -> str:
+        prompt = self._prompts[name]
+        text = prompt.render(**fields)
+        tokens = estimate_tokens(text)
+        with self._lock:
+            node = self._nodes[name]
+            node["renders"] += 1
+            node["total_tokens"] += tokens
+            node["last_tokens"] = tokens
+            node["max_tokens"] = max(node["max_tokens"], tokens)
+        turn = _current_turn.get()
+        if turn is not None:
+            turn[name] = turn.get(name, 0) + tokens
+        logger.debug(f"[PROMPT] {name}: {tokens} tokens ({prompt.prefix_tokens} static prefix)")
+        return text
+
+    # --- per-turn accounting ---------------------------------------------
+
+    def begin_turn(self) -> contextvars.Token:
+        """
+        Start collecting the prompts rendered by this task and the tasks it spawns
+        """
+        return _current_turn.set({})
+
+    def end_turn(self, token: contextvars.Token, thread_id: str = None):
+        turn = _current_turn.get() or {}
+        _current_turn.reset(token)
+        if not turn:
+            return
+        with self._lock:
+            self._recent_turns.append({"thread_id": thread_id, "nodes": turn, "total_tokens": sum(turn.values())})
+        breakdown = ", ".join(f"{name}={tokens}" for name, tokens in turn.items())
+        logger.info(f"[PROMPT] Turn prompt tokens: {breakdown} (total {sum(turn.values())})")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            nodes = {
+                name: {
+                    "prefix_tokens": self._prompts[name].prefix_tokens,
+                    "renders": node["renders"],
+                    "last_tokens": node["last_tokens"],
+                    "avg_tokens": node["total_tokens"] / node["renders"] if node["renders"] else 0.0,
+                    "max_tokens": node["max_tokens"],
+                }
+                for name, node in self._nodes.items()
+            }
+            recent_turns = list(self._recent_turns)
+        return {"nodes": nodes, "recent_turns": recent_turns}
+
+
+prompt_registry = PromptRegistry()
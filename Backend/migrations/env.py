@@ -0,0 +1,45 @@
+from logging.config import fileConfig
+
+from alembic import context
+from sqlalchemy import create_engine
+from sqlalchemy.pool import NullPool
+from tables.chat_messages_table import chat_messages  # noqa: F401 (registers the table on meta)
+from tables.chat_thread_table import chat_thread  # noqa: F401
+from tables.thread_summary_table import thread_summary  # noqa: F401
+from tables.user_table import user_table
+from utils.engine import DATABASE_URL, meta
+
+config = context.config
+
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+# users lives on its own MetaData
+target_metadata = [meta, user_table.metadata]
+
+
+def run_migrations_offline() -> None:
+    context.configure(
+        url=DATABASE_URL,
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    # Not the app engine: its request statement_timeout would cancel table rewrites, index builds and backfills
+    migration_engine = create_engine(DATABASE_URL, poolclass=NullPool,
+                                     connect_args={"options": "-c statement_timeout=0"})
+    with migration_engine.connect() as connection:
+        context.configure(connection=connection, target_metadata=target_metadata)
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,70 @@
+"""baseline schema: chat_thread, chat_messages, users
+
+Existing databases already have these tables; they are only created when missing,
+so `alembic upgrade head` works on both fresh and pre-migration databases.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0001"
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if "chat_thread" not in existing:
+        op.create_table(
+            "chat_thread",
+            sa.Column("id", sa.Integer, primary_key=True, autoincrement=True),
+            sa.Column("user", sa.String, nullable=False),
+            sa.Column("created_at", sa.DateTime, server_default=sa.func.now()),
+        )
+
+    if "chat_messages" not in existing:
+        message_type = postgresql.ENUM("A.I", "User", name="message_type")
+        message_type.create(op.get_bind(), checkfirst=True)
+        op.create_table(
+            "chat_messages",
+            sa.Column("thread_id", sa.Integer, sa.ForeignKey("chat_thread.id", ondelete="CASCADE"), nullable=False),
+            sa.Column("message", sa.String),
+            sa.Column("sender", postgresql.ENUM(name="message_type", create_type=False), nullable=False),
+            sa.Column("time_stamp", sa.DateTime, server_default=sa.func.now()),
+        )
+
+    if "users" not in existing:
+        op.create_table(
+            "users",
+            sa.Column("id", sa.Integer, primary_key=True, autoincrement=True),
+            sa.Column("email", sa.String(255), unique=True, nullable=False),
+            sa.Column("password_hash", sa.Text, nullable=False),
+            sa.Column("username", sa.String(100), nullable=True),
+            sa.Column("is_verified", sa.Boolean, server_default=sa.false()),
+            sa.Column(
+                "last_selected_thread_id",
+                sa.Integer,
+                sa.ForeignKey("chat_thread.id", ondelete="CASCADE"),
+                nullable=True,
+            ),
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("users")
+    op.drop_table("chat_messages")
+    op.drop_table("chat_thread")
+    postgresql.ENUM(name="message_type").drop(op.get_bind(), checkfirst=True)
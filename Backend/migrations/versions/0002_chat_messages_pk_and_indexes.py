@@ -0,0 +1,58 @@
+"""chat_messages: surrogate primary key and access-path indexes
+
+- id: identity primary key, existing rows are numbered on ADD COLUMN
+- ix_chat_messages_thread_time: (thread_id, time_stamp, id) for a thread's history
+  in order; id is the keyset tie-breaker for rows with equal time_stamp
+- ix_chat_messages_user_thread_time: partial index on sender = 'User' for the
+  first-message EXISTS check and the latest user message per thread
+
+Indexes are built CONCURRENTLY so writes are not blocked on large tables.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 10:05:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, Sequence[str], None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("chat_messages", sa.Column("id", sa.BigInteger, sa.Identity(always=False), nullable=False))
+    op.create_primary_key("chat_messages_pkey", "chat_messages", ["id"])
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_chat_messages_thread_time",
+            "chat_messages",
+            ["thread_id", "time_stamp", "id"],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            "ix_chat_messages_user_thread_time",
+            "chat_messages",
+            ["thread_id", "time_stamp"],
+            postgresql_where=sa.text("sender = 'User'"),
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index("ix_chat_messages_user_thread_time", "chat_messages", postgresql_concurrently=True, if_exists=True)
+        op.drop_index("ix_chat_messages_thread_time", "chat_messages", postgresql_concurrently=True, if_exists=True)
+    op.drop_constraint("chat_messages_pkey", "chat_messages", type_="primary")
+    op.drop_column("chat_messages", "id")
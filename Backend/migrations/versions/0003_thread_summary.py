@@ -0,0 +1,64 @@
+"""thread_summary: per-thread projection for the sidebar
+
+One row per thread with the latest user message, last activity time and message
+count, kept up to date by the message writer. The sidebar lists threads from
+this table instead of a window function over every chat message.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 10:10:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, Sequence[str], None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "thread_summary",
+        sa.Column("thread_id", sa.Integer, sa.ForeignKey("chat_thread.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("latest_user_message", sa.String),
+        sa.Column("latest_user_message_at", sa.DateTime),
+        sa.Column("last_activity_at", sa.DateTime, nullable=False),
+        sa.Column("message_count", sa.Integer, nullable=False, server_default=sa.text("0")),
+    )
+    op.create_index(
+        "ix_thread_summary_latest_user",
+        "thread_summary",
+        [sa.text("latest_user_message_at DESC"), sa.text("thread_id DESC")],
+        postgresql_where=sa.text("latest_user_message_at IS NOT NULL"),
+    )
+
+    # Backfill from existing messages
+    op.execute("""
+        INSERT INTO thread_summary (thread_id, latest_user_message, latest_user_message_at, last_activity_at, message_count)
+        SELECT totals.thread_id, latest.message, latest.time_stamp, totals.last_activity_at, totals.message_count
+        FROM (
+            SELECT thread_id, max(time_stamp) AS last_activity_at, count(*) AS message_count
+            FROM chat_messages
+            GROUP BY thread_id
+        ) totals
+        LEFT JOIN (
+            SELECT DISTINCT ON (thread_id) thread_id, message, time_stamp
+            FROM chat_messages
+            WHERE sender = 'User'
+            ORDER BY thread_id, time_stamp DESC, id DESC
+        ) latest ON latest.thread_id = totals.thread_id
+        WHERE totals.last_activity_at IS NOT NULL
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_thread_summary_latest_user", "thread_summary")
+    op.drop_table("thread_summary")
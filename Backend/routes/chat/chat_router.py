@@ -1,9 +1,17 @@
-from fastapi import APIRouter,Query
-from utils.engine import engine
+import os
+from typing import Optional
+from fastapi import APIRouter,HTTPException,Query
+from utils.engine import async_engine
+from utils.pagination import decode_cursor, encode_cursor, stream_json_list
 from tables.chat_messages_table import chat_messages
-from sqlalchemy import label, select
-from sqlalchemy import func
+from tables.thread_summary_table import thread_summary
+from sqlalchemy import label, literal, select, tuple_
 router = APIRouter(prefix="/chats",tags=["chats"])
+
+CHAT_PAGE_SIZE = int(os.getenv("CHAT_PAGE_SIZE", "100"))
+CHAT_PAGE_MAX = int(os.getenv("CHAT_PAGE_MAX", "500"))
+SIDEBAR_PAGE_SIZE = int(os.getenv("SIDEBAR_PAGE_SIZE", "50"))
+
 @router.get("/getAll")
 async def get_all_chats():
      return {"message": "Here are your chats"}
@@ -13,31 +21,85 @@ async def get_all_chats():
     
 
 @router.get("/getChatByThreadId")
-async def get_chat_by_thrad_id(threadId:int = Query(...)):
-     with engine.begin() as connection:
-          findMessages = select(chat_messages).where(chat_messages.c.thread_id==threadId).order_by(chat_messages.c.time_stamp.asc())
-          result = connection.execute(findMessages).mappings().fetchall()
-          return result
+async def get_chat_by_thrad_id(
+     threadId:int = Query(...),
+     limit:int = Query(CHAT_PAGE_SIZE, ge=1, le=CHAT_PAGE_MAX),
+     cursor:Optional[str] = Query(None, description="X-Next-Cursor of the previous page: older messages"),
+     since:Optional[str] = Query(None, description="X-Latest-Cursor of a previous response: only newer messages"),
+):
+     """
+     One page of a thread's messages in chronological order, keyset-paginated on (time_stamp, id).
+     Without cursor/since: the latest `limit` messages. X-Next-Cursor is set when there are more
+     (older with cursor, newer with since); X-Latest-Cursor is the newest message returned.
+     """
+     if cursor and since:
+          raise HTTPException(status_code=400, detail="Use either cursor or since, not both")
 
+     position = tuple_(chat_messages.c.time_stamp, chat_messages.c.id)
+     findMessages = select(chat_messages).where(chat_messages.c.thread_id==threadId)
+     if since:
+          # Walk forward from the client's newest message
+          findMessages = findMessages.where(position > tuple_(*decode_cursor(since))).order_by(
+               chat_messages.c.time_stamp.asc(), chat_messages.c.id.asc())
+     else:
+          # Walk backward from the newest message (or the cursor), returned oldest first
+          if cursor:
+               findMessages = findMessages.where(position < tuple_(*decode_cursor(cursor)))
+          findMessages = findMessages.order_by(chat_messages.c.time_stamp.desc(), chat_messages.c.id.desc())
 
+     async with async_engine.connect() as connection:
+          result = await connection.execute(findMessages.limit(limit + 1))
+          rows = result.mappings().fetchall()
 
-@router.get("/getFirstUserMessages")
-async def get_first_ai_messages():
+     has_more = len(rows) > limit
+     rows = rows[:limit]
+     if not since:
+          rows = rows[::-1]
+
+     headers = {}
+     if rows:
+          edge = rows[-1] if since else rows[0]
+          if has_more:
+               headers["X-Next-Cursor"] = encode_cursor(edge["time_stamp"], edge["id"])
+          headers["X-Latest-Cursor"] = encode_cursor(rows[-1]["time_stamp"], rows[-1]["id"])
+     elif since:
+          headers["X-Latest-Cursor"] = since
+     return stream_json_list(rows, headers=headers)
 
-    # Create a windowed row number
-     row_num = func.row_number().over(
-          partition_by=chat_messages.c.thread_id,
-          order_by=chat_messages.c.time_stamp.desc()
+
+
+@router.get("/getFirstUserMessages")
+async def get_first_ai_messages(
+     limit:int = Query(SIDEBAR_PAGE_SIZE, ge=1, le=CHAT_PAGE_MAX),
+     cursor:Optional[str] = Query(None, description="X-Next-Cursor of the previous page"),
+):
+     """
+     Sidebar entries: each thread's latest user message, most recently active first.
+     Reads the thread_summary projection, so the cost depends on the page size only.
+     """
+     summary = thread_summary.c
+     findThreads = (
+          select(
+               summary.thread_id,
+               label("message", summary.latest_user_message),
+               label("sender", literal("User")),
+               label("time_stamp", summary.latest_user_message_at),
+          )
+          .where(summary.latest_user_message_at.isnot(None))
+          .order_by(summary.latest_user_message_at.desc(), summary.thread_id.desc())
+          .limit(limit + 1)
      )
+     if cursor:
+          findThreads = findThreads.where(
+               tuple_(summary.latest_user_message_at, summary.thread_id) < tuple_(*decode_cursor(cursor))
+          )
+
+     async with async_engine.connect() as connection:
+          result = await connection.execute(findThreads)
+          rows = result.mappings().fetchall()
 
-     subquery = select(
-        chat_messages.c.thread_id,
-        chat_messages.c.message,
-        chat_messages.c.sender,
-        chat_messages.c.time_stamp,
-        label("row_num", row_num)
-    ).where(chat_messages.c.sender == 'User').subquery()
-     main_query = select(subquery).where(subquery.c.row_num == 1).order_by(subquery.c.time_stamp.desc())
-     with engine.begin() as connection:
-        result = connection.execute(main_query).mappings().fetchall()
-        return result
+     headers = {}
+     if len(rows) > limit:
+          rows = rows[:limit]
+          headers["X-Next-Cursor"] = encode_cursor(rows[-1]["time_stamp"], rows[-1]["thread_id"])
+     return stream_json_list(rows, headers=headers)
@@ -0,0 +1,27 @@
+from fastapi import APIRouter
+from chat.Two_way_Chatting.Main.Flow.message_gate import medical_message_gate
+from chat.Two_way_Chatting.Main.Flow.semantic_cache import semantic_response_cache
+from chat.Two_way_Chatting.Main.api.session_store import session_store
+from chat.Two_way_Chatting.Prompts.prompt_registry import prompt_registry
+from utils.checkpointer import checkpointer
+from utils.llm_gateway import llm_gateway
+from utils.single_flight import llm_single_flight
+from utils.message_writer import message_writer
+from utils.vectorstore_registry import vectorstore_registry
+
+router = APIRouter(prefix="/metrics",tags=["metrics"])
+
+
+@router.get("")
+async def get_metrics():
+    return {
+        "message_gate": medical_message_gate.stats(),
+        "semantic_cache": semantic_response_cache.stats(),
+        "checkpointer": checkpointer.stats(),
+        "session_store": session_store.stats(),
+        "message_writer": message_writer.stats(),
+        "llm_gateway": llm_gateway.stats(),
+        "llm_single_flight": llm_single_flight.stats(),
+        "prompts": prompt_registry.stats(),
+        "vectorstores": vectorstore_registry.stats(),
+    }
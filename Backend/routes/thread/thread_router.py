@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from utils.engine import engine
+from utils.engine import async_engine
 from tables.chat_thread_table import chat_thread
 from tables.chat_messages_table import chat_messages
 from datetime import datetime
@@ -8,8 +8,8 @@ router = APIRouter(prefix="/threads",tags=["threads"])
 
 @router.post("/saveInitialThread")
 async def createInitialThread():
-    with engine.begin() as connection:
-     result = connection.execute(   
+    async with async_engine.begin() as connection:
+     result = await connection.execute(   
         chat_thread.insert().values(user="ap", created_at=datetime.now())
       )
     inserted_id = result.inserted_primary_key[0]
@@ -19,9 +19,9 @@ async def createInitialThread():
 @router.get("/getInitalThread")
 async def get_initial_thread():
     from sqlalchemy import select, asc
-    with engine.connect() as connection:
+    async with async_engine.connect() as connection:
         stmt = select(chat_thread).order_by(asc(chat_thread.c.id)).limit(1)
-        result = connection.execute(stmt).mappings().fetchone()
+        result = (await connection.execute(stmt)).mappings().fetchone()
 
         if result:
           return result
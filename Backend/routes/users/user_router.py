@@ -1,7 +1,7 @@
 from fastapi import APIRouter
 from sqlalchemy import select
 from tables.user_table import user_table
-from utils.engine import engine
+from utils.engine import async_engine
 
 
 router = APIRouter(prefix="/users",tags=["Users"])
@@ -10,6 +10,6 @@ router = APIRouter(prefix="/users",tags=["Users"])
 @router.get("/getCurrentThreadId")
 async def get_user_current_threadId():
     get_user_thread_id = select(user_table.c.last_selected_thread_id)
-    with engine.begin() as connection:
-        result = connection.execute(get_user_thread_id).mappings().fetchone()
-        return result
\ No newline at end of file
+    async with async_engine.connect() as connection:
+        result = await connection.execute(get_user_thread_id)
+        return result.mappings().fetchone()
\ No newline at end of file
@@ -1,4 +1,4 @@
-from sqlalchemy import Table,Column,Integer,String,DateTime,func,ForeignKey,Enum
+from sqlalchemy import Table,Column,Integer,BigInteger,Identity,Index,String,DateTime,func,ForeignKey,Enum,text
 from utils.engine import meta
 
 
@@ -9,10 +9,14 @@ message_type_enum= Enum("A.I","User",name="message_type", create_type=True)
 chat_messages = Table(
     "chat_messages",
     meta,
+    Column('id',BigInteger,Identity(always=False),primary_key=True),
     Column('thread_id',Integer,ForeignKey("chat_thread.id",ondelete="CASCADE"),nullable=False),
     Column('message',String),
     Column('sender',message_type_enum,nullable=False),
-    Column('time_stamp',DateTime,default=func.now())
+    Column('time_stamp',DateTime,default=func.now()),
+    # Schema changes go through Alembic (migrations/versions), keep these in sync
+    Index('ix_chat_messages_thread_time','thread_id','time_stamp','id'),
+    Index('ix_chat_messages_user_thread_time','thread_id','time_stamp',postgresql_where=text("sender = 'User'")),
 )
 
 
@@ -0,0 +1,18 @@
+from sqlalchemy import Table,Column,Integer,String,DateTime,ForeignKey,Index,text
+from utils.engine import meta
+
+
+# Per-thread projection of chat_messages, upserted by utils/message_writer.py in the
+# same transaction as the messages themselves (see migrations/versions/0003)
+thread_summary = Table(
+    "thread_summary",
+    meta,
+    Column('thread_id',Integer,ForeignKey("chat_thread.id",ondelete="CASCADE"),primary_key=True),
+    Column('latest_user_message',String),
+    Column('latest_user_message_at',DateTime),
+    Column('last_activity_at',DateTime,nullable=False),
+    Column('message_count',Integer,nullable=False,server_default=text("0")),
+)
+
+Index('ix_thread_summary_latest_user',thread_summary.c.latest_user_message_at.desc(),thread_summary.c.thread_id.desc(),
+      postgresql_where=thread_summary.c.latest_user_message_at.isnot(None))
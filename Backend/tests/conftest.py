@@ -0,0 +1,14 @@
+import os
+import sys
+import tempfile
+
+# Modules import each other from the Backend root (e.g. "from utils.engine import ...")
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# utils.engine builds its URLs at import time; tests never open a Postgres connection
+for name, value in {"HOSTNAME": "localhost", "DATABASE": "medic", "USERNAME": "medic",
+                    "PASSWORD": "medic", "PORT_ID": "5432"}.items():
+    os.environ.setdefault(name, value)
+
+# The module-level checkpointer opens its SQLite file at import time
+os.environ.setdefault("CHECKPOINT_DB_PATH", os.path.join(tempfile.mkdtemp(prefix="medic-tests-"), "checkpoints.sqlite"))
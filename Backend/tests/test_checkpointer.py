@@ -0,0 +1,125 @@
+import asyncio
+import threading
+
+import pytest
+from langgraph.checkpoint.base import empty_checkpoint
+
+from utils.checkpointer import BoundedCheckpointSaver
+
+
+@pytest.fixture
+def saver(tmp_path):
+    checkpointer = BoundedCheckpointSaver(str(tmp_path / "checkpoints.sqlite"), keep_last=2, hot_threads=2,
+                                          prune_interval=3600)
+    yield checkpointer
+    checkpointer.close()
+
+
+def config(thread_id, checkpoint_id=None):
+    configurable = {"thread_id": thread_id, "checkpoint_ns": ""}
+    if checkpoint_id:
+        configurable["checkpoint_id"] = checkpoint_id
+    return {"configurable": configurable}
+
+
+def put(saver, thread_id):
+    checkpoint = empty_checkpoint()
+    saver.put(config(thread_id), checkpoint, {"source": "loop", "step": 0}, {})
+    return checkpoint["id"]
+
+
+def latest_id(saver, thread_id):
+    return saver.get_tuple(config(thread_id)).checkpoint["id"]
+
+
+def test_latest_checkpoint_is_served_from_memory(saver):
+    checkpoint_id = put(saver, "a")
+    assert latest_id(saver, "a") == checkpoint_id
+    assert latest_id(saver, "a") == checkpoint_id
+    assert (saver.hot_hits, saver.hot_misses) == (2, 0)
+
+
+def test_put_fills_the_cache_with_what_a_read_returns(saver):
+    first = put(saver, "a")
+    checkpoint = empty_checkpoint()
+    checkpoint["channel_values"] = {"messages": ["hi"]}
+    saver.put(config("a", first), checkpoint, {"source": "loop", "step": 1}, {})
+    checkpoint["channel_values"]["messages"].append("mutated after put")
+
+    cached = saver.get_tuple(config("a"))
+    assert saver.hot_hits == 1
+    assert cached == saver.saver.get_tuple(config("a"))
+    assert cached.parent_config["configurable"]["checkpoint_id"] == first
+
+
+def test_async_hit_does_not_touch_sqlite(saver):
+    checkpoint_id = put(saver, "a")
+
+    def no_reads(cfg):
+        raise AssertionError("read from SQLite")
+
+    saver.saver.get_tuple = no_reads
+    assert asyncio.run(saver.aget_tuple(config("a"))).checkpoint["id"] == checkpoint_id
+    assert saver.hot_hits == 1
+
+
+def test_put_replaces_the_cached_checkpoint(saver):
+    put(saver, "a")
+    latest_id(saver, "a")
+    newer = put(saver, "a")
+    assert latest_id(saver, "a") == newer
+
+
+def test_hot_cache_is_bounded(saver):
+    for thread_id in "abc":
+        put(saver, thread_id)
+        latest_id(saver, thread_id)
+    assert saver.stats()["hot_threads"] == 2
+
+
+def test_read_racing_a_put_does_not_cache_a_stale_checkpoint(saver):
+    stale = put(saver, "a")
+    # Evicted, so the next read goes to SQLite
+    saver._invalidate("a")
+    reading, release_read = threading.Event(), threading.Event()
+    read_from_db = saver.saver.get_tuple
+
+    def slow_get_tuple(cfg):
+        result = read_from_db(cfg)
+        reading.set()
+        release_read.wait(2)
+        return result
+
+    saver.saver.get_tuple = slow_get_tuple
+    reader = threading.Thread(target=saver.get_tuple, args=(config("a"),))
+    reader.start()
+    assert reading.wait(2)
+
+    # The put must wait for the in-flight read of the same thread, then replace what it cached
+    newer_holder = []
+    writer = threading.Thread(target=lambda: newer_holder.append(put(saver, "a")))
+    writer.start()
+    writer.join(0.1)
+    assert writer.is_alive()
+
+    release_read.set()
+    reader.join(2)
+    writer.join(2)
+    saver.saver.get_tuple = read_from_db
+
+    assert latest_id(saver, "a") == newer_holder[0] != stale
+
+
+def test_pruning_keeps_the_newest_checkpoints(saver):
+    ids = [put(saver, "a") for _ in range(5)]
+    saver.prune_dirty_threads()
+    remaining = [item.checkpoint["id"] for item in saver.list(config("a"))]
+    assert sorted(remaining) == sorted(ids[-2:])
+    assert latest_id(saver, "a") == ids[-1]
+
+
+def test_delete_thread_drops_the_cached_checkpoint(saver):
+    put(saver, "a")
+    latest_id(saver, "a")
+    saver.delete_thread("a")
+    assert saver.get_tuple(config("a")) is None
@@ -0,0 +1,65 @@
+import pytest
+from langchain_core.documents import Document
+
+from chat.One_Way_Chatting.chunking import (
+    chunking_config, heading_prefix, pack, split_documents, split_sections, split_sentences,
+)
+
+
+def page(text, source="guide.pdf", number=0):
+    return Document(page_content=text, metadata={"source": source, "page": number})
+
+
+def test_sentences_split_on_terminal_punctuation():
+    assert split_sentences("Take 500 mg. Repeat after 6 hours! Is it safe? Yes.") == [
+        "Take 500 mg.", "Repeat after 6 hours!", "Is it safe?", "Yes.",
+    ]
+
+
+def test_pack_respects_size_and_carries_overlap():
+    sentences = [f"Sentence number {i} is here." for i in range(20)]
+    chunks = pack(sentences, chunk_size=100, chunk_overlap=30)
+    assert all(len(chunk) <= 100 for chunk in chunks)
+    for previous, current in zip(chunks, chunks[1:]):
+        assert current.startswith(previous.split(". ")[-1].rstrip("."))
+
+
+def test_heading_carries_onto_the_next_page_of_the_same_document():
+    pages = [
+        page("DOSAGE\n\nAdults take one tablet.", number=0),
+        page("Children take half a tablet.", number=1),
+        page("Unrelated text on its own.", source="other.pdf"),
+    ]
+    chunks = split_documents(pages, strategy="section", chunk_size=200, chunk_overlap=0)
+    assert [chunk.page_content for chunk in chunks] == [
+        "DOSAGE\nAdults take one tablet.",
+        "DOSAGE\nChildren take half a tablet.",
+        "Unrelated text on its own.",
+    ]
+    assert chunks[1].metadata["page"] == 1
+
+
+def test_a_new_heading_closes_the_previous_section():
+    chunks, heading = split_sections("DOSAGE\n\nOne tablet.\n\nSIDE EFFECTS\n\nNausea.", 200, 0)
+    assert chunks == ["DOSAGE\nOne tablet.", "SIDE EFFECTS\nNausea."]
+    assert heading == "SIDE EFFECTS"
+
+
+def test_long_heading_leaves_a_body_budget_above_the_overlap():
+    heading = "1. " + "Pharmacokinetics " * 8
+    text = heading + "\n\n" + " ".join(f"Sentence {i} about absorption." for i in range(30))
+    chunk_size, chunk_overlap = 120, 50
+    prefix = heading_prefix(heading.strip(), chunk_size, chunk_overlap)
+    assert chunk_size - len(prefix) > chunk_overlap
+
+    chunks, _ = split_sections(text, chunk_size, chunk_overlap)
+    assert chunks and all(len(chunk) <= chunk_size for chunk in chunks)
+    assert all(chunk.startswith(prefix) for chunk in chunks)
+
+
+def test_chunking_config_validates():
+    with pytest.raises(ValueError):
+        chunking_config(strategy="paragraphs")
+    with pytest.raises(ValueError):
+        chunking_config(chunk_size=100, chunk_overlap=100)
+    assert chunking_config("section", 400, 40)["strategy"] == "section"
@@ -0,0 +1,61 @@
+import asyncio
+import threading
+
+from utils.embedding_batcher import EmbeddingBatcher
+
+
+class GatedModel:
+    """
+    embed_batch that holds every batch until the gate opens
+    """
+
+    def __init__(self):
+        self.gate = threading.Event()
+        self.started = threading.Event()
+
+    def embed_batch(self, texts):
+        self.started.set()
+        self.gate.wait(5)
+        return [[float(len(text))] for text in texts]
+
+
+def test_batches_overlapping_requests():
+    model = GatedModel()
+    model.gate.set()
+    batcher = EmbeddingBatcher(model.embed_batch, max_wait_ms=50)
+    futures = [batcher.submit(text) for text in ["a", "bb", "a"]]
+    assert [future.result(timeout=2) for future in futures] == [[1.0], [2.0], [1.0]]
+    assert batcher.stats()["resolved"] == 3
+
+
+def test_cancelled_callers_do_not_stop_the_worker():
+    model = GatedModel()
+    batcher = EmbeddingBatcher(model.embed_batch, max_wait_ms=0)
+
+    async def scenario():
+        # "a" is being encoded when its caller goes away
+        encoding = asyncio.ensure_future(batcher.aembed_query("a"))
+        await asyncio.to_thread(model.started.wait, 2)
+        encoding.cancel()
+        # "bb" is cancelled while it still waits in the queue
+        queued = asyncio.ensure_future(batcher.aembed_query("bb"))
+        await asyncio.sleep(0.01)
+        queued.cancel()
+        await asyncio.gather(encoding, queued, return_exceptions=True)
+
+    asyncio.run(scenario())
+    later = batcher.submit("ccc")
+    model.gate.set()
+    assert later.result(timeout=2) == [3.0]
+    assert batcher.stats()["running"]
+    assert batcher.stats()["cancelled"] == 1
+
+
+def test_failed_batch_resolves_every_caller():
+    def broken(texts):
+        raise RuntimeError("model unavailable")
+
+    batcher = EmbeddingBatcher(broken, max_wait_ms=0)
+    future = batcher.submit("a")
+    assert isinstance(future.exception(timeout=2), RuntimeError)
+    assert batcher.stats()["running"]
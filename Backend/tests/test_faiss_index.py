@@ -0,0 +1,104 @@
+import os
+
+import faiss
+import numpy as np
+import pytest
+
+from utils.faiss_index import (
+    INDEX_FILE, add_documents, build_index, is_memory_mapped, read_index, remove_documents, resolve_params
+)
+
+
+def rss_mb():
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+
+
+def vectors(count, dimension=64, seed=0):
+    return np.random.default_rng(seed).random((count, dimension), dtype="float32")
+
+
+def save(tmp_path, index):
+    faiss.write_index(index, str(tmp_path / INDEX_FILE))
+    return str(tmp_path)
+
+
+@pytest.mark.parametrize("index_type", ["flat", "hnsw"])
+def test_mmap_read_uses_the_file_mapping(tmp_path, index_type):
+    data = vectors(2000)
+    params = resolve_params(index_type, data.shape[1], len(data))
+    path = save(tmp_path, build_index(data, index_type, params))
+
+    mapped = read_index(path, mmap=True)
+
+    assert is_memory_mapped(os.path.join(path, INDEX_FILE))
+    _, expected = read_index(path, mmap=False).search(data[:5], 3)
+    _, found = mapped.search(data[:5], 3)
+    assert (found == expected).all()
+
+
+@pytest.mark.skipif(not os.path.exists("/proc/self/statm"), reason="needs /proc")
+def test_mapped_flat_index_is_not_copied_into_the_heap(tmp_path):
+    # 40000 x 384 floats is ~59 MB on disk
+    path = save(tmp_path, build_index(vectors(40000, 384), "flat"))
+
+    before = rss_mb()
+    index = read_index(path, mmap=True)
+    assert index.ntotal == 40000
+    assert rss_mb() - before < 10
+
+
+def test_unmapped_read_is_not_mapped(tmp_path):
+    path = save(tmp_path, build_index(vectors(100), "flat"))
+    index = read_index(path, mmap=False)
+    assert index.ntotal == 100
+    assert not is_memory_mapped(os.path.join(path, INDEX_FILE))
+
+
+def test_ivfpq_params_fit_the_corpus():
+    params = resolve_params("ivfpq", 384, 10000)
+    assert params["nlist"] <= 10000 // 39
+    assert params["nprobe"] <= params["nlist"]
+    with pytest.raises(ValueError):
+        resolve_params("ivfpq", 384, 100)
+    with pytest.raises(ValueError):
+        resolve_params("ivfpq", 384, 10000, {"pq_m": 50})
+
+
+def vectorstore(data, index_type):
+    from langchain_community.docstore.in_memory import InMemoryDocstore
+    from langchain_community.vectorstores import FAISS
+    from langchain_core.documents import Document
+
+    params = resolve_params(index_type, data.shape[1], len(data), {"pq_m": 8, "pq_bits": 4})
+    ids = [f"doc-{i}" for i in range(len(data))]
+    docstore = InMemoryDocstore({doc_id: Document(page_content=doc_id) for doc_id in ids})
+    db = FAISS(None, build_index(data, index_type, params), docstore, dict(enumerate(ids)))
+    return db, params
+
+
+def found_ids(db, query, k=10):
+    return [doc.page_content for doc in db.similarity_search_by_vector(query.tolist(), k=k)]
+
+
+@pytest.mark.parametrize("index_type", ["flat", "ivfpq", "hnsw"])
+def test_delete_then_search_and_add(index_type):
+    data = vectors(2000)
+    db, params = vectorstore(data, index_type)
+    removed = [f"doc-{i}" for i in range(1000)]
+
+    remove_documents(db, removed, index_type, params)
+
+    assert db.index.ntotal == len(db.index_to_docstore_id) == 1000
+    for row in (1500, 1999):
+        results = found_ids(db, data[row])
+        assert f"doc-{row}" in results
+        assert not set(results) & set(removed)
+
+    extra = vectors(5, seed=1)
+    new_ids = [f"new-{i}" for i in range(5)]
+    add_documents(db, new_ids, extra, [{} for _ in new_ids], new_ids, index_type)
+
+    assert len(set(db.index_to_docstore_id)) == db.index.ntotal == 1005
+    assert "new-3" in found_ids(db, extra[3])
+    assert "doc-1500" in found_ids(db, data[1500])
@@ -0,0 +1,164 @@
+import asyncio
+import json
+import threading
+
+import httpx
+import pytest
+
+import utils.llm_gateway as llm_gateway_module
+from utils.llm_gateway import AsyncGatewayTransport, GatewayTransport, LLMGateway, LLMGatewayTimeout
+
+COMPLETIONS_URL = "https://api.groq.com/openai/v1/chat/completions"
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(llm_gateway_module, "BACKOFF_BASE_SECONDS", 0.0)
+
+
+def make_gateway(**kwargs):
+    options = {"max_in_flight": 4, "requests_per_minute": 10000, "tokens_per_minute": 10 ** 7,
+               "queue_timeout": 2.0, "max_retries": 3}
+    options.update(kwargs)
+    return LLMGateway(**options)
+
+
+def completion_request():
+    body = json.dumps({"messages": [{"role": "user", "content": "hello"}], "max_tokens": 10}).encode()
+    return httpx.Request("POST", COMPLETIONS_URL, content=body)
+
+
+def scripted(responses):
+    """
+    Mock transport returning (or raising) each scripted item in turn
+    """
+    calls = []
+
+    def handler(request):
+        item = responses[len(calls)]
+        calls.append(request)
+        if isinstance(item, Exception):
+            raise item
+        return httpx.Response(item, json={"status": item})
+
+    return httpx.MockTransport(handler), calls
+
+
+@pytest.mark.parametrize("status", [500, 502, 503, 408, 409, 429])
+def test_retryable_statuses_are_retried(status):
+    gateway = make_gateway()
+    transport, calls = scripted([status, 200])
+    response = GatewayTransport(gateway, transport).handle_request(completion_request())
+    response.read()
+    response.close()
+    assert response.status_code == 200
+    assert len(calls) == 2
+    assert gateway.metrics["retries"] == 1
+    assert gateway.stats()["in_flight"] == 0
+
+
+def test_client_errors_are_not_retried():
+    gateway = make_gateway()
+    transport, calls = scripted([400])
+    response = GatewayTransport(gateway, transport).handle_request(completion_request())
+    response.close()
+    assert response.status_code == 400
+    assert len(calls) == 1
+
+
+def test_connection_errors_are_retried_then_raised():
+    gateway = make_gateway(max_retries=2)
+    error = httpx.ConnectError("connection refused")
+    transport, calls = scripted([error, error, error])
+    with pytest.raises(httpx.ConnectError):
+        GatewayTransport(gateway, transport).handle_request(completion_request())
+    assert len(calls) == 3
+    assert gateway.metrics["connection_errors"] == 2
+    assert gateway.stats()["in_flight"] == 0
+
+
+def test_async_transport_retries_server_errors():
+    gateway = make_gateway()
+    transport, calls = scripted([503, 200])
+
+    async def run():
+        response = await AsyncGatewayTransport(gateway, transport).handle_async_request(completion_request())
+        await response.aread()
+        await response.aclose()
+        return response
+
+    assert asyncio.run(run()).status_code == 200
+    assert len(calls) == 2
+
+
+def test_waiters_are_admitted_in_arrival_order():
+    gateway = make_gateway(max_in_flight=1)
+    gateway.acquire(1)
+    order = []
+
+    async def waiter(name):
+        await gateway.aacquire(1)
+        order.append(name)
+
+    async def run():
+        tasks = []
+        for name in range(5):
+            tasks.append(asyncio.create_task(waiter(name)))
+            await asyncio.sleep(0)
+        for _ in range(5):
+            await asyncio.sleep(0.01)
+            gateway.release()
+        await asyncio.gather(*tasks)
+
+    asyncio.run(run())
+    assert order == [0, 1, 2, 3, 4]
+
+
+def test_release_wakes_a_blocked_thread():
+    gateway = make_gateway(max_in_flight=1)
+    gateway.acquire(1)
+    admitted = threading.Event()
+
+    thread = threading.Thread(target=lambda: (gateway.acquire(1), admitted.set()))
+    thread.start()
+    assert not admitted.wait(0.05)
+    gateway.release()
+    assert admitted.wait(1)
+    thread.join()
+
+
+def test_queue_timeout_leaves_the_queue():
+    gateway = make_gateway(max_in_flight=1, queue_timeout=0.05)
+    gateway.acquire(1)
+    with pytest.raises(LLMGatewayTimeout):
+        gateway.acquire(1)
+    stats = gateway.stats()
+    assert stats["queue_depth"] == 0
+    assert stats["queue_timeouts"] == 1
+    gateway.release()
+    gateway.acquire(1)
+
+
+def test_cancelled_waiter_is_not_a_queue_timeout():
+    gateway = make_gateway(max_in_flight=1, queue_timeout=5)
+    gateway.acquire(1)
+
+    async def run():
+        task = asyncio.create_task(gateway.aacquire(1))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(run())
+    stats = gateway.stats()
+    assert stats["queue_depth"] == 0
+    assert (stats["queue_timeouts"], stats["queue_cancellations"]) == (0, 1)
+
+
+def test_async_queue_timeout_is_counted():
+    gateway = make_gateway(max_in_flight=1, queue_timeout=0.05)
+    gateway.acquire(1)
+    with pytest.raises(LLMGatewayTimeout):
+        asyncio.run(gateway.aacquire(1))
+    assert (gateway.stats()["queue_timeouts"], gateway.stats()["queue_cancellations"]) == (1, 0)
@@ -0,0 +1,52 @@
+import asyncio
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from chat.Two_way_Chatting.Memory.memory_strategies import (
+    CHAT_MEMORY_STRATEGY, FullMemory, SummaryWindowMemory, WindowMemory, build_memory_strategy
+)
+
+
+def conversation(turns):
+    messages = []
+    for turn in range(turns):
+        messages += [HumanMessage(content=f"patient {turn}"), AIMessage(content=f"doctor {turn}")]
+    return {"messages": messages}
+
+
+class EchoSummarizer:
+    async def asummarize(self, summary, messages):
+        return f"{len(messages)} earlier messages"
+
+
+def test_default_matches_the_previous_prompt_context():
+    # Before memory strategies the prompt showed the last 4 messages and nothing was trimmed
+    assert CHAT_MEMORY_STRATEGY == "full"
+    strategy = build_memory_strategy()
+    state = conversation(10)
+
+    assert asyncio.run(strategy.acompact(state)) == {}
+    assert strategy.render_history(state) == ["Patient: patient 8", "Dr. Sarah: doctor 8",
+                                              "Patient: patient 9", "Dr. Sarah: doctor 9"]
+
+
+def test_full_memory_can_render_everything():
+    assert len(FullMemory(prompt_messages=None).render_history(conversation(10))) == 20
+
+
+def test_window_keeps_and_renders_the_last_messages():
+    strategy = WindowMemory(window=6)
+    state = conversation(10)
+    state.update(asyncio.run(strategy.acompact(state)))
+
+    assert len(state["messages"]) == 6
+    assert strategy.render_history(state)[0] == "Patient: patient 7"
+
+
+def test_summary_window_folds_older_messages_into_the_summary():
+    strategy = SummaryWindowMemory(window=4, summarizer=EchoSummarizer())
+    state = conversation(5)
+    state.update(asyncio.run(strategy.acompact(state)))
+
+    assert len(state["messages"]) == 4
+    assert strategy.render_history(state)[0] == "Earlier in this conversation (summary): 6 earlier messages"
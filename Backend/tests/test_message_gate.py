@@ -0,0 +1,58 @@
+import pytest
+
+from chat.Two_way_Chatting.Main.Flow.message_gate import MedicalMessageGate
+
+
+@pytest.fixture
+def gate():
+    return MedicalMessageGate()
+
+
+def decide(gate, message, message_pattern="normal", previous=None, symptoms=None):
+    return gate._decide(message, message_pattern, previous or [], symptoms or [])
+
+
+@pytest.mark.parametrize("message", [
+    "I got food poisoning at the hotel",
+    "I have jet lag after my flight",
+    "I got a bug bite",
+])
+def test_medical_messages_with_off_topic_words_are_not_rejected(gate, message):
+    result = decide(gate, message)
+    assert result is None or result["allowed"]
+
+
+@pytest.mark.parametrize("message, message_pattern", [
+    ("write a poem about coffee", "vague_symptoms"),
+    ("Doctor, who won the 2018 world cup?", "normal"),
+    ("What period did the Roman empire fall in?", "normal"),
+    ("is it cold in paris in march", "normal"),
+    ("heart of darkness the novel", "normal"),
+])
+def test_off_topic_messages_are_not_allowed_locally(gate, message, message_pattern):
+    result = decide(gate, message, message_pattern)
+    assert result is None or not result["allowed"]
+
+
+def test_clear_off_topic_request_is_rejected(gate):
+    result = decide(gate, "write a poem about coffee", "vague_symptoms")
+    assert result["allowed"] is False
+
+
+def test_clear_symptoms_are_allowed(gate):
+    result = decide(gate, "I have a headache and a fever since yesterday")
+    assert result["allowed"] and result["confidence"] == "high"
+
+
+def test_words_match_whole_words_only(gate):
+    assert gate.medical_hits("the painter made a mural") == 0
+    assert gate.medical_hits("my back pain") == 1
+
+
+def test_short_follow_up_in_medical_conversation_is_allowed(gate):
+    result = decide(gate, "since yesterday evening", previous=["my stomach hurts"])
+    assert result["allowed"]
+
+
+def test_disabled_gate_escalates_everything():
+    assert MedicalMessageGate(enabled=False).classify("I have a fever and a cough") is None
@@ -0,0 +1,106 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+import pytest
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+import utils.message_writer as message_writer_module
+from utils.message_writer import MessageWriter
+
+
+class FakeEngine:
+    """
+    Stands in for async_engine: each begin() is one transaction
+    """
+
+    def __init__(self):
+        self.transactions = 0
+
+    @asynccontextmanager
+    async def begin(self):
+        self.transactions += 1
+        yield object()
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    fake = FakeEngine()
+    monkeypatch.setattr(message_writer_module, "async_engine", fake)
+    return fake
+
+
+def make_writer(monkeypatch, insert):
+    writer = MessageWriter(batch_size=200, flush_ms=1, max_retries=2)
+    written = []
+
+    async def fake_insert(connection, rows):
+        insert(rows)
+        written.extend(rows)
+
+    monkeypatch.setattr(writer, "_insert", fake_insert)
+    monkeypatch.setattr(message_writer_module.asyncio, "sleep", _no_sleep)
+    return writer, written
+
+
+async def _no_sleep(_):
+    return None
+
+
+def batch_of(count, loop):
+    return [({"thread_id": thread_id, "sender": "User", "message": f"m{thread_id}", "time_stamp": None},
+             loop.create_future()) for thread_id in range(count)]
+
+
+def test_bad_row_only_fails_its_own_future(engine, monkeypatch):
+    def insert(rows):
+        if any(row["thread_id"] == 7 for row in rows):
+            raise IntegrityError("INSERT", {}, Exception("violates foreign key constraint"))
+
+    writer, written = make_writer(monkeypatch, insert)
+
+    async def run():
+        batch = batch_of(20, asyncio.get_running_loop())
+        await writer._write(batch)
+        return batch
+
+    batch = asyncio.run(run())
+    failed = [row["thread_id"] for row, future in batch if future.exception() is not None]
+    assert failed == [7]
+    assert sorted(row["thread_id"] for row in written) == [i for i in range(20) if i != 7]
+    assert writer.metrics["failed"] == 1
+    assert writer.metrics["written"] == 19
+
+
+def test_transient_errors_are_retried_without_bisecting(engine, monkeypatch):
+    failures = iter([True, True, False])
+
+    def insert(rows):
+        if next(failures):
+            raise OperationalError("INSERT", {}, Exception("connection reset"))
+
+    writer, written = make_writer(monkeypatch, insert)
+
+    async def run():
+        batch = batch_of(5, asyncio.get_running_loop())
+        await writer._write(batch)
+        return batch
+
+    batch = asyncio.run(run())
+    assert all(future.result() is True for _, future in batch)
+    assert writer.metrics["retries"] == 2
+    assert writer.metrics["bisections"] == 0
+    assert engine.transactions == 3
+
+
+def test_stop_flushes_everything_enqueued(engine, monkeypatch):
+    writer, written = make_writer(monkeypatch, lambda rows: None)
+
+    async def run():
+        writer.start()
+        futures = [writer.enqueue(thread_id, "User", "hello") for thread_id in range(50)]
+        await writer.stop()
+        return futures
+
+    futures = asyncio.run(run())
+    assert all(future.done() and future.result() for future in futures)
+    assert len(written) == 50
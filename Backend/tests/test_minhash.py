@@ -0,0 +1,32 @@
+from utils.minhash import MinHasher, NearDuplicateFilter
+
+TEXT = ("Paracetamol is used to treat mild to moderate pain and to reduce fever. "
+        "Adults may take one to two tablets every four to six hours, not exceeding eight tablets a day.")
+
+
+def test_identical_texts_have_identical_signatures():
+    hasher = MinHasher()
+    assert MinHasher.similarity(hasher.signature(TEXT), hasher.signature(TEXT)) == 1.0
+
+
+def test_near_duplicates_are_dropped():
+    dedup = NearDuplicateFilter(threshold=0.8)
+    assert dedup.add(TEXT)
+    assert not dedup.add(TEXT.replace("treat", "Treat") + " ")
+    assert dedup.dropped == 1
+    assert dedup.duplicate_ratio == 0.5
+
+
+def test_distinct_texts_are_kept():
+    dedup = NearDuplicateFilter(threshold=0.8)
+    assert dedup.add(TEXT)
+    assert dedup.add("Ibuprofen is a non-steroidal anti-inflammatory drug that should be taken with food "
+                     "to avoid stomach irritation, and is not suitable for people with certain kidney problems.")
+    assert dedup.dropped == 0
+
+
+def test_small_edits_still_match_at_a_lower_threshold():
+    hasher = MinHasher(num_perm=128)
+    edited = TEXT.replace("every four to six hours", "every 4 to 6 hours")
+    similarity = MinHasher.similarity(hasher.signature(TEXT), hasher.signature(edited))
+    assert 0.3 < similarity < 1.0
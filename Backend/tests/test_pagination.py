@@ -0,0 +1,35 @@
+import asyncio
+import json
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+
+from utils.pagination import STREAM_CHUNK_ROWS, decode_cursor, encode_cursor, stream_json_list
+
+
+def test_cursor_round_trips():
+    time_stamp = datetime(2024, 5, 1, 12, 30, 15, 123456)
+    assert decode_cursor(encode_cursor(time_stamp, 42)) == (time_stamp, 42)
+
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor", "", encode_cursor(datetime(2024, 1, 1), 1)[:-3] + "@@@"])
+def test_invalid_cursor_is_a_400(cursor):
+    with pytest.raises(HTTPException) as raised:
+        decode_cursor(cursor)
+    assert raised.value.status_code == 400
+
+
+def body_of(response):
+    async def read():
+        return "".join([chunk async for chunk in response.body_iterator])
+
+    return json.loads(asyncio.run(read()))
+
+
+@pytest.mark.parametrize("count", [0, 1, STREAM_CHUNK_ROWS, STREAM_CHUNK_ROWS * 2 + 3])
+def test_streamed_list_is_valid_json(count):
+    rows = [{"id": i, "time_stamp": datetime(2024, 1, 1, 0, 0, i % 60)} for i in range(count)]
+    body = body_of(stream_json_list(rows, headers={"X-Next-Cursor": "abc"}))
+    assert [row["id"] for row in body] == list(range(count))
+    assert all(isinstance(row["time_stamp"], str) for row in body)
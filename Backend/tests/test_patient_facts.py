@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+
+from chat.Two_way_Chatting.Main.Flow import patient_facts
+from chat.Two_way_Chatting.Main.Flow.patient_facts import FactCanonicalizer, distinguishing_tokens, merge_extracted_info
+
+
+@pytest.fixture(autouse=True)
+def identical_embeddings(monkeypatch):
+    # Every name embeds to the same vector, so only the guard keeps facts apart
+    monkeypatch.setattr(patient_facts, "_embed_name", lambda name: np.ones(4, dtype="float32") / 2)
+
+
+def test_distinguishing_tokens():
+    assert distinguishing_tokens("takes 10 mg amlodipine") == (("10",), frozenset())
+    assert distinguishing_tokens("left knee pain") == ((), frozenset({"left"}))
+
+
+@pytest.mark.parametrize("existing, name", [
+    ("takes 5 mg amlodipine", "takes 10 mg amlodipine"),
+    ("amlodipine 2.5", "amlodipine 5"),
+    ("left knee pain", "right knee pain"),
+    ("left knee pain", "knee pain"),
+    ("left knee pain", "bilateral knee pain"),
+])
+def test_dosage_or_side_never_merges(existing, name):
+    canonicalizer = FactCanonicalizer(threshold=0.88)
+    assert canonicalizer.canonical("symptoms", name, [existing]) == name
+
+
+def test_matching_numbers_and_side_still_merge():
+    canonicalizer = FactCanonicalizer(threshold=0.88)
+    assert canonicalizer.canonical("medications", "amlodipine 5mg", ["amlodipine 5 mg"]) == "amlodipine 5 mg"
+    assert canonicalizer.canonical("symptoms", "pain in left knee", ["left knee pain"]) == "left knee pain"
+
+
+def test_merge_keeps_distinct_facts():
+    facts = merge_extracted_info(None, {
+        "symptoms": [{"name": "left knee pain", "severity": "mild"}],
+        "medications": [{"name": "takes 5 mg amlodipine"}],
+    })
+    facts = merge_extracted_info(facts, {
+        "symptoms": [{"name": "right knee pain", "severity": "severe"}],
+        "medications": [{"name": "takes 10 mg amlodipine"}],
+    })
+    assert set(facts["symptoms"]) == {"left knee pain", "right knee pain"}
+    assert facts["symptoms"]["left knee pain"]["severity"] == "mild"
+    assert set(facts["medications"]) == {"takes 5 mg amlodipine", "takes 10 mg amlodipine"}
+
+
+def test_side_in_location_keeps_facts_apart():
+    facts = merge_extracted_info(None, {"symptoms": [{"name": "knee pain", "location": "left knee", "severity": "mild"}]})
+    facts = merge_extracted_info(facts, {"symptoms": [{"name": "knee pain", "location": "right knee", "severity": "severe"}]})
+
+    by_location = {fact["location"]: fact for fact in facts["symptoms"].values()}
+    assert set(by_location) == {"left knee", "right knee"}
+    assert by_location["left knee"]["severity"] == "mild"
+    assert {fact["name"] for fact in facts["symptoms"].values()} == {"knee pain"}
+
+
+def test_details_without_a_side_update_the_existing_fact():
+    facts = merge_extracted_info(None, {"symptoms": [{"name": "knee pain"}]})
+    facts = merge_extracted_info(facts, {"symptoms": [{"name": "knee pain", "location": "left knee"}]})
+    facts = merge_extracted_info(facts, {"symptoms": [{"name": "knee pain", "duration": "3 days"}]})
+
+    assert list(facts["symptoms"].values()) == [
+        {"name": "knee pain", "location": "left knee", "duration": "3 days", "updated_turn": 3}
+    ]
+
+
+def test_dosage_field_keeps_strengths_apart():
+    facts = merge_extracted_info(None, {"medications": [{"name": "amlodipine", "dosage": "5 mg"}]})
+    facts = merge_extracted_info(facts, {"medications": [{"name": "amlodipine", "dosage": "10mg"}]})
+    facts = merge_extracted_info(facts, {"medications": [{"name": "amlodipine", "dosage": "5mg", "frequency": "daily"}]})
+
+    by_dosage = {fact["dosage"]: fact for fact in facts["medications"].values()}
+    assert set(by_dosage) == {"5mg", "10mg"}
+    assert by_dosage["5mg"]["frequency"] == "daily"
+
+
+def test_brand_alias_keeps_its_strength():
+    facts = merge_extracted_info(None, {"medications": [{"name": "Dolo 650"}]})
+    facts = merge_extracted_info(facts, {"medications": [{"name": "paracetamol", "dosage": "500 mg"}]})
+
+    assert sorted(fact.get("dosage") for fact in facts["medications"].values()) == ["500 mg", "650"]
+    assert {fact["name"] for fact in facts["medications"].values()} == {"paracetamol"}
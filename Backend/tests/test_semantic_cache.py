@@ -0,0 +1,52 @@
+import asyncio
+
+from chat.Two_way_Chatting.Main.Flow.semantic_cache import SemanticResponseCache
+
+ANONYMOUS = {"name": "Anonymous", "age": 34, "gender": "female"}
+
+
+class KeywordEmbeddings:
+    """
+    One dimension per known word, so identical messages match and unrelated ones do not
+    """
+
+    WORDS = ["headache", "fever", "cough", "rash", "adult", "child"]
+
+    def embed_query(self, text):
+        words = text.lower().replace(":", " ").replace("|", " ").split()
+        return [float(word in words) for word in self.WORDS] + [0.1]
+
+
+def make_cache():
+    return SemanticResponseCache(KeywordEmbeddings(), threshold=0.95)
+
+
+def test_caches_only_the_reply_text():
+    cache = make_cache()
+    cache.store("I have a headache", ANONYMOUS, "Drink water and rest.")
+    assert cache.lookup("I have a headache", ANONYMOUS) == "Drink water and rest."
+    entry = next(iter(cache._entries.values()))
+    assert set(entry) == {"bucket", "response", "created_at"}
+
+
+def test_miss_for_other_message_or_bucket():
+    cache = make_cache()
+    cache.store("I have a headache", ANONYMOUS, "Drink water and rest.")
+    assert cache.lookup("I have a rash", ANONYMOUS) is None
+    assert cache.lookup("I have a headache", {**ANONYMOUS, "age": 8}) is None
+    assert cache.stats()["hits"] == 0
+
+
+def test_named_patients_are_not_cached():
+    cache = make_cache()
+    named = {**ANONYMOUS, "name": "Sam"}
+    cache.store("I have a headache", named, "Sam, drink water and rest.")
+    assert cache.stats()["size"] == 0
+    cache.store("I have a headache", ANONYMOUS, "Drink water and rest.")
+    assert cache.lookup("I have a headache", named) is None
+
+
+def test_async_round_trip():
+    cache = make_cache()
+    asyncio.run(cache.astore("fever and cough", ANONYMOUS, "Rest and fluids."))
+    assert asyncio.run(cache.alookup("fever and cough", ANONYMOUS)) == "Rest and fluids."
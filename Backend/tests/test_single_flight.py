@@ -0,0 +1,127 @@
+import asyncio
+import threading
+
+import httpx
+import pytest
+
+from utils.single_flight import AsyncSingleFlightTransport, SingleFlight, SingleFlightTransport
+
+URL = "https://api.groq.com/openai/v1/chat/completions"
+BODY = b'{"messages": [{"role": "user", "content": "hi"}], "stream": true}'
+
+
+class GatedStream(httpx.AsyncByteStream):
+    """
+    Yields the first chunk, then waits for the gate before the rest
+    """
+
+    def __init__(self, gate):
+        self.gate = gate
+
+    async def __aiter__(self):
+        yield b"first,"
+        await self.gate.wait()
+        yield b"second"
+
+
+class CountingAsyncTransport(httpx.AsyncBaseTransport):
+    def __init__(self):
+        self.calls = 0
+        self.gate = asyncio.Event()
+
+    async def handle_async_request(self, request):
+        self.calls += 1
+        return httpx.Response(200, stream=GatedStream(self.gate))
+
+
+def request():
+    return httpx.Request("POST", URL, content=BODY)
+
+
+def test_identical_concurrent_requests_share_one_upstream_call():
+    async def run():
+        upstream = CountingAsyncTransport()
+        transport = AsyncSingleFlightTransport(SingleFlight(), upstream)
+
+        async def call():
+            response = await transport.handle_async_request(request())
+            return await response.aread()
+
+        tasks = [asyncio.create_task(call()) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        upstream.gate.set()
+        return upstream.calls, await asyncio.gather(*tasks)
+
+    calls, bodies = asyncio.run(run())
+    assert calls == 1
+    assert bodies == [b"first,second"] * 3
+
+
+def test_followers_see_an_error_when_the_upstream_call_is_cancelled():
+    async def run():
+        single_flight = SingleFlight()
+        transport = AsyncSingleFlightTransport(single_flight, CountingAsyncTransport())
+        responses = [await transport.handle_async_request(request()) for _ in range(2)]
+        flight = next(iter(single_flight._async_flights.values()))
+        await asyncio.sleep(0.01)
+
+        flight.task.cancel()
+        results = []
+        for response in responses:
+            try:
+                results.append(await response.aread())
+            except httpx.ReadError as e:
+                results.append(e)
+        return results
+
+    results = asyncio.run(run())
+    assert all(isinstance(result, httpx.ReadError) for result in results)
+
+
+class CountingSyncTransport(httpx.BaseTransport):
+    def __init__(self):
+        self.calls = 0
+        self.entered = threading.Event()
+        self.gate = threading.Event()
+
+    def handle_request(self, request):
+        self.calls += 1
+        self.entered.set()
+        self.gate.wait(2)
+        return httpx.Response(200, content=b"answer")
+
+
+def test_sync_followers_share_the_leader_response():
+    upstream = CountingSyncTransport()
+    transport = SingleFlightTransport(SingleFlight(), upstream)
+    bodies = []
+
+    def call():
+        response = transport.handle_request(request())
+        bodies.append(response.read())
+
+    leader = threading.Thread(target=call)
+    leader.start()
+    assert upstream.entered.wait(2)
+    followers = [threading.Thread(target=call) for _ in range(2)]
+    for follower in followers:
+        follower.start()
+    upstream.gate.set()
+    for thread in [leader, *followers]:
+        thread.join(2)
+
+    assert upstream.calls == 1
+    assert bodies == [b"answer"] * 3
+
+
+def test_different_requests_are_not_coalesced():
+    async def run():
+        upstream = CountingAsyncTransport()
+        upstream.gate.set()
+        transport = AsyncSingleFlightTransport(SingleFlight(), upstream)
+        other = httpx.Request("POST", URL, content=BODY.replace(b"hi", b"hello"))
+        for item in (request(), other):
+            await (await transport.handle_async_request(item)).aread()
+        return upstream.calls
+
+    assert asyncio.run(run()) == 2
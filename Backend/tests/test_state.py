@@ -0,0 +1,19 @@
+import uuid
+
+import pytest
+from pydantic import ValidationError
+
+from State import FollowupAnswers, FollowupInput, InitInput
+
+
+@pytest.mark.parametrize("model, extra", [
+    (InitInput, {"userSymptoms": "headache"}),
+    (FollowupInput, {"userSymptoms": "headache"}),
+    (FollowupAnswers, {"userSymptoms": "headache", "user_response": {}}),
+])
+def test_one_way_session_id_must_be_random_uuid(model, extra):
+    session_id = uuid.uuid4()
+    assert model(session_id=str(session_id), **extra).session_id == session_id
+    for guessable in ("1", "anonymous", str(uuid.uuid1()), str(uuid.UUID(int=1))):
+        with pytest.raises(ValidationError):
+            model(session_id=guessable, **extra)
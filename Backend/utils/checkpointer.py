@@ -0,0 +1,252 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, Iterator, Optional, Sequence
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    BaseCheckpointSaver, ChannelVersions, Checkpoint, CheckpointMetadata, CheckpointTuple, get_checkpoint_id,
+    get_checkpoint_metadata
+)
+from langgraph.checkpoint.sqlite import SqliteSaver
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_DB_PATH = os.getenv("CHECKPOINT_DB_PATH", "checkpoints.sqlite")
+# Checkpoints kept per thread; older ones are pruned in the background
+CHECKPOINT_KEEP_LAST = int(os.getenv("CHECKPOINT_KEEP_LAST", "3"))
+# Threads whose latest checkpoint is kept in memory
+CHECKPOINT_HOT_THREADS = int(os.getenv("CHECKPOINT_HOT_THREADS", "256"))
+CHECKPOINT_PRUNE_INTERVAL_SECONDS = float(os.getenv("CHECKPOINT_PRUNE_INTERVAL_SECONDS", "30"))
+# Per-thread locks are striped so their number stays fixed
+THREAD_LOCK_STRIPES = 64
+
+
+class BoundedCheckpointSaver(BaseCheckpointSaver):
+    """
+    Durable LangGraph checkpointer: SQLite on disk, a small LRU of the latest
+    checkpoint per active thread in memory, and keep-last-N retention enforced
+    by a background pruning thread. Memory use depends on CHECKPOINT_HOT_THREADS,
+    not on how many threads have ever existed.
+
+    A put stores the new checkpoint in the LRU, so the next turn's read is a hit;
+    async hits are answered on the event loop without a thread hop. A cache fill
+    and a write for the same thread hold that thread's lock, so a read that raced
+    a put can never leave a stale checkpoint in the LRU.
+
+    Retention drops intermediate checkpoints, so graphs using DeltaChannel
+    state must not be compiled with this saver (ours only use plain channels).
+    """
+
+    def __init__(self, db_path: str = CHECKPOINT_DB_PATH, keep_last: int = CHECKPOINT_KEEP_LAST,
+                 hot_threads: int = CHECKPOINT_HOT_THREADS,
+                 prune_interval: float = CHECKPOINT_PRUNE_INTERVAL_SECONDS):
+        conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.saver = SqliteSaver(conn)
+        self.saver.setup()
+        super().__init__(serde=self.saver.serde)
+
+        self.keep_last = max(keep_last, 1)
+        self.hot_threads = hot_threads
+        self.prune_interval = prune_interval
+        self._hot: "OrderedDict[str, CheckpointTuple]" = OrderedDict()
+        self._dirty_threads = set()
+        self._lock = threading.Lock()
+        self._thread_locks = [threading.Lock() for _ in range(THREAD_LOCK_STRIPES)]
+        self._stop = threading.Event()
+        self.hot_hits = 0
+        self.hot_misses = 0
+        self.pruned_checkpoints = 0
+
+        self._pruner = threading.Thread(target=self._prune_loop, name="checkpoint-pruner", daemon=True)
+        self._pruner.start()
+
+    # --- hot cache -------------------------------------------------------
+
+    @staticmethod
+    def _is_latest_lookup(config: RunnableConfig) -> bool:
+        return not get_checkpoint_id(config) and not config["configurable"].get("checkpoint_ns")
+
+    def _thread_lock(self, thread_id: Any) -> threading.Lock:
+        return self._thread_locks[hash(str(thread_id)) % THREAD_LOCK_STRIPES]
+
+    def _remember(self, thread_id: str, checkpoint_tuple: CheckpointTuple):
+        with self._lock:
+            self._hot[thread_id] = checkpoint_tuple
+            self._hot.move_to_end(thread_id)
+            while len(self._hot) > self.hot_threads:
+                self._hot.popitem(last=False)
+
+    def _hot_lookup(self, thread_id: str) -> Optional[CheckpointTuple]:
+        with self._lock:
+            if thread_id in self._hot:
+                self._hot.move_to_end(thread_id)
+                self.hot_hits += 1
+                return self._hot[thread_id]
+            self.hot_misses += 1
+            return None
+
+    def _saved_tuple(self, config: RunnableConfig, next_config: RunnableConfig, checkpoint: Checkpoint,
+                     metadata: CheckpointMetadata) -> CheckpointTuple:
+        """
+        What get_tuple would read back for a checkpoint put just wrote: a fresh copy,
+        so later mutations by the caller cannot leak into the cache
+        """
+        parent_id = config["configurable"].get("checkpoint_id")
+        parent_config = {"configurable": {**next_config["configurable"], "checkpoint_id": parent_id}} if parent_id else None
+        return CheckpointTuple(
+            next_config,
+            self.serde.loads_typed(self.serde.dumps_typed(checkpoint)),
+            json.loads(json.dumps(get_checkpoint_metadata(config, metadata), ensure_ascii=False)),
+            parent_config,
+            [],
+        )
+
+    def _invalidate(self, thread_id: Any, dirty: bool = False):
+        with self._lock:
+            self._hot.pop(str(thread_id), None)
+            if dirty:
+                self._dirty_threads.add(str(thread_id))
+
+    # --- sync API --------------------------------------------------------
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        if not self._is_latest_lookup(config):
+            return self.saver.get_tuple(config)
+
+        thread_id = str(config["configurable"]["thread_id"])
+        cached = self._hot_lookup(thread_id)
+        if cached is not None:
+            return cached
+        return self._load_latest(config, thread_id)
+
+    def _load_latest(self, config: RunnableConfig, thread_id: str) -> Optional[CheckpointTuple]:
+        with self._thread_lock(thread_id):
+            # Another reader may have filled it while we waited
+            with self._lock:
+                cached = self._hot.get(thread_id)
+            if cached is not None:
+                return cached
+            checkpoint_tuple = self.saver.get_tuple(config)
+            if checkpoint_tuple is not None:
+                self._remember(thread_id, checkpoint_tuple)
+        return checkpoint_tuple
+
+    def list(self, config: Optional[RunnableConfig], *, filter: Optional[Dict[str, Any]] = None,
+             before: Optional[RunnableConfig] = None, limit: Optional[int] = None) -> Iterator[CheckpointTuple]:
+        return self.saver.list(config, filter=filter, before=before, limit=limit)
+
+    def put(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+            new_versions: ChannelVersions) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        with self._thread_lock(thread_id):
+            next_config = self.saver.put(config, checkpoint, metadata, new_versions)
+            self._invalidate(thread_id, dirty=True)
+            if not config["configurable"].get("checkpoint_ns"):
+                self._remember(str(thread_id), self._saved_tuple(config, next_config, checkpoint, metadata))
+        return next_config
+
+    def put_writes(self, config: RunnableConfig, writes: Sequence[tuple], task_id: str, task_path: str = "") -> None:
+        thread_id = config["configurable"]["thread_id"]
+        with self._thread_lock(thread_id):
+            self.saver.put_writes(config, writes, task_id, task_path)
+            self._invalidate(thread_id)
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._thread_lock(thread_id):
+            self.saver.delete_thread(thread_id)
+            self._invalidate(thread_id)
+
+    def get_next_version(self, current: Optional[str], channel: None) -> str:
+        return self.saver.get_next_version(current, channel)
+
+    # --- async API (SqliteSaver is sync-only, run it off the event loop) ---
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        if not self._is_latest_lookup(config):
+            return await asyncio.to_thread(self.saver.get_tuple, config)
+        thread_id = str(config["configurable"]["thread_id"])
+        cached = self._hot_lookup(thread_id)
+        if cached is not None:
+            return cached
+        return await asyncio.to_thread(self._load_latest, config, thread_id)
+
+    async def alist(self, config: Optional[RunnableConfig], *, filter: Optional[Dict[str, Any]] = None,
+                    before: Optional[RunnableConfig] = None, limit: Optional[int] = None) -> AsyncIterator[CheckpointTuple]:
+        checkpoint_tuples = await asyncio.to_thread(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for checkpoint_tuple in checkpoint_tuples:
+            yield checkpoint_tuple
+
+    async def aput(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+                   new_versions: ChannelVersions) -> RunnableConfig:
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config: RunnableConfig, writes: Sequence[tuple], task_id: str,
+                          task_path: str = "") -> None:
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await asyncio.to_thread(self.delete_thread, thread_id)
+
+    # --- retention -------------------------------------------------------
+
+    def prune_thread(self, thread_id: str) -> int:
+        """
+        Delete all but the newest keep_last checkpoints (and their writes) of a thread
+        """
+        keep = """
+            SELECT checkpoint_id FROM checkpoints
+            WHERE thread_id = ? AND checkpoint_ns = c.checkpoint_ns
+            ORDER BY checkpoint_id DESC LIMIT ?
+        """
+        with self.saver.cursor() as cur:
+            cur.execute(
+                f"DELETE FROM writes AS c WHERE thread_id = ? AND checkpoint_id NOT IN ({keep})",
+                (thread_id, thread_id, self.keep_last),
+            )
+            cur.execute(
+                f"DELETE FROM checkpoints AS c WHERE thread_id = ? AND checkpoint_id NOT IN ({keep})",
+                (thread_id, thread_id, self.keep_last),
+            )
+            return cur.rowcount
+
+    def prune_dirty_threads(self):
+        with self._lock:
+            thread_ids, self._dirty_threads = self._dirty_threads, set()
+        for thread_id in thread_ids:
+            try:
+                self.pruned_checkpoints += self.prune_thread(thread_id)
+            except Exception as e:
+                logger.warning(f"Checkpoint pruning failed for thread {thread_id}: {str(e)}")
+
+    def _prune_loop(self):
+        while not self._stop.wait(self.prune_interval):
+            self.prune_dirty_threads()
+
+    def close(self):
+        self._stop.set()
+        self.prune_dirty_threads()
+        self.saver.conn.close()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            hot_size = len(self._hot)
+            pending = len(self._dirty_threads)
+        lookups = self.hot_hits + self.hot_misses
+        return {
+            "hot_threads": hot_size,
+            "max_hot_threads": self.hot_threads,
+            "hot_hit_rate": self.hot_hits / lookups if lookups else 0.0,
+            "keep_last": self.keep_last,
+            "threads_pending_prune": pending,
+            "pruned_checkpoints": self.pruned_checkpoints,
+        }
+
+
+checkpointer = BoundedCheckpointSaver()
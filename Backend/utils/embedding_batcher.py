@@ -0,0 +1,124 @@
+import asyncio
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_BATCHING = os.getenv("EMBEDDING_BATCHING", "1") != "0"
+EMBEDDING_BATCH_MAX_SIZE = int(os.getenv("EMBEDDING_BATCH_MAX_SIZE", "32"))
+EMBEDDING_BATCH_MAX_WAIT_MS = float(os.getenv("EMBEDDING_BATCH_MAX_WAIT_MS", "5"))
+
+
+class EmbeddingBatcher:
+    """
+    Micro-batching front for an embedding model. Callers submit single texts from
+    any thread or event loop; a worker thread collects them for up to max_wait_ms
+    (or max_batch_size texts) while requests overlap, encodes them in one embed_documents call and resolves
+    each caller's future. One forward pass over a batch is much cheaper on CPU than
+    the same number of single-text passes.
+    """
+
+    def __init__(self, embed_batch: Callable[[List[str]], List[List[float]]],
+                 max_batch_size: int = EMBEDDING_BATCH_MAX_SIZE, max_wait_ms: float = EMBEDDING_BATCH_MAX_WAIT_MS,
+                 name: str = "embedding-batcher"):
+        self.embed_batch = embed_batch
+        self.max_batch_size = max(max_batch_size, 1)
+        self.max_wait = max_wait_ms / 1000
+        self.name = name
+        self._queue: "queue.Queue[Tuple[str, Future]]" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.metrics = {
+            "requests": 0,
+            "batches": 0,
+            "resolved": 0,
+            "encoded": 0,
+            "failed": 0,
+            "cancelled": 0,
+            "max_batch_size_seen": 0,
+            "last_batch_ms": 0.0,
+        }
+
+    def submit(self, text: str) -> Future:
+        if self._worker is None or not self._worker.is_alive():
+            with self._lock:
+                if self._worker is None or not self._worker.is_alive():
+                    self._worker = threading.Thread(target=self._run, name=self.name, daemon=True)
+                    self._worker.start()
+        future: Future = Future()
+        self._queue.put((text, future))
+        self.metrics["requests"] += 1
+        return future
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.submit(text).result()
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return await asyncio.wrap_future(self.submit(text))
+
+    def _next_batch(self, linger: bool) -> List[Tuple[str, Future]]:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + (self.max_wait if linger else 0)
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        linger = False
+        while True:
+            # A lone request is encoded right away; the wait only pays off once requests overlap
+            batch = self._next_batch(linger)
+            linger = len(batch) > 1 or not self._queue.empty()
+            # Callers cancelled while queued are dropped; the rest can no longer be cancelled
+            pending = [(text, future) for text, future in batch if future.set_running_or_notify_cancel()]
+            self.metrics["cancelled"] += len(batch) - len(pending)
+            if not pending:
+                continue
+            try:
+                self._encode(pending)
+            except Exception as e:
+                # The worker must outlive any one batch, or every later caller waits forever
+                logger.error(f"[EMBEDDINGS] Batch of {len(pending)} requests could not be resolved: {str(e)}")
+                for _, future in pending:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def _encode(self, batch: List[Tuple[str, Future]]):
+        # Sessions often ask the same question at once; encode each distinct text once
+        texts = list(dict.fromkeys(text for text, _ in batch))
+        started = time.perf_counter()
+        try:
+            vectors = dict(zip(texts, self.embed_batch(texts)))
+        except Exception as e:
+            self.metrics["failed"] += len(batch)
+            logger.error(f"[EMBEDDINGS] Batch of {len(texts)} texts failed: {str(e)}")
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        self.metrics["batches"] += 1
+        self.metrics["resolved"] += len(batch)
+        self.metrics["encoded"] += len(texts)
+        self.metrics["max_batch_size_seen"] = max(self.metrics["max_batch_size_seen"], len(batch))
+        self.metrics["last_batch_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        for text, future in batch:
+            future.set_result(vectors[text])
+
+    def stats(self) -> Dict[str, Any]:
+        batches = self.metrics["batches"]
+        return {
+            "running": self._worker is not None and self._worker.is_alive(),
+            "queue_depth": self._queue.qsize(),
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            **self.metrics,
+            "avg_batch_size": self.metrics["resolved"] / batches if batches else 0.0,
+        }
@@ -3,6 +3,7 @@ from dotenv import load_dotenv
 load_dotenv()
 
 from sqlalchemy import create_engine, MetaData,Table,Column,Integer,String,DateTime,func,ForeignKey,Enum
+from sqlalchemy.ext.asyncio import create_async_engine
 meta = MetaData()
 
 # config
@@ -12,8 +13,36 @@ userName = os.getenv("USERNAME")
 pwd = os.getenv("PASSWORD")
 port_id = os.getenv("PORT_ID")
 
+# pool
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "5000"))
+
 DATABASE_URL = f"postgresql+psycopg2://{userName}:{pwd}@{hostName}:{port_id}/{dataBase}"
-engine = create_engine(DATABASE_URL)
+ASYNC_DATABASE_URL = f"postgresql+asyncpg://{userName}:{pwd}@{hostName}:{port_id}/{dataBase}"
+
+# Sync engine: migrations, scripts and benchmarks. Request handlers use async_engine.
+engine = create_engine(
+    DATABASE_URL,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_recycle=DB_POOL_RECYCLE,
+    pool_pre_ping=True,
+    connect_args={"options": f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"},
+)
+
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_recycle=DB_POOL_RECYCLE,
+    pool_pre_ping=True,
+    connect_args={"server_settings": {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)}},
+)
 
 
 
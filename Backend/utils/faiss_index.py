@@ -0,0 +1,214 @@
+import json
+import logging
+import math
+import os
+import pickle
+import time
+from typing import Any, Dict, Optional
+
+import faiss
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE = "index.faiss"
+DOCSTORE_FILE = "index.pkl"
+META_FILE = "index_meta.json"
+
+INDEX_TYPES = ("flat", "ivfpq", "hnsw")
+
+# Open indexes memory-mapped so every worker shares the OS page cache instead of a private heap copy
+FAISS_MMAP = os.getenv("FAISS_MMAP", "1") != "0"
+# Search-time overrides; otherwise the values recorded when the index was built are used
+FAISS_NPROBE = os.getenv("FAISS_NPROBE")
+FAISS_EF_SEARCH = os.getenv("FAISS_EF_SEARCH")
+
+DEFAULT_PARAMS = {
+    "ivfpq": {"nlist": None, "pq_m": 48, "pq_bits": 8, "nprobe": 16},
+    "hnsw": {"hnsw_m": 32, "ef_construction": 200, "ef_search": 64},
+}
+
+# faiss warns below ~39 training points per centroid
+MIN_POINTS_PER_CENTROID = 39
+
+
+def resolve_params(index_type: str, dimension: int, count: int, overrides: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Build parameters for index_type, defaults filled in from the corpus size and dimension
+    """
+    params = dict(DEFAULT_PARAMS.get(index_type, {}))
+    params.update({key: value for key, value in (overrides or {}).items() if value is not None and key in params})
+
+    if index_type == "ivfpq":
+        if count < 2 ** params["pq_bits"]:
+            raise ValueError(f"IVF-PQ with {params['pq_bits']}-bit codes needs at least {2 ** params['pq_bits']} "
+                             f"vectors to train, the corpus has {count}")
+        if not params["nlist"]:
+            params["nlist"] = int(4 * math.sqrt(count))
+        params["nlist"] = max(1, min(params["nlist"], count // MIN_POINTS_PER_CENTROID))
+        if dimension % params["pq_m"]:
+            raise ValueError(f"pq_m={params['pq_m']} must divide the embedding dimension {dimension}")
+        params["nprobe"] = min(params["nprobe"], params["nlist"])
+    return params
+
+
+def build_index(vectors: np.ndarray, index_type: str = "flat", params: Optional[Dict[str, Any]] = None) -> faiss.Index:
+    """
+    L2 index over vectors (the metric LangChain's FAISS store uses); params from resolve_params
+    """
+    vectors = np.ascontiguousarray(vectors, dtype="float32")
+    dimension = vectors.shape[1]
+    params = params or {}
+
+    if index_type == "flat":
+        index = faiss.IndexFlatL2(dimension)
+    elif index_type == "ivfpq":
+        index = faiss.index_factory(dimension, f"IVF{params['nlist']},PQ{params['pq_m']}x{params['pq_bits']}")
+        index.train(vectors)
+    elif index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dimension, params["hnsw_m"])
+        index.hnsw.efConstruction = params["ef_construction"]
+    else:
+        raise ValueError(f"Unknown index type {index_type!r}, expected one of {INDEX_TYPES}")
+
+    index.add(vectors)
+    apply_search_params(index, index_type, params)
+    return index
+
+
+def apply_search_params(index: faiss.Index, index_type: str, params: Dict[str, Any]):
+    space = faiss.ParameterSpace()
+    if index_type == "ivfpq":
+        space.set_index_parameter(index, "nprobe", int(FAISS_NPROBE or params.get("nprobe", 1)))
+    elif index_type == "hnsw":
+        space.set_index_parameter(index, "efSearch", int(FAISS_EF_SEARCH or params.get("ef_search", 16)))
+
+
+def stored_vectors(index: faiss.Index) -> np.ndarray:
+    """
+    All vectors of a flat index (the exact baseline the ANN indexes are built from)
+    """
+    return index.reconstruct_n(0, index.ntotal)
+
+
+def remove_documents(db, doc_ids, index_type: str, params: Dict[str, Any]):
+    """
+    Remove doc_ids from a LangChain FAISS store built by build_index
+    """
+    removed = set(doc_ids)
+    if not removed:
+        return
+    if index_type == "flat":
+        # Flat removal shifts the later vectors down, matching LangChain's renumbering
+        db.delete(list(removed))
+        return
+    labels = [label for label, doc_id in sorted(db.index_to_docstore_id.items()) if doc_id in removed]
+    if index_type == "hnsw":
+        # HNSW graphs do not support removal: rebuild from the vectors that stay
+        keep = [label for label in sorted(db.index_to_docstore_id) if db.index_to_docstore_id[label] not in removed]
+        db.index = build_index(stored_vectors(db.index)[keep], "hnsw", params)
+        db.index_to_docstore_id = {new: db.index_to_docstore_id[old] for new, old in enumerate(keep)}
+    else:
+        # IVF removal keeps the remaining labels, so the mapping keeps them too (LangChain's delete renumbers it)
+        db.index.remove_ids(np.array(labels, dtype="int64"))
+        for label in labels:
+            del db.index_to_docstore_id[label]
+    db.docstore.delete(list(removed))
+
+
+def add_documents(db, texts, vectors, metadatas, ids, index_type: str):
+    """
+    Add embedded chunks to a LangChain FAISS store built by build_index
+    """
+    if index_type != "ivfpq":
+        db.add_embeddings(list(zip(texts, vectors)), metadatas=metadatas, ids=ids)
+        return
+    from langchain_core.documents import Document
+
+    # After removals IVF labels are sparse; new ones go above the highest so none is reused
+    start = max(db.index_to_docstore_id, default=-1) + 1
+    labels = np.arange(start, start + len(ids), dtype="int64")
+    db.index.add_with_ids(np.ascontiguousarray(vectors, dtype="float32"), labels)
+    db.docstore.add({doc_id: Document(page_content=text, metadata=metadata)
+                     for doc_id, text, metadata in zip(ids, texts, metadatas)})
+    db.index_to_docstore_id.update(zip(labels.tolist(), ids))
+
+
+def read_meta(path: str) -> Dict[str, Any]:
+    meta_path = os.path.join(path, META_FILE)
+    if not os.path.exists(meta_path):
+        # Indexes saved by FAISS.save_local before index types existed
+        return {"index_type": "flat", "params": {}}
+    with open(meta_path) as meta_file:
+        return json.load(meta_file)
+
+
+def index_version(path: str) -> str:
+    """
+    Changes whenever the index at path is rebuilt (ingestion bumps the meta version)
+    """
+    meta = read_meta(path)
+    if "version" in meta:
+        return f"{meta['version']}:{meta.get('built_at', '')}"
+    return str(os.stat(os.path.join(path, INDEX_FILE)).st_mtime_ns)
+
+
+def write_meta(path: str, index: faiss.Index, index_type: str, params: Dict[str, Any], **extra):
+    meta = {
+        "index_type": index_type,
+        "params": params,
+        "dimension": index.d,
+        "ntotal": index.ntotal,
+        "built_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        **extra,
+    }
+    with open(os.path.join(path, META_FILE), "w") as meta_file:
+        json.dump(meta, meta_file, indent=2)
+
+
+def is_memory_mapped(file_path: str) -> Optional[bool]:
+    """
+    Whether file_path is mapped into this process (None where /proc/self/maps is not available)
+    """
+    try:
+        with open("/proc/self/maps") as maps:
+            target = os.path.realpath(file_path)
+            return any(line.rstrip("\n").endswith(target) for line in maps)
+    except OSError:
+        return None
+
+
+def read_index(path: str, mmap: bool = FAISS_MMAP) -> faiss.Index:
+    """
+    Read the index at path. With mmap the vectors (flat, HNSW) or inverted lists (IVF) stay
+    in the file mapping: IO_FLAG_MMAP_IFC maps every index type, while IO_FLAG_MMAP only
+    covers IVF lists and silently copies flat and HNSW indexes into the heap.
+    """
+    index_path = os.path.join(path, INDEX_FILE)
+    if mmap:
+        try:
+            index = faiss.read_index(index_path, faiss.IO_FLAG_MMAP_IFC)
+        except RuntimeError as e:
+            logger.warning(f"[FAISS] Memory-mapped read not supported for {index_path}, loading into memory: {str(e)}")
+        else:
+            if is_memory_mapped(index_path) is False:
+                logger.warning(f"[FAISS] {index_path} was read with mmap but is not mapped; it is held in memory")
+            return index
+    return faiss.read_index(index_path)
+
+
+def load_vectorstore(path: str, embeddings, mmap: bool = FAISS_MMAP):
+    """
+    LangChain FAISS store over an index opened read-only and memory-mapped.
+    Same files as FAISS.load_local, but the index is not copied into the heap.
+    """
+    from langchain_community.vectorstores import FAISS
+
+    meta = read_meta(path)
+    index = read_index(path, mmap=mmap)
+    apply_search_params(index, meta["index_type"], meta.get("params", {}))
+    # index.pkl is written by our own builder (same trust as allow_dangerous_deserialization)
+    with open(os.path.join(path, DOCSTORE_FILE), "rb") as docstore_file:
+        docstore, index_to_docstore_id = pickle.load(docstore_file)
+    logger.info(f"[FAISS] Opened {meta['index_type']} index with {index.ntotal} vectors from {path} (mmap={mmap})")
+    return FAISS(embeddings, index, docstore, index_to_docstore_id)
@@ -0,0 +1,429 @@
+import asyncio
+import json
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+import httpx
+from utils.single_flight import AsyncSingleFlightTransport, SingleFlightTransport, llm_single_flight
+from utils.token_counter import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+LLM_MAX_IN_FLIGHT = int(os.getenv("LLM_MAX_IN_FLIGHT", "8"))
+LLM_REQUESTS_PER_MINUTE = float(os.getenv("LLM_REQUESTS_PER_MINUTE", "30"))
+LLM_TOKENS_PER_MINUTE = float(os.getenv("LLM_TOKENS_PER_MINUTE", "30000"))
+LLM_QUEUE_TIMEOUT_SECONDS = float(os.getenv("LLM_QUEUE_TIMEOUT_SECONDS", "30"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+# Completion size assumed when a request does not set max_tokens
+LLM_COMPLETION_TOKEN_ESTIMATE = int(os.getenv("LLM_COMPLETION_TOKEN_ESTIMATE", "400"))
+# Share one upstream call between identical concurrent requests
+LLM_SINGLE_FLIGHT = os.getenv("LLM_SINGLE_FLIGHT", "1") != "0"
+
+BACKOFF_BASE_SECONDS = 0.5
+BACKOFF_MAX_SECONDS = 20.0
+WAIT_SAMPLES = 1000
+# What the Groq SDK retries by itself; ChatGroq runs with max_retries=0, so the gateway retries these
+RETRYABLE_STATUS_CODES = {408, 409, 429}
+
+
+class LLMGatewayTimeout(httpx.TimeoutException):
+    """
+    No capacity became available within the queue timeout
+    """
+
+
+class TokenBucket:
+    """
+    Continuous-refill bucket holding at most one minute of budget
+    """
+
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.rate = per_minute / 60
+        self.tokens = per_minute
+        self.updated_at = time.monotonic()
+
+    def refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def wait_time(self, amount: float) -> float:
+        # Requests larger than the bucket are admitted once it is full instead of never
+        amount = min(amount, self.capacity)
+        return 0.0 if self.tokens >= amount else (amount - self.tokens) / self.rate
+
+
+class _Waiter:
+    """
+    A caller queued for admission, woken from any thread
+    """
+
+    def __init__(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.loop = loop
+        self.event = asyncio.Event() if loop else threading.Event()
+
+    def wake(self):
+        if self.loop:
+            self.loop.call_soon_threadsafe(self.event.set)
+        else:
+            self.event.set()
+
+
+def is_retryable(response: httpx.Response) -> bool:
+    return response.status_code in RETRYABLE_STATUS_CODES or response.status_code >= 500
+
+
+def estimate_request_tokens(body: bytes) -> int:
+    """
+    Prompt tokens of a chat completion body plus the completion it may produce
+    """
+    try:
+        payload = json.loads(body or b"{}")
+    except ValueError:
+        return LLM_COMPLETION_TOKEN_ESTIMATE
+    prompt = " ".join(str(message.get("content", "")) for message in payload.get("messages", []))
+    return estimate_tokens(prompt) + int(payload.get("max_tokens") or LLM_COMPLETION_TOKEN_ESTIMATE)
+
+
+class LLMGateway:
+    """
+    Admission control for every Groq call in the process: at most max_in_flight
+    requests at once, requests/min and tokens/min token buckets, and a bounded wait
+    in a FIFO queue: only the caller at its head may be admitted, so nobody is
+    overtaken indefinitely. 429s, 408/409, 5xx and connection errors are retried
+    with jittered backoff (429s also pause admission). It is plugged into ChatGroq as the
+    httpx transport, so chains and graphs need no changes. A slot is held until
+    the response body (including a token stream) has been fully read.
+    """
+
+    def __init__(self, max_in_flight: int = LLM_MAX_IN_FLIGHT, requests_per_minute: float = LLM_REQUESTS_PER_MINUTE,
+                 tokens_per_minute: float = LLM_TOKENS_PER_MINUTE, queue_timeout: float = LLM_QUEUE_TIMEOUT_SECONDS,
+                 max_retries: int = LLM_MAX_RETRIES):
+        self.max_in_flight = max_in_flight
+        self.queue_timeout = queue_timeout
+        self.max_retries = max_retries
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._queue: "deque[_Waiter]" = deque()
+        self._paused_until = 0.0
+        self._waits = deque(maxlen=WAIT_SAMPLES)
+        self.metrics = {
+            "admitted": 0,
+            "queue_timeouts": 0,
+            "queue_cancellations": 0,
+            "rate_limited": 0,
+            "server_errors": 0,
+            "connection_errors": 0,
+            "retries": 0,
+            "max_queue_depth": 0,
+        }
+
+    # --- admission -------------------------------------------------------
+
+    def _try_admit(self, waiter: _Waiter, tokens: int) -> Optional[float]:
+        """
+        Take a slot and the bucket budget if waiter is first in line and all are available.
+        Returns 0 once admitted, the seconds until the budget allows it, or None to wait for a wake-up.
+        """
+        with self._lock:
+            waiter.event.clear()
+            if self._queue[0] is not waiter or self._in_flight >= self.max_in_flight:
+                return None
+            now = time.monotonic()
+            if now < self._paused_until:
+                return self._paused_until - now
+            self.requests.refill(now)
+            self.tokens.refill(now)
+            wait = max(self.requests.wait_time(1), self.tokens.wait_time(tokens))
+            if wait > 0:
+                return wait
+            self.requests.tokens -= 1
+            self.tokens.tokens -= min(tokens, self.tokens.capacity)
+            self._in_flight += 1
+            self.metrics["admitted"] += 1
+            self._queue.popleft()
+            self._wake_head()
+            return 0.0
+
+    def _wake_head(self):
+        # Called with the lock held
+        if self._queue:
+            self._queue[0].wake()
+
+    def _enter_queue(self, waiter: _Waiter):
+        with self._lock:
+            self._queue.append(waiter)
+            self.metrics["max_queue_depth"] = max(self.metrics["max_queue_depth"], len(self._queue))
+
+    def _leave_queue(self, waiter: _Waiter, started: float, outcome: str):
+        """
+        outcome is "admitted", or the metric counting why the waiter gave up (if any)
+        """
+        with self._lock:
+            if outcome == "admitted":
+                self._waits.append(time.monotonic() - started)
+                return
+            if outcome in self.metrics:
+                self.metrics[outcome] += 1
+            was_head = bool(self._queue) and self._queue[0] is waiter
+            self._queue.remove(waiter)
+            if was_head:
+                self._wake_head()
+
+    def _timeout(self, deadline: float, wait: Optional[float]) -> float:
+        """
+        How long to block before trying again; raises if the deadline would pass first
+        """
+        remaining = deadline - time.monotonic()
+        if remaining <= 0 or (wait is not None and wait > remaining):
+            raise LLMGatewayTimeout(f"LLM gateway queue timeout after {self.queue_timeout}s")
+        return remaining if wait is None else wait
+
+    def acquire(self, tokens: int):
+        started = time.monotonic()
+        deadline = started + self.queue_timeout
+        waiter = _Waiter()
+        self._enter_queue(waiter)
+        outcome = None
+        try:
+            while True:
+                wait = self._try_admit(waiter, tokens)
+                if wait == 0:
+                    outcome = "admitted"
+                    return
+                waiter.event.wait(self._timeout(deadline, wait))
+        except LLMGatewayTimeout:
+            outcome = "queue_timeouts"
+            raise
+        finally:
+            self._leave_queue(waiter, started, outcome)
+
+    async def aacquire(self, tokens: int):
+        started = time.monotonic()
+        deadline = started + self.queue_timeout
+        waiter = _Waiter(asyncio.get_running_loop())
+        self._enter_queue(waiter)
+        outcome = None
+        try:
+            while True:
+                wait = self._try_admit(waiter, tokens)
+                if wait == 0:
+                    outcome = "admitted"
+                    return
+                timeout = self._timeout(deadline, wait)
+                try:
+                    await asyncio.wait_for(waiter.event.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+        except LLMGatewayTimeout:
+            outcome = "queue_timeouts"
+            raise
+        except asyncio.CancelledError:
+            # The client went away; not a sign of overload
+            outcome = "queue_cancellations"
+            raise
+        finally:
+            self._leave_queue(waiter, started, outcome)
+
+    def release(self):
+        with self._lock:
+            self._in_flight -= 1
+            self._wake_head()
+
+    # --- retries ---------------------------------------------------------
+
+    def rate_limited(self, response: httpx.Response, attempt: int) -> float:
+        """
+        Record a retried 429 and pause all admissions; returns this caller's backoff
+        """
+        try:
+            retry_after = float(response.headers.get("retry-after", 0))
+        except ValueError:
+            retry_after = 0.0
+        # Full jitter, but never earlier than the provider asked for
+        delay = max(retry_after, random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt)))
+        with self._lock:
+            self.metrics["rate_limited"] += 1
+            self.metrics["retries"] += 1
+            self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+        logger.warning(f"Groq rate limited the request (attempt {attempt + 1}), retrying in {delay:.2f}s")
+        return delay
+
+    def retry_delay(self, response: httpx.Response, attempt: int) -> float:
+        """
+        Backoff before retrying a retryable response
+        """
+        if response.status_code == 429:
+            return self.rate_limited(response, attempt)
+        with self._lock:
+            self.metrics["server_errors"] += 1
+            self.metrics["retries"] += 1
+        delay = random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt))
+        logger.warning(f"Groq returned {response.status_code} (attempt {attempt + 1}), retrying in {delay:.2f}s")
+        return delay
+
+    def connection_failed(self, error: Exception, attempt: int) -> float:
+        with self._lock:
+            self.metrics["connection_errors"] += 1
+            self.metrics["retries"] += 1
+        delay = random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt))
+        logger.warning(f"Groq request failed ({error!r}, attempt {attempt + 1}), retrying in {delay:.2f}s")
+        return delay
+
+    # --- clients ---------------------------------------------------------
+
+    # Coalescing sits in front of admission, so a shared call takes a single slot
+
+    def sync_client(self) -> httpx.Client:
+        transport = GatewayTransport(self)
+        if LLM_SINGLE_FLIGHT:
+            transport = SingleFlightTransport(llm_single_flight, transport)
+        return httpx.Client(transport=transport)
+
+    def async_client(self) -> httpx.AsyncClient:
+        transport = AsyncGatewayTransport(self)
+        if LLM_SINGLE_FLIGHT:
+            transport = AsyncSingleFlightTransport(llm_single_flight, transport)
+        return httpx.AsyncClient(transport=transport)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            waits = sorted(self._waits)
+            in_flight, waiting = self._in_flight, len(self._queue)
+        percentile = lambda pct: waits[min(len(waits) - 1, int(len(waits) * pct))] * 1000 if waits else 0.0
+        return {
+            "in_flight": in_flight,
+            "max_in_flight": self.max_in_flight,
+            "queue_depth": waiting,
+            **self.metrics,
+            "wait_p50_ms": percentile(0.5),
+            "wait_p95_ms": percentile(0.95),
+            "wait_max_ms": waits[-1] * 1000 if waits else 0.0,
+        }
+
+
+def _is_completion(request: httpx.Request) -> bool:
+    return request.method == "POST" and request.url.path.endswith("/chat/completions")
+
+
+class _ReleasingStream(httpx.SyncByteStream):
+    def __init__(self, stream: httpx.SyncByteStream, release):
+        self.stream = stream
+        self._release = release
+
+    def __iter__(self):
+        yield from self.stream
+
+    def close(self):
+        try:
+            self.stream.close()
+        finally:
+            if self._release:
+                self._release()
+                self._release = None
+
+
+class _AsyncReleasingStream(httpx.AsyncByteStream):
+    def __init__(self, stream: httpx.AsyncByteStream, release):
+        self.stream = stream
+        self._release = release
+
+    async def __aiter__(self):
+        async for chunk in self.stream:
+            yield chunk
+
+    async def aclose(self):
+        try:
+            await self.stream.aclose()
+        finally:
+            if self._release:
+                self._release()
+                self._release = None
+
+
+class GatewayTransport(httpx.BaseTransport):
+    def __init__(self, gateway: LLMGateway, transport: Optional[httpx.BaseTransport] = None):
+        self.gateway = gateway
+        self.transport = transport or httpx.HTTPTransport()
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        if not _is_completion(request):
+            return self.transport.handle_request(request)
+
+        tokens = estimate_request_tokens(request.read())
+        for attempt in range(self.gateway.max_retries + 1):
+            self.gateway.acquire(tokens)
+            try:
+                response = self.transport.handle_request(request)
+            except httpx.TransportError as e:
+                self.gateway.release()
+                if attempt == self.gateway.max_retries:
+                    raise
+                time.sleep(self.gateway.connection_failed(e, attempt))
+                continue
+            except BaseException:
+                self.gateway.release()
+                raise
+            if is_retryable(response) and attempt < self.gateway.max_retries:
+                response.close()
+                self.gateway.release()
+                time.sleep(self.gateway.retry_delay(response, attempt))
+                continue
+            return httpx.Response(
+                status_code=response.status_code,
+                headers=response.headers,
+                stream=_ReleasingStream(response.stream, self.gateway.release),
+                extensions=response.extensions,
+            )
+
+    def close(self):
+        self.transport.close()
+
+
+class AsyncGatewayTransport(httpx.AsyncBaseTransport):
+    def __init__(self, gateway: LLMGateway, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.gateway = gateway
+        self.transport = transport or httpx.AsyncHTTPTransport()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if not _is_completion(request):
+            return await self.transport.handle_async_request(request)
+
+        tokens = estimate_request_tokens(await request.aread())
+        for attempt in range(self.gateway.max_retries + 1):
+            await self.gateway.aacquire(tokens)
+            try:
+                response = await self.transport.handle_async_request(request)
+            except httpx.TransportError as e:
+                self.gateway.release()
+                if attempt == self.gateway.max_retries:
+                    raise
+                await asyncio.sleep(self.gateway.connection_failed(e, attempt))
+                continue
+            except BaseException:
+                self.gateway.release()
+                raise
+            if is_retryable(response) and attempt < self.gateway.max_retries:
+                await response.aclose()
+                self.gateway.release()
+                await asyncio.sleep(self.gateway.retry_delay(response, attempt))
+                continue
+            return httpx.Response(
+                status_code=response.status_code,
+                headers=response.headers,
+                stream=_AsyncReleasingStream(response.stream, self.gateway.release),
+                extensions=response.extensions,
+            )
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+
+llm_gateway = LLMGateway()
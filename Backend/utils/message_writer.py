@@ -0,0 +1,233 @@
+import asyncio
+import logging
+import os
+import random
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import case, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import DBAPIError, InterfaceError, OperationalError
+from tables.chat_messages_table import chat_messages
+from tables.thread_summary_table import thread_summary
+from utils.engine import async_engine
+
+logger = logging.getLogger(__name__)
+
+MESSAGE_WRITER_BATCH_SIZE = int(os.getenv("MESSAGE_WRITER_BATCH_SIZE", "200"))
+MESSAGE_WRITER_FLUSH_MS = float(os.getenv("MESSAGE_WRITER_FLUSH_MS", "5"))
+MESSAGE_WRITER_MAX_QUEUE = int(os.getenv("MESSAGE_WRITER_MAX_QUEUE", "10000"))
+MESSAGE_WRITER_MAX_RETRIES = int(os.getenv("MESSAGE_WRITER_MAX_RETRIES", "5"))
+
+
+_STOP = object()
+
+
+def is_transient(error: Exception) -> bool:
+    if isinstance(error, (OperationalError, InterfaceError, ConnectionError, asyncio.TimeoutError)):
+        return True
+    return isinstance(error, DBAPIError) and error.connection_invalidated
+
+
+class MessageWriter:
+    """
+    Write-behind persistence for chat_messages. Handlers enqueue rows and move on;
+    a background task drains the queue into multi-row INSERTs, one transaction per
+    batch of up to batch_size rows or flush_ms of waiting, whichever comes first.
+    The same transaction upserts thread_summary, so the sidebar projection never
+    disagrees with the messages.
+    Transient failures are retried with backoff; a batch that fails for any other
+    reason is bisected so only the offending rows fail. stop() drains everything
+    that was enqueued before returning.
+    """
+
+    def __init__(self, batch_size: int = MESSAGE_WRITER_BATCH_SIZE, flush_ms: float = MESSAGE_WRITER_FLUSH_MS,
+                 max_queue: int = MESSAGE_WRITER_MAX_QUEUE, max_retries: int = MESSAGE_WRITER_MAX_RETRIES):
+        self.batch_size = batch_size
+        self.flush_interval = flush_ms / 1000
+        self.max_retries = max_retries
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self._worker: Optional[asyncio.Task] = None
+        self.metrics = {
+            "enqueued": 0,
+            "written": 0,
+            "batches": 0,
+            "retries": 0,
+            "failed": 0,
+            "bisections": 0,
+            "max_queue_depth": 0,
+            "last_flush_ms": 0.0,
+        }
+
+    def enqueue(self, thread_id: int, sender: str, message: str, time_stamp: Optional[datetime] = None) -> asyncio.Future:
+        """
+        Queue one chat message; the timestamp is taken now so ordering matches arrival.
+        The returned future resolves once the row is committed, for the rare caller that must wait.
+        """
+        row = {
+            "thread_id": thread_id,
+            "sender": sender,
+            "message": message,
+            "time_stamp": time_stamp or datetime.now(),
+        }
+        written = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait((row, written))
+        except asyncio.QueueFull:
+            # Back-pressure instead of dropping: schedule the put once there is room
+            logger.warning("Message writer queue full, waiting for the database to catch up")
+            asyncio.get_running_loop().create_task(self._queue.put((row, written)))
+        self.metrics["enqueued"] += 1
+        self.metrics["max_queue_depth"] = max(self.metrics["max_queue_depth"], self._queue.qsize())
+        return written
+
+    def start(self):
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.get_running_loop().create_task(self._run(), name="message-writer")
+
+    async def stop(self):
+        """
+        Flush every queued row, then stop the background task
+        """
+        if self._worker is not None and not self._worker.done():
+            # The sentinel is queued behind every pending row, so the worker drains them first
+            await self._queue.put(_STOP)
+            await self._worker
+        self._worker = None
+
+        while not self._queue.empty():
+            await self._write([row for row in self._drain(self.batch_size) if row is not _STOP])
+
+    def _drain(self, limit: int) -> List[Any]:
+        batch = []
+        while len(batch) < limit and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _next_batch(self) -> List[Any]:
+        batch = [await self._queue.get()]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size and batch[-1] is not _STOP:
+            batch.extend(self._drain(self.batch_size - len(batch)))
+            remaining = deadline - time.monotonic()
+            if len(batch) >= self.batch_size or remaining <= 0 or _STOP in batch:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._next_batch()
+            stopping = _STOP in batch
+            await self._write([row for row in batch if row is not _STOP])
+            if stopping:
+                return
+
+    async def _write(self, batch: List[Tuple[Dict[str, Any], asyncio.Future]]):
+        if not batch:
+            return
+        rows = [row for row, _ in batch]
+        for attempt in range(self.max_retries + 1):
+            started = time.perf_counter()
+            try:
+                async with async_engine.begin() as connection:
+                    await self._insert(connection, rows)
+                self.metrics["written"] += len(rows)
+                self.metrics["batches"] += 1
+                self.metrics["last_flush_ms"] = (time.perf_counter() - started) * 1000
+                self._resolve(batch)
+                return
+            except Exception as e:
+                if not is_transient(e) and len(batch) > 1:
+                    # One bad row (FK violation, wrong type) must not fail everyone else's messages:
+                    # bisect until the failing rows are isolated
+                    self.metrics["bisections"] += 1
+                    middle = len(batch) // 2
+                    await self._write(batch[:middle])
+                    await self._write(batch[middle:])
+                    return
+                if not is_transient(e) or attempt == self.max_retries:
+                    self.metrics["failed"] += len(rows)
+                    dropped = ", ".join(f"(thread_id={row['thread_id']!r}, sender={row['sender']!r})" for row in rows)
+                    logger.error(f"Message writer dropped {len(rows)} rows after {attempt + 1} attempts: {str(e)}; "
+                                 f"rows: {dropped}")
+                    self._resolve(batch, e)
+                    return
+                self.metrics["retries"] += 1
+                delay = min(2 ** attempt * 0.1, 5.0) * random.uniform(0.5, 1.5)
+                logger.warning(f"Message writer batch failed ({str(e)}), retrying in {delay:.2f}s")
+                await asyncio.sleep(delay)
+
+    @staticmethod
+    def _resolve(batch: List[Tuple[Dict[str, Any], asyncio.Future]], error: Optional[Exception] = None):
+        for _, written in batch:
+            if written.done():
+                continue
+            if error is None:
+                written.set_result(True)
+            else:
+                written.set_exception(error)
+                # Most callers never await the future; don't warn about an unretrieved exception
+                written.exception()
+
+    async def _insert(self, connection, rows: List[Dict[str, Any]]):
+        # A single multi-row INSERT ... VALUES (...), (...) per batch
+        await connection.execute(chat_messages.insert().values(rows))
+        await connection.execute(self._summary_upsert(rows))
+
+    @staticmethod
+    def _summary_upsert(rows: List[Dict[str, Any]]):
+        """
+        One thread_summary row per thread in the batch, merged into the stored one
+        """
+        summaries: Dict[int, Dict[str, Any]] = {}
+        for row in rows:
+            summary = summaries.setdefault(row["thread_id"], {
+                "thread_id": row["thread_id"],
+                "latest_user_message": None,
+                "latest_user_message_at": None,
+                "last_activity_at": row["time_stamp"],
+                "message_count": 0,
+            })
+            summary["message_count"] += 1
+            summary["last_activity_at"] = max(summary["last_activity_at"], row["time_stamp"])
+            if row["sender"] == "User" and (
+                summary["latest_user_message_at"] is None or row["time_stamp"] >= summary["latest_user_message_at"]
+            ):
+                summary["latest_user_message"] = row["message"]
+                summary["latest_user_message_at"] = row["time_stamp"]
+
+        # Sorted by thread so concurrent writers lock rows in the same order
+        statement = pg_insert(thread_summary).values([summaries[key] for key in sorted(summaries)])
+        current, incoming = thread_summary.c, statement.excluded
+        newer_user_message = (incoming.latest_user_message_at.isnot(None)) & (
+            current.latest_user_message_at.is_(None) | (incoming.latest_user_message_at >= current.latest_user_message_at)
+        )
+        return statement.on_conflict_do_update(
+            index_elements=[current.thread_id],
+            set_={
+                "message_count": current.message_count + incoming.message_count,
+                "last_activity_at": func.greatest(current.last_activity_at, incoming.last_activity_at),
+                "latest_user_message": case(
+                    (newer_user_message, incoming.latest_user_message), else_=current.latest_user_message
+                ),
+                "latest_user_message_at": func.greatest(current.latest_user_message_at, incoming.latest_user_message_at),
+            },
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        written = self.metrics["written"]
+        batches = self.metrics["batches"]
+        return {
+            "running": self._worker is not None and not self._worker.done(),
+            "queue_depth": self._queue.qsize(),
+            **self.metrics,
+            "avg_batch_size": written / batches if batches else 0.0,
+        }
+
+
+message_writer = MessageWriter()
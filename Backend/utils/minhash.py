@@ -0,0 +1,84 @@
+import re
+import zlib
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+MAX_HASH = np.uint64((1 << 32) - 1)
+
+
+def shingles(text: str, size: int) -> set:
+    words = re.sub(r"[^a-z0-9\s]", " ", text.lower()).split()
+    if len(words) <= size:
+        return {" ".join(words)}
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+class MinHasher:
+    """
+    MinHash signatures over word shingles; matching signature slots estimate Jaccard similarity
+    """
+
+    def __init__(self, num_perm: int = 64, shingle_size: int = 5, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.a = rng.integers(1, int(MERSENNE_PRIME), num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, int(MERSENNE_PRIME), num_perm, dtype=np.uint64)
+
+    def signature(self, text: str) -> np.ndarray:
+        hashes = np.array([zlib.crc32(shingle.encode()) for shingle in shingles(text, self.shingle_size)],
+                          dtype=np.uint64)
+        # Universal hashing (a*x + b) mod p; uint64 wrap-around is part of the hash family
+        with np.errstate(over="ignore"):
+            permuted = (hashes[:, None] * self.a[None, :] + self.b[None, :]) % MERSENNE_PRIME
+        return (permuted & MAX_HASH).min(axis=0)
+
+    @staticmethod
+    def similarity(first: np.ndarray, second: np.ndarray) -> float:
+        return float(np.mean(first == second))
+
+
+class NearDuplicateFilter:
+    """
+    Keeps the first of every group of near-duplicate texts (estimated Jaccard >= threshold).
+    Candidates are found with LSH banding, so each check is cheap regardless of corpus size.
+    """
+
+    def __init__(self, threshold: float = 0.8, num_perm: int = 64, bands: int = 16, shingle_size: int = 5):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.threshold = threshold
+        self.hasher = MinHasher(num_perm=num_perm, shingle_size=shingle_size)
+        self.bands = bands
+        self.rows = num_perm // bands
+        self._buckets: Dict[Tuple[int, bytes], List[int]] = {}
+        self._signatures: List[np.ndarray] = []
+        self.checked = 0
+        self.dropped = 0
+
+    def _band_keys(self, signature: np.ndarray):
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows].tobytes()
+
+    def add(self, text: str) -> bool:
+        """
+        Remember text and return True, or return False if a near-duplicate was already added
+        """
+        self.checked += 1
+        signature = self.hasher.signature(text)
+        keys = list(self._band_keys(signature))
+        candidates = {kept for key in keys for kept in self._buckets.get(key, [])}
+        if any(self.hasher.similarity(signature, self._signatures[kept]) >= self.threshold for kept in candidates):
+            self.dropped += 1
+            return False
+        position = len(self._signatures)
+        self._signatures.append(signature)
+        for key in keys:
+            self._buckets.setdefault(key, []).append(position)
+        return True
+
+    @property
+    def duplicate_ratio(self) -> float:
+        return self.dropped / self.checked if self.checked else 0.0
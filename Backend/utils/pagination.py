@@ -0,0 +1,49 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+
+# Rows serialized per chunk of a streamed JSON list
+STREAM_CHUNK_ROWS = 50
+
+
+def encode_cursor(time_stamp: datetime, row_id: int) -> str:
+    """
+    Opaque keyset cursor for a (time_stamp, id) position
+    """
+    raw = f"{time_stamp.isoformat()}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        time_stamp, row_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(time_stamp), int(row_id)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _json_default(value: Any):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def _iter_json_list(rows: List[Dict[str, Any]]) -> Iterator[str]:
+    yield "["
+    for start in range(0, len(rows), STREAM_CHUNK_ROWS):
+        chunk = rows[start:start + STREAM_CHUNK_ROWS]
+        prefix = "," if start else ""
+        yield prefix + ",".join(json.dumps(dict(row), default=_json_default) for row in chunk)
+    yield "]"
+
+
+def stream_json_list(rows: List[Dict[str, Any]], headers: Optional[Dict[str, str]] = None) -> StreamingResponse:
+    """
+    JSON array response serialized in chunks instead of one json.dumps of the whole page
+    """
+    return StreamingResponse(_iter_json_list(rows), media_type="application/json", headers=headers)
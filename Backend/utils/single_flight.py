@@ -0,0 +1,223 @@
+import asyncio
+import hashlib
+import json
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+
+def request_key(request: httpx.Request, body: bytes) -> str:
+    """
+    Hash of the endpoint and the canonical JSON body (model, temperature, messages, stream...)
+    """
+    try:
+        canonical = json.dumps(json.loads(body or b"{}"), sort_keys=True, separators=(",", ":")).encode()
+    except ValueError:
+        canonical = body
+    return hashlib.sha256(request.url.path.encode() + b"\n" + canonical).hexdigest()
+
+
+class SingleFlight:
+    """
+    Registry of in-progress upstream calls. Identical concurrent requests share
+    one call: the first caller (leader) does the request and later callers attach
+    to it until it finishes. Only in-flight requests are shared, nothing is cached.
+    """
+
+    def __init__(self):
+        self._async_flights: Dict[str, "_AsyncFlight"] = {}
+        self._sync_flights: Dict[str, "_SyncFlight"] = {}
+        self._lock = threading.Lock()
+        self.metrics = {"leaders": 0, "coalesced": 0, "abandoned": 0}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            in_progress = len(self._async_flights) + len(self._sync_flights)
+        calls = self.metrics["leaders"] + self.metrics["coalesced"]
+        return {
+            "in_progress": in_progress,
+            **self.metrics,
+            "coalesced_rate": self.metrics["coalesced"] / calls if calls else 0.0,
+        }
+
+
+# --- async: upstream stream is pumped once and replayed to every subscriber ---
+
+class _AsyncFlight:
+    def __init__(self):
+        self.headers_ready = asyncio.Event()
+        self.changed = asyncio.Condition()
+        self.status_code: Optional[int] = None
+        self.headers: Optional[httpx.Headers] = None
+        self.chunks: List[bytes] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self.task: Optional[asyncio.Task] = None
+
+
+class _ReplayStream(httpx.AsyncByteStream):
+    """
+    Every chunk the upstream produced so far, then new ones as they arrive
+    """
+
+    def __init__(self, flight: _AsyncFlight, on_close):
+        self.flight = flight
+        self._on_close = on_close
+
+    async def __aiter__(self):
+        flight, position = self.flight, 0
+        while True:
+            async with flight.changed:
+                await flight.changed.wait_for(lambda: len(flight.chunks) > position or flight.done)
+                chunks, done = flight.chunks[position:], flight.done
+            for chunk in chunks:
+                yield chunk
+            position += len(chunks)
+            if done and position >= len(flight.chunks):
+                if flight.error is not None:
+                    raise flight.error
+                return
+
+    async def aclose(self):
+        if self._on_close:
+            self._on_close()
+            self._on_close = None
+
+
+class AsyncSingleFlightTransport(httpx.AsyncBaseTransport):
+    def __init__(self, single_flight: SingleFlight, transport: httpx.AsyncBaseTransport):
+        self.single_flight = single_flight
+        self.transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if request.method != "POST":
+            return await self.transport.handle_async_request(request)
+
+        key = request_key(request, await request.aread())
+        flights = self.single_flight._async_flights
+        flight = flights.get(key)
+        if flight is None:
+            flight = _AsyncFlight()
+            flights[key] = flight
+            flight.task = asyncio.create_task(self._pump(key, flight, request))
+            self.single_flight.metrics["leaders"] += 1
+        else:
+            self.single_flight.metrics["coalesced"] += 1
+
+        await flight.headers_ready.wait()
+        if flight.status_code is None:
+            raise flight.error
+
+        flight.subscribers += 1
+        return httpx.Response(
+            status_code=flight.status_code,
+            headers=flight.headers,
+            stream=_ReplayStream(flight, lambda: self._unsubscribe(key, flight)),
+        )
+
+    def _forget(self, key: str, flight: _AsyncFlight):
+        if self.single_flight._async_flights.get(key) is flight:
+            del self.single_flight._async_flights[key]
+
+    def _unsubscribe(self, key: str, flight: _AsyncFlight):
+        flight.subscribers -= 1
+        if flight.subscribers == 0 and not flight.done:
+            # Everyone stopped reading: stop the upstream call too
+            self._forget(key, flight)
+            flight.task.cancel()
+            self.single_flight.metrics["abandoned"] += 1
+
+    async def _pump(self, key: str, flight: _AsyncFlight, request: httpx.Request):
+        response = None
+        try:
+            response = await self.transport.handle_async_request(request)
+            flight.status_code, flight.headers = response.status_code, response.headers
+            flight.headers_ready.set()
+            async for chunk in response.stream:
+                async with flight.changed:
+                    flight.chunks.append(chunk)
+                    flight.changed.notify_all()
+        except asyncio.CancelledError:
+            # Followers must not take a truncated body for a complete response
+            flight.error = httpx.ReadError("Upstream response was cancelled", request=request)
+            raise
+        except Exception as e:
+            flight.error = e
+        finally:
+            self._forget(key, flight)
+            if not flight.headers_ready.is_set():
+                flight.error = flight.error or httpx.RequestError("Upstream request failed", request=request)
+                flight.headers_ready.set()
+            if response is not None:
+                await response.aclose()
+            async with flight.changed:
+                flight.done = True
+                flight.changed.notify_all()
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+
+# --- sync: the leader buffers the whole body and followers share it ---
+
+class _SyncFlight:
+    def __init__(self):
+        self.finished = threading.Event()
+        self.status_code: Optional[int] = None
+        self.headers: Optional[httpx.Headers] = None
+        self.content = b""
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlightTransport(httpx.BaseTransport):
+    def __init__(self, single_flight: SingleFlight, transport: httpx.BaseTransport):
+        self.single_flight = single_flight
+        self.transport = transport
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        if request.method != "POST":
+            return self.transport.handle_request(request)
+
+        key = request_key(request, request.read())
+        flights = self.single_flight._sync_flights
+        with self.single_flight._lock:
+            flight = flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = flights[key] = _SyncFlight()
+                self.single_flight.metrics["leaders"] += 1
+            else:
+                self.single_flight.metrics["coalesced"] += 1
+
+        if leader:
+            try:
+                response = self.transport.handle_request(request)
+                try:
+                    flight.content = b"".join(response.stream)
+                finally:
+                    response.close()
+                flight.status_code, flight.headers = response.status_code, response.headers
+            except BaseException as e:
+                flight.error = e
+                raise
+            finally:
+                with self.single_flight._lock:
+                    flights.pop(key, None)
+                flight.finished.set()
+        else:
+            flight.finished.wait()
+            if flight.error is not None:
+                raise flight.error
+
+        return httpx.Response(status_code=flight.status_code, headers=flight.headers, content=flight.content)
+
+    def close(self):
+        self.transport.close()
+
+
+llm_single_flight = SingleFlight()
@@ -0,0 +1,23 @@
+# Rough token accounting for prompt budgets. Llama-family tokenizers average
+# about four characters per token on English text, which is close enough for
+# budgeting without loading a tokenizer in every worker.
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    if not text:
+        return 0
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def trim_to_token_budget(text: str, budget: int) -> str:
+    if budget <= 0:
+        return ""
+    max_chars = budget * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    trimmed = text[:max_chars]
+    # Prefer cutting on a word boundary
+    if " " in trimmed:
+        trimmed = trimmed[:trimmed.rfind(" ")]
+    return trimmed + "…"
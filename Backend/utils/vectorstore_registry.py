@@ -0,0 +1,299 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+from langchain_core.callbacks import AsyncCallbackManagerForRetrieverRun, CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.retrievers import BaseRetriever
+from utils.embedding_batcher import EMBEDDING_BATCHING, EmbeddingBatcher
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+# One embedding model for every flow: the index is built with it, so queries must use it too
+EMBEDDING_MODEL_NAME = os.getenv("EMBEDDING_MODEL_NAME", "sentence-transformers/all-MiniLM-L6-v2")
+VECTORSTORE_PATH = os.path.abspath(os.getenv("VECTORSTORE_PATH", os.path.join(PROJECT_ROOT, "vectorstore", "db_faiss")))
+# Load the default model and index at startup instead of on the first request
+VECTORSTORE_WARM_UP = os.getenv("VECTORSTORE_WARM_UP", "1") != "0"
+# How often a loaded index is checked for a rebuild on disk
+VECTORSTORE_RELOAD_CHECK_SECONDS = float(os.getenv("VECTORSTORE_RELOAD_CHECK_SECONDS", "30"))
+QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "2048"))
+RETRIEVAL_CACHE_SIZE = int(os.getenv("RETRIEVAL_CACHE_SIZE", "2048"))
+
+
+def current_rss_bytes() -> int:
+    """
+    Resident set size of this process (peak RSS where /proc is not available)
+    """
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class LRUCache:
+    """
+    Thread-safe LRU map with hit/miss counters
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: Hashable, value: Any):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            size = len(self._entries)
+        lookups = self.hits + self.misses
+        return {
+            "size": size,
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class VectorstoreRegistry:
+    """
+    Process-wide embedding models and FAISS indexes. Each model name and each
+    (index path, model name) pair is loaded once, on first use or warm_up(),
+    and shared by the one-way and two-way chat flows.
+
+    Query embeddings are encoded through one micro-batching worker per model, so
+    concurrent sessions share forward passes, and they and retrieval results are
+    cached (LRU). Retrieval entries
+    are keyed by the index version, and a loaded index is swapped for the new
+    one once a rebuild shows up on disk, so stale results are never served.
+    """
+
+    def __init__(self, reload_check_seconds: float = VECTORSTORE_RELOAD_CHECK_SECONDS):
+        self._embeddings: Dict[str, Embeddings] = {}
+        self._batchers: Dict[str, EmbeddingBatcher] = {}
+        self._vectorstores: Dict[Tuple[str, str], Any] = {}
+        self._versions: Dict[Tuple[str, str], str] = {}
+        self._checked_at: Dict[Tuple[str, str], float] = {}
+        self._loads: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.RLock()
+        self.reload_check_seconds = reload_check_seconds
+        self.query_embeddings = LRUCache(QUERY_EMBEDDING_CACHE_SIZE)
+        self.retrievals = LRUCache(RETRIEVAL_CACHE_SIZE)
+
+    def _record_load(self, key: str, started: float, rss_before: int):
+        self._loads[key] = {
+            "load_seconds": round(time.perf_counter() - started, 3),
+            "rss_delta_mb": round((current_rss_bytes() - rss_before) / 2 ** 20, 1),
+        }
+        logger.info(f"[VECTORSTORE] Loaded {key} in {self._loads[key]['load_seconds']}s "
+                    f"(+{self._loads[key]['rss_delta_mb']} MB RSS)")
+
+    def embeddings(self, model_name: str = EMBEDDING_MODEL_NAME) -> Embeddings:
+        model = self._embeddings.get(model_name)
+        if model is not None:
+            return model
+        with self._lock:
+            if model_name not in self._embeddings:
+                from langchain_huggingface import HuggingFaceEmbeddings
+
+                started, rss_before = time.perf_counter(), current_rss_bytes()
+                self._embeddings[model_name] = HuggingFaceEmbeddings(model_name=model_name)
+                self._record_load(f"embeddings:{model_name}", started, rss_before)
+            return self._embeddings[model_name]
+
+    def batcher(self, model_name: str = EMBEDDING_MODEL_NAME) -> EmbeddingBatcher:
+        batcher = self._batchers.get(model_name)
+        if batcher is not None:
+            return batcher
+        with self._lock:
+            if model_name not in self._batchers:
+                self._batchers[model_name] = EmbeddingBatcher(
+                    lambda texts: self.embeddings(model_name).embed_documents(texts),
+                    name=f"embedding-batcher:{model_name}",
+                )
+            return self._batchers[model_name]
+
+    def _is_current(self, key: Tuple[str, str]) -> bool:
+        """
+        Loaded and still the version on disk; the disk is checked at most every reload_check_seconds
+        """
+        if key not in self._vectorstores:
+            return False
+        now = time.monotonic()
+        if now - self._checked_at[key] < self.reload_check_seconds:
+            return True
+        from utils.faiss_index import index_version
+
+        try:
+            current = index_version(key[0]) == self._versions[key]
+        except OSError:
+            # Mid-swap or removed: keep serving the loaded index
+            current = True
+        if current:
+            # A stale index is not marked checked, so the reload below sees it again
+            self._checked_at[key] = now
+        return current
+
+    def vectorstore(self, path: str = VECTORSTORE_PATH, model_name: str = EMBEDDING_MODEL_NAME):
+        key = (os.path.abspath(path), model_name)
+        if self._is_current(key):
+            return self._vectorstores[key]
+        with self._lock:
+            if not self._is_current(key):
+                from utils.faiss_index import index_version, load_vectorstore
+
+                if key in self._vectorstores:
+                    logger.info(f"[VECTORSTORE] Index at {key[0]} was rebuilt, reloading")
+                # Load the model first so it is not counted in the index load below
+                self.embeddings(model_name)
+                started, rss_before = time.perf_counter(), current_rss_bytes()
+                version = index_version(key[0])
+                # Query embeddings go through the registry's cache
+                self._vectorstores[key] = load_vectorstore(key[0], self.lazy_embeddings(model_name))
+                self._versions[key] = version
+                self._checked_at[key] = time.monotonic()
+                self._record_load(f"faiss:{key[0]}", started, rss_before)
+                self._loads[f"faiss:{key[0]}"]["version"] = version
+            return self._vectorstores[key]
+
+    async def avectorstore(self, path: str = VECTORSTORE_PATH, model_name: str = EMBEDDING_MODEL_NAME):
+        key = (os.path.abspath(path), model_name)
+        if key in self._vectorstores and time.monotonic() - self._checked_at.get(key, 0.0) < self.reload_check_seconds:
+            return self._vectorstores[key]
+        # The version check and a (re)load read from disk
+        return await asyncio.to_thread(self.vectorstore, path, model_name)
+
+    def version(self, path: str = VECTORSTORE_PATH, model_name: str = EMBEDDING_MODEL_NAME) -> Optional[str]:
+        return self._versions.get((os.path.abspath(path), model_name))
+
+    def warm_up(self, path: str = VECTORSTORE_PATH, model_name: str = EMBEDDING_MODEL_NAME):
+        try:
+            self.vectorstore(path, model_name)
+        except Exception as e:
+            # A missing index only disables retrieval; the first request will retry and log it
+            logger.error(f"[VECTORSTORE] Warm-up failed for {path}: {str(e)}")
+
+    def lazy_embeddings(self, model_name: str = EMBEDDING_MODEL_NAME) -> "RegistryEmbeddings":
+        return RegistryEmbeddings(self, model_name)
+
+    def retriever(self, path: str = VECTORSTORE_PATH, model_name: str = EMBEDDING_MODEL_NAME,
+                  search_type: str = "similarity", search_kwargs: Optional[Dict[str, Any]] = None) -> "RegistryRetriever":
+        return RegistryRetriever(registry=self, path=path, model_name=model_name,
+                                 search_type=search_type, search_kwargs=search_kwargs or {})
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            loads = {key: dict(entry) for key, entry in self._loads.items()}
+        return {
+            "rss_mb": round(current_rss_bytes() / 2 ** 20, 1),
+            "entries": loads,
+            "query_embedding_cache": self.query_embeddings.stats(),
+            "retrieval_cache": self.retrievals.stats(),
+            "embedding_batchers": {name: batcher.stats() for name, batcher in list(self._batchers.items())},
+        }
+
+
+class RegistryEmbeddings(Embeddings):
+    """
+    Embeddings handle that resolves the shared model on first call
+    """
+
+    def __init__(self, registry: VectorstoreRegistry, model_name: str):
+        self.registry = registry
+        self.model_name = model_name
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.registry.embeddings(self.model_name).embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        key = (self.model_name, text)
+        vector = self.registry.query_embeddings.get(key)
+        if vector is None:
+            if EMBEDDING_BATCHING:
+                vector = self.registry.batcher(self.model_name).embed_query(text)
+            else:
+                vector = self.registry.embeddings(self.model_name).embed_query(text)
+            self.registry.query_embeddings.put(key, vector)
+        return vector
+
+    async def aembed_query(self, text: str) -> List[float]:
+        key = (self.model_name, text)
+        vector = self.registry.query_embeddings.get(key)
+        if vector is None:
+            if EMBEDDING_BATCHING:
+                # Waits on the batch without holding a thread
+                vector = await self.registry.batcher(self.model_name).aembed_query(text)
+            else:
+                vector = await asyncio.to_thread(lambda: self.registry.embeddings(self.model_name).embed_query(text))
+            self.registry.query_embeddings.put(key, vector)
+        return vector
+
+
+class RegistryRetriever(BaseRetriever):
+    """
+    Retriever over a shared vectorstore, so chains can be built before the index is loaded
+    """
+
+    registry: Any
+    path: str
+    model_name: str
+    search_type: str = "similarity"
+    search_kwargs: Dict[str, Any] = {}
+
+    def _cache_key(self, query: str) -> Tuple:
+        # The version is read after the store lookup, so a reload is reflected in the key
+        version = self.registry.version(self.path, self.model_name)
+        kwargs = tuple(sorted((key, repr(value)) for key, value in self.search_kwargs.items()))
+        return os.path.abspath(self.path), self.model_name, version, self.search_type, kwargs, query
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        store = self.registry.vectorstore(self.path, self.model_name)
+        key = self._cache_key(query)
+        documents = self.registry.retrievals.get(key)
+        if documents is None:
+            retriever = store.as_retriever(search_type=self.search_type, search_kwargs=self.search_kwargs)
+            documents = retriever.invoke(query, config={"callbacks": run_manager.get_child()})
+            self.registry.retrievals.put(key, documents)
+        # Documents are the docstore's own objects; copies keep callers from editing the cached ones
+        return [document.model_copy() for document in documents]
+
+    async def _aget_relevant_documents(self, query: str, *,
+                                       run_manager: AsyncCallbackManagerForRetrieverRun) -> List[Document]:
+        store = await self.registry.avectorstore(self.path, self.model_name)
+        key = self._cache_key(query)
+        documents = self.registry.retrievals.get(key)
+        if documents is None:
+            retriever = store.as_retriever(search_type=self.search_type, search_kwargs=self.search_kwargs)
+            documents = await retriever.ainvoke(query, config={"callbacks": run_manager.get_child()})
+            self.registry.retrievals.put(key, documents)
+        return [document.model_copy() for document in documents]
+
+
+vectorstore_registry = VectorstoreRegistry()
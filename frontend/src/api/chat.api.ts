@@ -1,9 +1,10 @@
 import axiosSetup from "@/utils/axiosSetup";
 
-export const getChatById = async (threadId: number) => {
-  const response = await axiosSetup.get(
-    `/chats/getChatByThreadId?threadId=${threadId}`
-  );
+// One page of a thread, newest messages first; pass the X-Next-Cursor of a page to get the older one
+export const getChatById = async (threadId: number, cursor?: string) => {
+  const response = await axiosSetup.get(`/chats/getChatByThreadId`, {
+    params: { threadId, cursor },
+  });
   return response;
 };
 
@@ -20,14 +20,20 @@ import {
 import {
   addUserMessage,
   appendAiChunk,
+  replaceAiMessage,
   getMessageForSideBar,
   getMessagesByThreadId,
+  getOlderMessages,
 } from "@/store/slices/chat.slice";
 import { getUsersInitialThreadId } from "@/store/slices/userSlice";
 import Sidebar from "../../components/SideBar";
 
 const MedicalChat = () => {
   const messages = useSelector((state: RootState) => state.chat.message);
+  const olderCursor = useSelector((state: RootState) => state.chat.olderCursor);
+  const loadingOlder = useSelector(
+    (state: RootState) => state.chat.loadingOlder
+  );
   const [sidebarOpen, setSidebarOpen] = useState(false);
   const [inputValue, setInputValue] = useState("");
   const [isProcessing, setIsProcessing] = useState(false);
@@ -126,6 +132,11 @@ const MedicalChat = () => {
       dispatch(appendAiChunk(chunk));
     };
 
+    const handleReplace = (text: string) => {
+      setIsProcessing(false);
+      dispatch(replaceAiMessage(text));
+    };
+
     const handleError = () => {
       setIsProcessing(false);
       setError(
@@ -135,12 +146,15 @@ const MedicalChat = () => {
 
     socket.off("stream_chunk");
     socket.off("stream_error");
+    socket.off("stream_replace");
     socket.on("stream_chunk", handleChunk);
     socket.on("stream_error", handleError);
+    socket.on("stream_replace", handleReplace);
 
     return () => {
       socket.off("stream_chunk", handleChunk);
       socket.off("stream_error", handleError);
+      socket.off("stream_replace", handleReplace);
     };
   }, [dispatch]);
 
@@ -358,6 +372,24 @@ const MedicalChat = () => {
         {/* Messages */}
         <div className="flex-1 overflow-y-auto mt-16 mb-16 overscroll-contain">
           <div className="max-w-5xl mx-auto px-4 py-6 pb-32 space-y-6">
+            {olderCursor && currentUserThreadId && (
+              <div className="text-center">
+                <button
+                  onClick={() =>
+                    dispatch(
+                      getOlderMessages({
+                        threadId: currentUserThreadId,
+                        cursor: olderCursor,
+                      })
+                    )
+                  }
+                  disabled={loadingOlder}
+                  className="text-xs text-neutral-400 hover:text-neutral-200 disabled:opacity-50"
+                >
+                  {loadingOlder ? "Loading..." : "Load older messages"}
+                </button>
+              </div>
+            )}
             {messages.length === 0 && !isProcessing && (
               <div className="text-center py-12">
                 <div className="w-12 h-12 bg-neutral-800 rounded-full flex items-center justify-center mx-auto mb-4">
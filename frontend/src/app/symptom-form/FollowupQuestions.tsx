@@ -9,6 +9,7 @@ import {
   submitFollowupAnswersThunk,
 } from "@/store/slices/diagnosis.slice";
 import { socket } from "@/utils/socketSetup";
+import { getDiagnosisSessionId } from "@/utils/diagnosisSession";
 
 const FollowUpQuestions = () => {
   const [current, setCurrent] = useState(0);
@@ -55,10 +56,11 @@ const FollowUpQuestions = () => {
     questions.forEach((question: string, index: number) => {
       usersAnswers[question] = answers[index] || "";
     });
+    const sessionId = getDiagnosisSessionId();
 
     const response = await dispatch(
       submitFollowupAnswersThunk({
-        sessionId: "1",
+        sessionId,
         userSymptoms: userSymptoms,
         user_response: usersAnswers,
       })
@@ -67,7 +69,7 @@ const FollowUpQuestions = () => {
     if (response.meta.requestStatus === "fulfilled") {
       const finalPromptResponse = await dispatch(
         generateFinalPromptThunk({
-          sessionId: "1",
+          sessionId,
           userSymptoms: userSymptoms,
           formatted_response: userAdditionalFollowupAnswer,
         })
@@ -80,7 +82,7 @@ const FollowUpQuestions = () => {
       });
       await dispatch(
         generateLLMAnswer({
-          session_id: "1",
+          session_id: sessionId,
           finalPrompt: finalPromptResponse?.final_prompt,
         })
       );
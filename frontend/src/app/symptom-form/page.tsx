@@ -9,6 +9,7 @@ import { Shield, Sparkles, Lock, Loader2, ArrowRight } from "lucide-react";
 import type { RootDispatch, RootState } from "@/store";
 import { useSelector } from "react-redux";
 import FollowUpQuestions from "./FollowupQuestions";
+import { getDiagnosisSessionId } from "@/utils/diagnosisSession";
 
 const SymptomForm = () => {
   const [problem, setProblem] = useState("");
@@ -20,9 +21,11 @@ const SymptomForm = () => {
   const handleSubmit = async () => {
     if (!problem.trim()) return;
 
-    dispatch(startdiagnosis({ sessionId: "1", userSymptoms: problem }));
+    // The follow-up questions come from the run /init starts
+    const sessionId = getDiagnosisSessionId();
+    await dispatch(startdiagnosis({ sessionId, userSymptoms: problem }));
     const response = await dispatch(
-      generatefollowUpQuestion({ sessionId: "1", userSymptoms: problem })
+      generatefollowUpQuestion({ sessionId, userSymptoms: problem })
     );
     if (response.meta.requestStatus === "fulfilled") {
       setUserInfoCompleted(true);
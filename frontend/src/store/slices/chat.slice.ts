@@ -15,6 +15,9 @@ interface ChatResponse {
   loading: boolean;
   sidebarMessage: Message[];
   error: string | null;
+  // X-Next-Cursor of the oldest loaded page; null once the whole thread is loaded
+  olderCursor: string | null;
+  loadingOlder: boolean;
 }
 
 const initialState: ChatResponse = {
@@ -23,13 +26,36 @@ const initialState: ChatResponse = {
   loading: false,
   error: null,
   sidebarMessage: [],
+  olderCursor: null,
+  loadingOlder: false,
 };
 
+const toMessage = (msg: Message, index: number): Message => ({
+  id: msg.id ?? index + 1,
+  sender: msg.sender as "User" | "A.I",
+  text: msg.message ?? "",
+  time_stamp: msg.time_stamp,
+});
+
 export const getMessagesByThreadId = createAsyncThunk(
   "chat/getMessagesByThreadId",
   async (threadId: number) => {
     const response = await getChatById(threadId);
-    return response.data;
+    return {
+      messages: response.data,
+      olderCursor: response.headers["x-next-cursor"] ?? null,
+    };
+  }
+);
+
+export const getOlderMessages = createAsyncThunk(
+  "chat/getOlderMessages",
+  async ({ threadId, cursor }: { threadId: number; cursor: string }) => {
+    const response = await getChatById(threadId, cursor);
+    return {
+      messages: response.data,
+      olderCursor: response.headers["x-next-cursor"] ?? null,
+    };
   }
 );
 
@@ -46,6 +72,7 @@ const chatSlice = createSlice({
   reducers: {
     clearChat: (state) => {
       state.message = [];
+      state.olderCursor = null;
       state.loading = false;
       state.error = null;
     },
@@ -62,6 +89,20 @@ const chatSlice = createSlice({
         });
       }
     },
+    // The server replaces a partially streamed reply (e.g. with a fallback after an LLM error)
+    replaceAiMessage: (state, action) => {
+      const lastIndex = state.message.length - 1;
+      if (state.message[lastIndex]?.sender === "A.I") {
+        state.message[lastIndex].text = action.payload;
+      } else {
+        state.message.push({
+          id: Date.now(),
+          sender: "A.I",
+          text: action.payload,
+          time_stamp: new Date().toISOString(),
+        });
+      }
+    },
     addUserMessage: (state, action) => {
       state.message.push({
         id: Date.now(),
@@ -79,17 +120,28 @@ const chatSlice = createSlice({
       })
       .addCase(getMessagesByThreadId.fulfilled, (state, action) => {
         state.loading = false;
-        state.message = action.payload.map((msg: Message, index: number) => ({
-          id: index + 1,
-          sender: msg.sender as "User" | "A.I", // ✅ use as-is
-          text: msg.message,
-          timestamp: msg.time_stamp,
-        }));
+        state.message = action.payload.messages.map(toMessage);
+        state.olderCursor = action.payload.olderCursor;
       })
       .addCase(getMessagesByThreadId.rejected, (state, action) => {
         state.loading = false;
         state.error = action.error.message || "Failed to create initial thread";
       })
+      .addCase(getOlderMessages.pending, (state) => {
+        state.loadingOlder = true;
+      })
+      .addCase(getOlderMessages.fulfilled, (state, action) => {
+        state.loadingOlder = false;
+        state.message = [
+          ...action.payload.messages.map(toMessage),
+          ...state.message,
+        ];
+        state.olderCursor = action.payload.olderCursor;
+      })
+      .addCase(getOlderMessages.rejected, (state, action) => {
+        state.loadingOlder = false;
+        state.error = action.error.message || "Failed to load older messages";
+      })
       .addCase(getMessageForSideBar.pending, (state) => {
         state.loading = true;
         state.error = null;
@@ -105,5 +157,6 @@ const chatSlice = createSlice({
       });
   },
 });
-export const { appendAiChunk, addUserMessage, clearChat } = chatSlice.actions;
+export const { appendAiChunk, replaceAiMessage, addUserMessage, clearChat } =
+  chatSlice.actions;
 export default chatSlice.reducer;
@@ -0,0 +1,12 @@
+const SESSION_KEY = "diagnosisSessionId";
+
+// One-way diagnosis runs are stored per session id on the server, so every
+// browser tab gets its own random id instead of sharing one
+export const getDiagnosisSessionId = () => {
+  let sessionId = sessionStorage.getItem(SESSION_KEY);
+  if (!sessionId) {
+    sessionId = crypto.randomUUID();
+    sessionStorage.setItem(SESSION_KEY, sessionId);
+  }
+  return sessionId;
+};